@@ -0,0 +1,240 @@
+# artifacts.py
+"""Archivos de exportación (CSV / JSONL / Parquet) servidos por `/exports/<handle>`.
+
+`write_export` recorre un modelo con paginación por clave
+(`streaming.iter_keyset_pages`) y escribe cada página al archivo antes de
+pedir la siguiente: la memoria usada depende de `page_size`, no del total.
+Las columnas salen de `fields_get` (cacheado): un many2one `[id, "Nombre"]`
+se escribe como `campo` (id) + `campo_name`; los x2many como ids separados
+por `;` en CSV/Parquet y como lista en JSONL.
+
+El handle es aleatorio (no adivinable) y es la única credencial de la
+descarga; los archivos vencen a los `EXPORT_TTL` segundos y se purgan al
+crear nuevas exportaciones. Un `.part` es una exportación que se sigue
+escribiendo (quizá en otro worker): solo se purga si nadie lo toca en
+`EXPORT_ORPHAN_TTL` segundos. `EXPORT_DIR` debe ser común a todos los workers.
+"""
+import csv
+import json
+import os
+import re
+import secrets
+import tempfile
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from encoding import dumps
+from streaming import iter_keyset_pages
+
+try:  # Parquet es opcional (pip install '.[parquet]')
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # pragma: no cover - depende del entorno
+    pyarrow = None
+
+EXPORT_DIR = os.getenv("EXPORT_DIR") or os.path.join(tempfile.gettempdir(), "mcp-odoo-exports")
+EXPORT_TTL = float(os.getenv("EXPORT_TTL", "3600"))
+# `.part` sin escrituras por este tiempo: exportación abandonada por un worker caído
+EXPORT_ORPHAN_TTL = float(os.getenv("EXPORT_ORPHAN_TTL", "86400"))
+# Prefijo de la URL de descarga devuelta (p.ej. https://mcp.ejemplo.com); vacío = ruta relativa
+EXPORT_BASE_URL = os.getenv("EXPORT_BASE_URL", "").rstrip("/")
+
+FORMATS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "jsonl": ("application/x-ndjson", "jsonl"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+CHUNK_SIZE = 65536
+
+_HANDLE_RE = re.compile(r"^[A-Za-z0-9_-]{16,64}$")
+_ARROW_TYPES = {"integer": "int64", "float": "float64", "monetary": "float64", "boolean": "bool_"}
+
+
+def _paths(handle: str) -> Tuple[str, str]:
+    return os.path.join(EXPORT_DIR, handle), os.path.join(EXPORT_DIR, handle + ".json")
+
+
+def _columns(fields: List[str], types: Dict[str, str]) -> List[Tuple[str, str, str]]:
+    """(columna, campo de origen, tipo Odoo) en el orden de `fields`."""
+    columns = []
+    for f in fields:
+        ftype = types.get(f, "char")
+        columns.append((f, f, ftype))
+        if ftype == "many2one":
+            columns.append((f + "_name", f, "many2one_name"))
+    return columns
+
+
+def _cell(value: Any, ftype: str, flat: bool) -> Any:
+    if ftype == "many2one":
+        return value[0] if isinstance(value, (list, tuple)) and value else None
+    if ftype == "many2one_name":
+        return value[1] if isinstance(value, (list, tuple)) and len(value) > 1 else None
+    if ftype in ("one2many", "many2many"):
+        ids = value if isinstance(value, list) else []
+        return ";".join(str(i) for i in ids) if flat else ids
+    if value is False and ftype != "boolean":
+        # Odoo devuelve False para campos vacíos
+        return None
+    if flat and isinstance(value, (list, dict)):
+        return dumps(value, compact=True)
+    return value
+
+
+def _flatten(rows: List[Dict[str, Any]], columns: List[Tuple[str, str, str]], flat: bool) -> List[Dict[str, Any]]:
+    return [{col: _cell(r.get(src), ftype, flat) for col, src, ftype in columns} for r in rows]
+
+
+class _CsvWriter:
+    def __init__(self, path: str, columns):
+        self._fh = open(path, "w", encoding="utf-8", newline="")
+        self._writer = csv.DictWriter(self._fh, [c[0] for c in columns])
+        self._writer.writeheader()
+
+    def write(self, rows: List[Dict[str, Any]]) -> None:
+        self._writer.writerows(rows)
+
+    def close(self) -> None:
+        self._fh.close()
+
+
+class _JsonlWriter:
+    def __init__(self, path: str, columns):
+        self._fh = open(path, "w", encoding="utf-8")
+
+    def write(self, rows: List[Dict[str, Any]]) -> None:
+        self._fh.write("".join(dumps(r, compact=True) + "\n" for r in rows))
+
+    def close(self) -> None:
+        self._fh.close()
+
+
+class _ParquetWriter:
+    def __init__(self, path: str, columns):
+        # Esquema fijo desde fields_get: una página con todo vacío no cambia los tipos
+        self._schema = pyarrow.schema([
+            (col, getattr(pyarrow, _ARROW_TYPES.get("integer" if ftype == "many2one" else ftype, "string"))())
+            for col, _, ftype in columns
+        ])
+        self._writer = pyarrow.parquet.ParquetWriter(path, self._schema)
+
+    def write(self, rows: List[Dict[str, Any]]) -> None:
+        if rows:
+            self._writer.write_table(pyarrow.Table.from_pylist(rows, schema=self._schema))
+
+    def close(self) -> None:
+        self._writer.close()
+
+
+_WRITERS = {"csv": _CsvWriter, "jsonl": _JsonlWriter, "parquet": _ParquetWriter}
+
+
+def purge_expired(now: Optional[float] = None) -> int:
+    """Borra las exportaciones vencidas; devuelve cuántas."""
+    now = time.time() if now is None else now
+    removed = 0
+    try:
+        names = os.listdir(EXPORT_DIR)
+    except FileNotFoundError:
+        return 0
+    for name in names:
+        path = os.path.join(EXPORT_DIR, name)
+        try:
+            age = now - os.path.getmtime(path)
+            if name.endswith(".part"):
+                # Exportación en curso: su mtime avanza con cada página
+                if age > max(EXPORT_TTL, EXPORT_ORPHAN_TTL):
+                    os.remove(path)
+            elif name.endswith(".json"):
+                # Metadatos sin archivo (se borran junto con él más abajo)
+                if age > EXPORT_TTL and not os.path.exists(path[:-len(".json")]):
+                    os.remove(path)
+            elif age > EXPORT_TTL:
+                os.remove(path)
+                removed += 1
+                try:
+                    os.remove(path + ".json")
+                except FileNotFoundError:
+                    pass
+        except OSError:
+            # Otro worker lo borró primero
+            pass
+    return removed
+
+
+def write_export(odoo, model: str, domain: list, fields: List[str], fmt: str = "csv",
+                 page_size: int = 1000, limit: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Exporta `model` a un archivo en `EXPORT_DIR` y devuelve sus metadatos
+    (`handle`, `url`, `rows`, `bytes`, `expires_at`, ...).
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Formato no soportado: {fmt!r} ({'|'.join(FORMATS)})")
+    if fmt == "parquet" and pyarrow is None:
+        raise ValueError("Parquet requiere pyarrow (pip install 'mcp-odoo[parquet]'); usa csv o jsonl")
+    fields = list(dict.fromkeys(["id", *fields]))
+    types = {f: meta.get("type", "char") for f, meta in odoo.fields_get(model, ["type"]).items()}
+    unknown = [f for f in fields if f not in types]
+    if unknown:
+        raise ValueError(f"Campos inexistentes en {model}: {', '.join(unknown)}")
+    columns = _columns(fields, types)
+
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    purge_expired()
+    handle = secrets.token_urlsafe(18)
+    path, meta_path = _paths(handle)
+    partial_path = path + ".part"
+    rows = 0
+    writer = _WRITERS[fmt](partial_path, columns)
+    try:
+        for page in iter_keyset_pages(odoo, model, domain, fields, page_size, limit):
+            writer.write(_flatten(page, columns, flat=fmt != "jsonl"))
+            rows += len(page)
+    except BaseException:
+        writer.close()
+        os.remove(partial_path)
+        raise
+    writer.close()
+    os.replace(partial_path, path)
+
+    created = time.time()
+    ext = FORMATS[fmt][1]
+    meta = {
+        "handle": handle,
+        "url": f"{EXPORT_BASE_URL}/exports/{handle}",
+        "model": model,
+        "format": fmt,
+        "filename": f"{model.replace('.', '_')}-{time.strftime('%Y%m%d-%H%M%S', time.gmtime(created))}.{ext}",
+        "columns": [c[0] for c in columns],
+        "rows": rows,
+        "bytes": os.path.getsize(path),
+        "expires_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(created + EXPORT_TTL)),
+    }
+    with open(meta_path, "w", encoding="utf-8") as fh:
+        json.dump(meta, fh)
+    return meta
+
+
+def open_export(handle: str) -> Optional[Tuple[Dict[str, Any], Iterator[bytes]]]:
+    """Metadatos y chunks del archivo de `handle`, o None si no existe/venció."""
+    if not _HANDLE_RE.match(handle):
+        return None
+    path, meta_path = _paths(handle)
+    try:
+        if time.time() - os.path.getmtime(path) > EXPORT_TTL:
+            return None
+        with open(meta_path, encoding="utf-8") as fh:
+            meta = json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+    def chunks() -> Iterator[bytes]:
+        # Se abre en el primer chunk: si la respuesta no llega a empezar no queda abierto
+        with open(path, "rb") as fh:
+            while True:
+                chunk = fh.read(CHUNK_SIZE)
+                if not chunk:
+                    return
+                yield chunk
+
+    return meta, chunks()
@@ -0,0 +1,113 @@
+# bench/bench_serialization.py
+"""
+Benchmark de serialización de respuestas de `list_sales`.
+
+Compara, para 1k y 10k filas sintéticas de sale.order:
+- fastmcp:  validación pydantic + to_json(indent=2) por elemento (ruta previa)
+- stdlib:   json.dumps(ensure_ascii=False)
+- orjson:   orjson.dumps (si está instalado)
+- dumps:    encoding.dumps (backend activo, el que usan las tools)
+- compact:  encoding.compact_rows + encoding.dumps(compact=True)
+
+Mide tiempo (mejor de N repeticiones), memoria pico asignada durante la
+serialización (tracemalloc) y bytes producidos.
+
+Uso:
+    python bench/bench_serialization.py [--rows 1000 10000] [--repeat 5]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pydantic_core  # noqa: E402
+
+from encoding import compact_rows, dumps, _use_orjson  # noqa: E402
+from tools.sales import SaleOrder  # noqa: E402
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def make_rows(n: int):
+    partners = [[i, f"Cliente Ñandú {i} S.A. de C.V."] for i in range(1, 201)]
+    users = [[i, f"Vendedor {i}"] for i in range(1, 21)]
+    return [
+        {
+            "id": i,
+            "name": f"S{i:05d}",
+            "partner_id": partners[i % len(partners)],
+            "date_order": f"2025-{(i % 12) + 1:02d}-15 10:00:00",
+            "amount_total": round(i * 13.37, 2),
+            "state": ("draft", "sent", "sale", "cancel")[i % 4],
+            "user_id": users[i % len(users)],
+        }
+        for i in range(1, n + 1)
+    ]
+
+
+def run_fastmcp(rows):
+    out = []
+    for r in rows:
+        out.append(pydantic_core.to_json(SaleOrder.model_validate(r), indent=2).decode())
+    return sum(len(t) for t in out)
+
+
+def run_stdlib(rows):
+    return len(json.dumps(rows, ensure_ascii=False))
+
+
+def run_orjson(rows):
+    return len(orjson.dumps(rows))
+
+
+def run_dumps(rows):
+    return len(dumps(rows))
+
+
+def run_compact(rows):
+    return len(dumps(compact_rows(rows), compact=True))
+
+
+def measure(fn, rows, repeat: int):
+    best = float("inf")
+    size = 0
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        size = fn(rows)
+        best = min(best, time.perf_counter() - t0)
+    tracemalloc.start()
+    fn(rows)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    cases = [("fastmcp", run_fastmcp), ("stdlib", run_stdlib)]
+    if orjson is not None:
+        cases.append(("orjson", run_orjson))
+    cases += [("dumps", run_dumps), ("compact", run_compact)]
+
+    print(f"backend activo de encoding.dumps: {'orjson' if _use_orjson else 'stdlib'}")
+    print(f"{'rows':>6} {'caso':<8} {'ms':>9} {'pico KiB':>9} {'bytes':>10}")
+    for n in args.rows:
+        rows = make_rows(n)
+        for name, fn in cases:
+            best, peak, size = measure(fn, rows, args.repeat)
+            print(f"{n:>6} {name:<8} {best * 1000:>9.2f} {peak / 1024:>9.1f} {size:>10}")
+
+
+if __name__ == "__main__":
+    main()
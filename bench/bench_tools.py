@@ -0,0 +1,145 @@
+# bench/bench_tools.py
+"""
+Benchmark de tools MCP contra el Odoo de imitación (bench/fake_odoo.py).
+
+Levanta FakeOdoo en un hilo, apunta prod y dev a él, registra las tools del
+servidor real (server.py) y ejecuta cada escenario con N clientes MCP
+concurrentes (sesiones en memoria). Reporta p50/p99/media de latencia,
+throughput, RPCs por llamada y errores.
+
+Uso:
+    python bench/bench_tools.py --clients 8 --calls 25 --latency-ms 20
+    python bench/bench_tools.py --scenarios list_tasks fetch --rows-tasks 20000
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_odoo import FakeOdoo, configure_env  # noqa: E402
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[k]
+
+
+# Escenarios que llaman a una tool con otro nombre
+SCENARIO_TOOLS = {"list_tasks_by_user": "list_tasks", "list_sales_bulk": "list_sales"}
+
+
+def build_scenarios(fake: FakeOdoo) -> Dict[str, Callable[[random.Random, int], Dict[str, Any]]]:
+    users = fake.data["res.users"]
+    n_tasks = len(fake.data["project.task"])
+    n_sales = len(fake.data["sale.order"])
+    n_projects = len(fake.data["project.project"])
+    return {
+        "list_tasks": lambda rnd, i: {"limit": 50},
+        "list_tasks_by_user": lambda rnd, i: {"assigned_to_name": users[rnd.randrange(len(users))]["name"], "limit": 50},
+        "list_sales": lambda rnd, i: {"state": "sale", "limit": 200},
+        # Exportación grande: clase bulk en el limitador (scheduling.BULK_LIMIT)
+        "list_sales_bulk": lambda rnd, i: {"limit": min(n_sales, 5000), "compact": True},
+        "get_sale": lambda rnd, i: {"sale_id": rnd.randint(1, n_sales), "include_lines": True},
+        "search": lambda rnd, i: {"query": f"Tarea {rnd.randint(1, 99)}", "limit": 10},
+        "fetch": lambda rnd, i: {"doc_id": (f"task:{rnd.randint(1, n_tasks)}" if i % 4
+                                            else f"project:{rnd.randint(1, n_projects)}")},
+        "dev_create_quotation": lambda rnd, i: {
+            "partner_name": f"Bench {i}", "contact_name": "Contacto", "email": f"bench{i}-{rnd.random()}@example.com",
+            "phone": "555-0000", "lead_name": f"Cotización bench {i}", "product_id": 1, "product_qty": 2.0,
+        },
+    }
+
+
+async def run_client(server_mod, tool: str, make_args, calls: int, seed: int,
+                     latencies: List[float], errors: List[str]) -> None:
+    from mcp.shared.memory import create_connected_server_and_client_session
+
+    rnd = random.Random(seed)
+    async with create_connected_server_and_client_session(server_mod.mcp._mcp_server) as client:
+        for i in range(calls):
+            args = make_args(rnd, seed * 100000 + i)
+            t0 = time.perf_counter()
+            try:
+                result = await client.call_tool(tool, args)
+                if result.isError:
+                    errors.append(result.content[0].text if result.content else "error")
+            except Exception as e:  # transporte/cliente
+                errors.append(repr(e))
+            latencies.append(time.perf_counter() - t0)
+
+
+async def run_scenario(server_mod, fake: FakeOdoo, name: str, make_args, clients: int, calls: int) -> Dict[str, Any]:
+    tool = SCENARIO_TOOLS.get(name, name)
+    latencies: List[float] = []
+    errors: List[str] = []
+    fake.reset_calls()
+    t0 = time.perf_counter()
+    await asyncio.gather(*(
+        run_client(server_mod, tool, make_args, calls, seed + 1, latencies, errors)
+        for seed in range(clients)
+    ))
+    wall = time.perf_counter() - t0
+    total = len(latencies)
+    return {
+        "scenario": name,
+        "calls": total,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "mean_ms": statistics.fmean(latencies) * 1000 if latencies else 0.0,
+        "rps": total / wall if wall else 0.0,
+        "rpc_per_call": fake.total_calls() / total if total else 0.0,
+        "errors": len(errors),
+        "first_error": errors[0][:120] if errors else "",
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de tools MCP contra FakeOdoo")
+    parser.add_argument("--clients", type=int, default=4, help="clientes MCP concurrentes")
+    parser.add_argument("--calls", type=int, default=20, help="llamadas por cliente y escenario")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="latencia por RPC del Odoo falso")
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--rows-tasks", type=int, default=2000)
+    parser.add_argument("--rows-sales", type=int, default=5000)
+    parser.add_argument("--scenarios", nargs="+", default=None)
+    args = parser.parse_args()
+
+    fake = FakeOdoo(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                    tasks=args.rows_tasks, sales=args.rows_sales).start()
+    os.environ.update(configure_env(fake.url))
+
+    import server
+
+    server.init_tools_once()
+    scenarios = build_scenarios(fake)
+    names = args.scenarios or list(scenarios)
+    unknown = [n for n in names if n not in scenarios]
+    if unknown:
+        parser.error(f"escenarios desconocidos: {unknown} (disponibles: {list(scenarios)})")
+
+    print(f"FakeOdoo {fake.url} · latencia {args.latency_ms} ms · {args.clients} clientes × {args.calls} llamadas")
+    print(f"{'escenario':<22} {'calls':>6} {'p50 ms':>9} {'p99 ms':>9} {'media ms':>9} {'req/s':>8} {'rpc/call':>9} {'errores':>8}")
+    try:
+        for name in names:
+            r = asyncio.run(run_scenario(server, fake, name, scenarios[name], args.clients, args.calls))
+            print(f"{r['scenario']:<22} {r['calls']:>6} {r['p50_ms']:>9.1f} {r['p99_ms']:>9.1f} "
+                  f"{r['mean_ms']:>9.1f} {r['rps']:>8.1f} {r['rpc_per_call']:>9.2f} {r['errors']:>8}")
+            if r["first_error"]:
+                print(f"    primer error: {r['first_error']}")
+    finally:
+        fake.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,412 @@
+# bench/fake_odoo.py
+"""
+Servidor Odoo de imitación para benchmarks y pruebas locales.
+
+Expone los endpoints XML-RPC (`/xmlrpc/2/common`, `/xmlrpc/2/object`) y
+JSON-RPC (`/jsonrpc`) sobre datos sintéticos en memoria:
+res.users, res.partner, project.project, project.task, sale.order,
+sale.order.line, product.product y crm.lead.
+
+Soporta search_read, read, search, search_count, fields_get, create, write,
+unlink, name_search y action_set_won, con dominios simples (AND implícito de
+tuplas `[campo, op, valor]`), `limit`, `offset` y `order`.
+
+Uso como script:
+    python bench/fake_odoo.py --port 8069 --latency-ms 20 --tasks 5000 --sales 10000
+
+Con `webhook_url` (`--webhook-url`) cada create/write/unlink envía un POST
+`{"_model", "_id"}` por registro, como la acción "Enviar notificación
+webhook" de Odoo (p.ej. a `/invalidate?token=...` del servidor MCP).
+
+Uso como librería:
+    srv = FakeOdoo(latency_ms=20).start()      # hilo en segundo plano
+    os.environ["ODOO_URL"] = srv.url
+    ...
+    srv.stop()
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import urllib.request
+import xmlrpc.client
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+DB = "fake"
+LOGIN = "bench@example.com"
+API_KEY = "bench"
+
+FIELD_TYPES = {
+    "project.task": {"user_ids": "many2many", "project_id": "many2one", "stage_id": "many2one",
+                     "date_deadline": "date", "description": "html", "write_date": "datetime"},
+    "sale.order": {"partner_id": "many2one", "user_id": "many2one", "payment_term_id": "many2one",
+                   "opportunity_id": "many2one", "order_line": "one2many", "date_order": "datetime",
+                   "amount_untaxed": "monetary", "amount_tax": "monetary", "amount_total": "monetary",
+                   "state": "selection", "write_date": "datetime"},
+    "sale.order.line": {"order_id": "many2one", "product_id": "many2one", "product_uom_qty": "float",
+                        "price_unit": "float", "price_subtotal": "monetary"},
+}
+
+
+def _m2o(rec: Optional[Dict[str, Any]]):
+    return [rec["id"], rec["name"]] if rec else False
+
+
+def build_dataset(users: int = 50, partners: int = 500, projects: int = 40,
+                  tasks: int = 2000, sales: int = 5000, products: int = 200,
+                  lines_per_sale: int = 3, seed: int = 7) -> Dict[str, List[Dict[str, Any]]]:
+    """Genera datos sintéticos deterministas (mismo seed → mismos datos)."""
+    rnd = random.Random(seed)
+    first = ["José", "María", "Julio", "Ana", "Luis", "Sofía", "Carlos", "Lucía", "Andrés", "Elena"]
+    last = ["Pérez", "Rodríguez", "García", "López", "Martínez", "Hernández", "Gómez", "Díaz"]
+    stamp = "2025-01-01 00:00:00"
+
+    data: Dict[str, List[Dict[str, Any]]] = {m: [] for m in (
+        "res.users", "res.partner", "project.project", "project.task",
+        "sale.order", "sale.order.line", "product.product", "crm.lead",
+    )}
+    for i in range(1, users + 1):
+        name = f"{first[i % len(first)]} {last[(i // len(first)) % len(last)]} {i}"
+        data["res.users"].append({"id": i, "name": name, "login": f"user{i}@example.com",
+                                  "active": True, "write_date": stamp})
+    for i in range(1, partners + 1):
+        data["res.partner"].append({"id": i, "name": f"Cliente {i} S.A. de C.V.",
+                                    "email": f"cliente{i}@example.com", "phone": False,
+                                    "active": True, "write_date": stamp})
+    for i in range(1, products + 1):
+        data["product.product"].append({"id": i, "name": f"Producto {i}", "list_price": float(i * 10),
+                                        "write_date": stamp})
+    for i in range(1, projects + 1):
+        data["project.project"].append({"id": i, "name": f"Proyecto {i}", "active": True,
+                                        "write_date": stamp})
+    stages = [[1, "Nuevo"], [2, "En progreso"], [3, "Hecho"]]
+    for i in range(1, tasks + 1):
+        project = data["project.project"][rnd.randrange(projects)]
+        user = data["res.users"][rnd.randrange(users)]
+        deadline = f"2025-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}" if i % 3 else False
+        data["project.task"].append({
+            "id": i, "name": f"Tarea {i}", "project_id": _m2o(project),
+            "user_ids": [user["id"]], "stage_id": stages[i % 3], "date_deadline": deadline,
+            "description": f"<p>Descripción de la tarea {i}</p>" * (1 + i % 5),
+            "write_date": stamp,
+        })
+    line_id = 0
+    for i in range(1, sales + 1):
+        partner = data["res.partner"][rnd.randrange(partners)]
+        user = data["res.users"][rnd.randrange(users)]
+        line_ids = []
+        total = 0.0
+        for _ in range(lines_per_sale):
+            line_id += 1
+            product = data["product.product"][rnd.randrange(products)]
+            qty = float(rnd.randint(1, 10))
+            subtotal = qty * product["list_price"]
+            total += subtotal
+            line_ids.append(line_id)
+            data["sale.order.line"].append({
+                "id": line_id, "order_id": [i, f"S{i:05d}"], "product_id": _m2o(product),
+                "name": product["name"], "product_uom_qty": qty, "price_unit": product["list_price"],
+                "price_subtotal": subtotal, "write_date": stamp,
+            })
+        data["sale.order"].append({
+            "id": i, "name": f"S{i:05d}", "partner_id": _m2o(partner), "user_id": _m2o(user),
+            "date_order": f"2025-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d} 10:00:00",
+            "amount_untaxed": round(total, 2), "amount_tax": round(total * 0.16, 2),
+            "amount_total": round(total * 1.16, 2), "state": ("draft", "sent", "sale", "cancel")[i % 4],
+            "payment_term_id": False, "validity_date": False, "note": False,
+            "order_line": line_ids, "opportunity_id": False, "origin": False, "write_date": stamp,
+        })
+    return data
+
+
+def _value_for_compare(value: Any) -> Any:
+    if isinstance(value, list) and len(value) == 2 and isinstance(value[0], int) and isinstance(value[1], str):
+        return value[0]
+    return value
+
+
+def _match(rec: Dict[str, Any], cond) -> bool:
+    field, op, expected = cond
+    raw = rec.get(field, False)
+    value = _value_for_compare(raw)
+    if op == "=":
+        if isinstance(raw, list) and not isinstance(value, int):
+            return expected in raw
+        return value == expected
+    if op == "!=":
+        return value != expected
+    if op in ("in", "not in"):
+        values = raw if isinstance(raw, list) and not isinstance(value, int) else [value]
+        hit = any(v in expected for v in values)
+        return hit if op == "in" else not hit
+    if op in ("ilike", "like"):
+        text = str(raw[1] if isinstance(raw, list) and len(raw) == 2 else raw or "")
+        return (str(expected).lower() in text.lower()) if op == "ilike" else (str(expected) in text)
+    if value is False or value is None:
+        return False
+    if op == ">":
+        return value > expected
+    if op == ">=":
+        return value >= expected
+    if op == "<":
+        return value < expected
+    if op == "<=":
+        return value <= expected
+    raise ValueError(f"Operador no soportado en FakeOdoo: {op}")
+
+
+class _QuietHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clientes que cortan por timeout: esperado en pruebas de resiliencia
+        pass
+
+
+class FakeOdoo:
+    """Odoo en memoria servido por XML-RPC y JSON-RPC."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency_ms: float = 0.0,
+                 jitter_ms: float = 0.0, data: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+                 error_rate: float = 0.0, webhook_url: Optional[str] = None, **sizes: int):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        # Fracción de llamadas execute_kw que responden HTTP 503 (simula saturación)
+        self.error_rate = error_rate
+        # Destino de las notificaciones de cambios (webhook de Odoo), opcional
+        self.webhook_url = webhook_url
+        self.data = data if data is not None else build_dataset(**sizes)
+        self.calls: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._next_ids = {m: max((r["id"] for r in rows), default=0) for m, rows in self.data.items()}
+        self.httpd = _QuietHTTPServer((host, port), self._handler_class())
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    # --- ciclo de vida ---
+    def start(self) -> "FakeOdoo":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def reset_calls(self) -> None:
+        with self._lock:
+            self.calls.clear()
+
+    def total_calls(self) -> int:
+        with self._lock:
+            return sum(self.calls.values())
+
+    # --- lógica de Odoo ---
+    def _sleep(self) -> None:
+        delay = self.latency_ms + (random.uniform(0, self.jitter_ms) if self.jitter_ms else 0.0)
+        if delay > 0:
+            time.sleep(delay / 1000.0)
+
+    def _notify(self, model: str, ids) -> None:
+        if not self.webhook_url:
+            return
+        for rid in ids:
+            body = json.dumps({"_model": model, "_id": rid}).encode("utf-8")
+            req = urllib.request.Request(self.webhook_url, data=body, headers={"Content-Type": "application/json"})
+            try:
+                urllib.request.urlopen(req, timeout=5).close()
+            except OSError:
+                # Como en Odoo, un webhook caído no afecta la escritura
+                pass
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self.calls[key] = self.calls.get(key, 0) + 1
+
+    def _search(self, model: str, domain, offset: int = 0, limit: Optional[int] = None,
+                order: Optional[str] = None) -> List[Dict[str, Any]]:
+        rows = self.data.get(model, [])
+        conds = [c for c in (domain or []) if isinstance(c, (list, tuple)) and len(c) == 3]
+        rows = [r for r in rows if all(_match(r, c) for c in conds)]
+        if order:
+            for part in reversed([p.strip() for p in order.split(",") if p.strip()]):
+                bits = part.split()
+                key = bits[0]
+                desc = len(bits) > 1 and bits[1].lower() == "desc"
+                rows = sorted(rows, key=lambda r: (_value_for_compare(r.get(key)) is False,
+                                                   _value_for_compare(r.get(key)) or 0), reverse=desc)
+        rows = rows[offset:]
+        if limit:
+            rows = rows[:limit]
+        return rows
+
+    @staticmethod
+    def _project(rows: List[Dict[str, Any]], fields: Optional[List[str]]) -> List[Dict[str, Any]]:
+        if not fields:
+            return [dict(r) for r in rows]
+        return [{"id": r["id"], **{f: r.get(f, False) for f in fields}} for r in rows]
+
+    def execute_kw(self, db, uid, password, model, method, args=None, kwargs=None):
+        if (db, uid, password) != (DB, 1, API_KEY):
+            raise PermissionError("Access Denied")
+        args = list(args or [])
+        kwargs = dict(kwargs or {})
+        self._count(f"{model}.{method}")
+        self._sleep()
+
+        if method == "fields_get":
+            fields = {k: {"type": "char"} for r in self.data.get(model, [])[:1] for k in r}
+            fields.update({k: {"type": t} for k, t in FIELD_TYPES.get(model, {}).items()})
+            return fields
+        if method == "search_read":
+            domain = args[0] if args else kwargs.get("domain", [])
+            rows = self._search(model, domain, kwargs.get("offset", 0), kwargs.get("limit"), kwargs.get("order"))
+            return self._project(rows, kwargs.get("fields"))
+        if method == "search":
+            rows = self._search(model, args[0] if args else [], kwargs.get("offset", 0),
+                                kwargs.get("limit"), kwargs.get("order"))
+            return [r["id"] for r in rows]
+        if method == "search_count":
+            return len(self._search(model, args[0] if args else []))
+        if method == "read":
+            ids = set(args[0])
+            rows = [r for r in self.data.get(model, []) if r["id"] in ids]
+            return self._project(rows, kwargs.get("fields") or (args[1] if len(args) > 1 else None))
+        if method == "name_search":
+            name = args[0] if args else kwargs.get("name", "")
+            rows = self._search(model, [["name", "ilike", name]], limit=kwargs.get("limit", 100))
+            return [[r["id"], r.get("name", "")] for r in rows]
+        if method == "create":
+            values = args[0]
+            with self._lock:
+                self._next_ids[model] = self._next_ids.get(model, 0) + 1
+                new_id = self._next_ids[model]
+            rec = {"id": new_id, "write_date": time.strftime("%Y-%m-%d %H:%M:%S"), **values}
+            if model == "sale.order":
+                rec.setdefault("name", f"S{new_id:05d}")
+                rec.setdefault("state", "draft")
+                rec.setdefault("amount_total", 0.0)
+            self.data.setdefault(model, []).append(rec)
+            self._notify(model, [new_id])
+            return new_id
+        if method == "write":
+            ids, values = set(args[0]), args[1]
+            for r in self.data.get(model, []):
+                if r["id"] in ids:
+                    r.update(values)
+                    r["write_date"] = time.strftime("%Y-%m-%d %H:%M:%S")
+            self._notify(model, sorted(ids))
+            return True
+        if method == "unlink":
+            ids = set(args[0])
+            self.data[model] = [r for r in self.data.get(model, []) if r["id"] not in ids]
+            self._notify(model, sorted(ids))
+            return True
+        if method == "action_set_won":
+            return True
+        raise NotImplementedError(f"{model}.{method} no soportado por FakeOdoo")
+
+    def authenticate(self, db, login, password, user_agent_env=None):
+        self._count("common.authenticate")
+        self._sleep()
+        return 1 if (db, login, password) == (DB, LOGIN, API_KEY) else False
+
+    def version(self):
+        return {"server_version": "18.0", "server_serie": "18.0", "protocol_version": 1}
+
+    def dispatch(self, service: str, method: str, params: list):
+        if service == "common":
+            if method == "authenticate":
+                return self.authenticate(*params)
+            if method == "version":
+                return self.version()
+        if service == "object" and method == "execute_kw":
+            return self.execute_kw(*params)
+        raise NotImplementedError(f"{service}.{method} no soportado por FakeOdoo")
+
+    def _handler_class(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True  # evita el retardo de ~40 ms por delayed ACK
+
+            def log_message(self, *args):  # silencio
+                pass
+
+            def _reply(self, body: bytes, ctype: str, status: int = 200) -> None:
+                self.send_response(status)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                raw = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if fake.error_rate and self.path.endswith("/object") and random.random() < fake.error_rate:
+                    self._reply(b"Service Unavailable", "text/plain", 503)
+                elif self.path.startswith("/xmlrpc/2/"):
+                    service = self.path.rsplit("/", 1)[-1]
+                    try:
+                        params, method = xmlrpc.client.loads(raw)
+                        result = fake.dispatch(service, method, list(params))
+                        body = xmlrpc.client.dumps((result,), methodresponse=True, allow_none=False)
+                    except Exception as e:
+                        body = xmlrpc.client.dumps(xmlrpc.client.Fault(1, repr(e)))
+                    self._reply(body.encode("utf-8"), "text/xml")
+                elif self.path == "/jsonrpc":
+                    req = json.loads(raw or b"{}")
+                    p = req.get("params", {})
+                    try:
+                        result = fake.dispatch(p.get("service"), p.get("method"), list(p.get("args", [])))
+                        resp = {"jsonrpc": "2.0", "id": req.get("id"), "result": result}
+                    except Exception as e:
+                        resp = {"jsonrpc": "2.0", "id": req.get("id"),
+                                "error": {"code": 200, "message": repr(e), "data": {"name": type(e).__name__}}}
+                    self._reply(json.dumps(resp).encode("utf-8"), "application/json")
+                else:
+                    self._reply(b"not found", "text/plain", 404)
+
+        return Handler
+
+
+def configure_env(url: str) -> Dict[str, str]:
+    """Variables de entorno para apuntar prod y dev al servidor de imitación."""
+    return {
+        "ODOO_URL": url, "ODOO_DB": DB, "ODOO_LOGIN": LOGIN, "ODOO_API_KEY": API_KEY,
+        "DEV_ODOO_URL": url, "DEV_ODOO_DB": DB, "DEV_ODOO_LOGIN": LOGIN, "DEV_ODOO_API_KEY": API_KEY,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor Odoo de imitación (XML-RPC + JSON-RPC)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8069)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fracción de RPC que responden 503")
+    parser.add_argument("--webhook-url", default=None, help="POST {_model,_id} por cada create/write/unlink")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--tasks", type=int, default=2000)
+    parser.add_argument("--sales", type=int, default=5000)
+    args = parser.parse_args()
+
+    srv = FakeOdoo(args.host, args.port, args.latency_ms, args.jitter_ms, error_rate=args.error_rate,
+                   webhook_url=args.webhook_url, users=args.users, tasks=args.tasks, sales=args.sales)
+    print(f"FakeOdoo en {srv.url} (db={DB}, login={LOGIN}, api_key={API_KEY})")
+    for k, v in configure_env(srv.url).items():
+        print(f"  export {k}={v}")
+    try:
+        srv.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+# bench/loadtest.py
+"""
+Prueba de carga del endpoint MCP Streamable HTTP (`server:app`).
+
+Por defecto todo corre en local: levanta FakeOdoo en un hilo, arranca
+`uvicorn server:app` en un subproceso apuntando a él y abre N sesiones MCP
+concurrentes (`streamablehttp_client`) que reproducen una mezcla ponderada
+de llamadas a tools durante un tiempo fijo. Reporta throughput, percentiles
+de latencia (global y por tool), tasa de errores y memoria (RSS) del
+servidor al inicio, pico y final.
+
+Uso:
+    python bench/loadtest.py --sessions 50 --duration 30 \\
+        --mix list_tasks=3 fetch=5 search=2 get_sale=2 --latency-ms 20
+
+    # contra un servidor ya levantado (RSS solo si se indica --server-pid)
+    python bench/loadtest.py --url http://127.0.0.1:8000/mcp --server-pid 1234
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_tools import SCENARIO_TOOLS, build_scenarios, percentile  # noqa: E402
+from fake_odoo import FakeOdoo, configure_env  # noqa: E402
+
+
+def rss_kib(pid: int) -> Optional[int]:
+    """RSS del proceso en KiB (Linux /proc; None si no está disponible)."""
+    try:
+        with open(f"/proc/{pid}/status") as fh:
+            for line in fh:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_health(base: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"{base}/health", timeout=1) as r:
+                if r.status == 200:
+                    return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"el servidor no respondió /health en {timeout}s")
+
+
+def parse_mix(items: List[str]) -> Dict[str, float]:
+    mix = {}
+    for item in items:
+        name, _, weight = item.partition("=")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+async def session_worker(url: str, mix: Dict[str, float], scenarios, deadline: float, seed: int,
+                         latencies: Dict[str, List[float]], errors: Dict[str, int]) -> None:
+    from mcp import ClientSession
+    from mcp.client.streamable_http import streamablehttp_client
+
+    rnd = random.Random(seed)
+    names = list(mix)
+    weights = [mix[n] for n in names]
+    try:
+        async with streamablehttp_client(url) as (read, write, _):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+                i = 0
+                while time.monotonic() < deadline:
+                    name = rnd.choices(names, weights)[0]
+                    tool = SCENARIO_TOOLS.get(name, name)
+                    args = scenarios[name](rnd, seed * 1000000 + i)
+                    i += 1
+                    t0 = time.perf_counter()
+                    try:
+                        result = await session.call_tool(tool, args)
+                        if result.isError:
+                            errors[name] += 1
+                    except Exception:
+                        errors[name] += 1
+                    latencies[name].append(time.perf_counter() - t0)
+    except Exception:
+        errors["session"] += 1
+
+
+async def monitor_rss(pid: Optional[int], stop: asyncio.Event, samples: List[int]) -> None:
+    while pid and not stop.is_set():
+        value = rss_kib(pid)
+        if value is not None:
+            samples.append(value)
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=1.0)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def run(url: str, pid: Optional[int], sessions: int, duration: float, ramp: float,
+              mix: Dict[str, float], scenarios, fake: Optional[FakeOdoo] = None) -> None:
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    samples: List[int] = []
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(monitor_rss(pid, stop, samples))
+    start = time.monotonic()
+    deadline = start + ramp + duration
+
+    async def delayed(i: int):
+        await asyncio.sleep(ramp * i / max(1, sessions))
+        await session_worker(url, mix, scenarios, deadline, i + 1, latencies, errors)
+
+    await asyncio.gather(*(delayed(i) for i in range(sessions)))
+    wall = time.monotonic() - start
+    stop.set()
+    await monitor
+
+    all_lat = [v for vals in latencies.values() for v in vals]
+    total = len(all_lat)
+    total_err = sum(errors.values())
+    print(f"\nsesiones={sessions} duración={wall:.1f}s llamadas={total} "
+          f"throughput={total / wall:.1f} req/s errores={total_err} ({100.0 * total_err / max(1, total):.2f}%)")
+    print(f"{'tool':<22} {'calls':>7} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'errores':>8}")
+    for name in sorted(latencies):
+        vals = latencies[name]
+        print(f"{name:<22} {len(vals):>7} {percentile(vals, 50) * 1000:>9.1f} "
+              f"{percentile(vals, 90) * 1000:>9.1f} {percentile(vals, 99) * 1000:>9.1f} {errors.get(name, 0):>8}")
+    print(f"{'(todas)':<22} {total:>7} {percentile(all_lat, 50) * 1000:>9.1f} "
+          f"{percentile(all_lat, 90) * 1000:>9.1f} {percentile(all_lat, 99) * 1000:>9.1f} {total_err:>8}")
+    if errors.get("session"):
+        print(f"sesiones fallidas: {errors['session']}")
+    if samples:
+        print(f"RSS servidor: inicio={samples[0] / 1024:.1f} MiB pico={max(samples) / 1024:.1f} MiB "
+              f"final={samples[-1] / 1024:.1f} MiB crecimiento={(samples[-1] - samples[0]) / 1024:+.1f} MiB")
+    if fake is not None:
+        # Carga generada sobre Odoo: debe crecer con las llamadas, no con los workers
+        calls = dict(fake.calls)
+        top = ", ".join(f"{k}={v}" for k, v in sorted(calls.items(), key=lambda kv: -kv[1])[:6])
+        print(f"RPC a Odoo: {sum(calls.values())} ({sum(calls.values()) / max(1, total):.2f} por llamada) · {top}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga MCP Streamable HTTP")
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=20.0, help="segundos de carga tras el ramp-up")
+    parser.add_argument("--ramp", type=float, default=2.0, help="segundos para abrir todas las sesiones")
+    parser.add_argument("--mix", nargs="+", default=["list_tasks=3", "fetch=5", "search=2", "get_sale=2"],
+                        help="tool=peso (escenarios de bench_tools)")
+    parser.add_argument("--url", default=None, help="endpoint MCP externo (omite FakeOdoo y uvicorn)")
+    parser.add_argument("--server-pid", type=int, default=None, help="pid del servidor externo para medir RSS")
+    parser.add_argument("--latency-ms", type=float, default=10.0)
+    parser.add_argument("--rows-tasks", type=int, default=2000)
+    parser.add_argument("--rows-sales", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=1, help="workers de uvicorn del servidor local")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    fake = FakeOdoo(latency_ms=args.latency_ms, tasks=args.rows_tasks, sales=args.rows_sales).start()
+    scenarios = build_scenarios(fake)
+    unknown = [n for n in mix if n not in scenarios]
+    if unknown:
+        parser.error(f"tools desconocidas en --mix: {unknown} (disponibles: {list(scenarios)})")
+
+    proc = None
+    try:
+        if args.url:
+            url, pid = args.url, args.server_pid
+        else:
+            port = free_port()
+            # uvicorn toma los workers de WEB_CONCURRENCY, que también activa el cache compartido
+            env = {**os.environ, **configure_env(fake.url), "WEB_CONCURRENCY": str(args.workers)}
+            proc = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "server:app", "--host", "127.0.0.1",
+                 "--port", str(port), "--log-level", "warning"],
+                cwd=ROOT, env=env,
+            )
+            base = f"http://127.0.0.1:{port}"
+            wait_health(base)
+            url, pid = f"{base}/mcp", proc.pid
+        print(f"MCP {url} · FakeOdoo {fake.url} (latencia {args.latency_ms} ms) · mezcla {mix}")
+        asyncio.run(run(url, pid, args.sessions, args.duration, args.ramp, mix, scenarios,
+                        None if args.url else fake))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=10)
+        fake.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+# bench/replay.py
+"""
+Reproduce las llamadas a tools grabadas en un cassette (ver cassette.py)
+contra el servidor real, respondiendo los RPC desde el mismo cassette.
+
+No necesita Odoo ni red: sirve para comparar el rendimiento de las tools
+entre versiones con la misma carga (p.ej. la de producción). Reporta
+p50/p99/media por tool junto a la duración grabada y, con `--baseline`, la
+diferencia contra un resultado anterior guardado con `--out`.
+
+Uso:
+    # 1) grabar (servidor apuntando a Odoo real)
+    ODOO_CASSETTE_MODE=record ODOO_CASSETTE=prod.jsonl uvicorn server:app
+
+    # 2) reproducir en cada versión y comparar
+    python bench/replay.py prod.jsonl --out antes.json
+    git checkout mi-rama
+    python bench/replay.py prod.jsonl --baseline antes.json --latency 1
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_tools import percentile  # noqa: E402
+
+
+async def run_client(server_mod, calls: List[Tuple[str, Dict[str, Any], float]],
+                     latencies: Dict[str, List[float]], errors: List[str]) -> None:
+    from mcp.shared.memory import create_connected_server_and_client_session
+
+    async with create_connected_server_and_client_session(server_mod.mcp._mcp_server) as client:
+        for tool, arguments, _ in calls:
+            t0 = time.perf_counter()
+            try:
+                result = await client.call_tool(tool, arguments)
+                if result.isError:
+                    errors.append(f"{tool}: {result.content[0].text if result.content else 'error'}")
+            except Exception as e:  # transporte/cliente
+                errors.append(f"{tool}: {e!r}")
+            latencies[tool].append(time.perf_counter() - t0)
+
+
+async def replay(server_mod, calls, clients: int) -> Tuple[Dict[str, List[float]], List[str], float]:
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: List[str] = []
+    t0 = time.perf_counter()
+    # Reparto round-robin: cada cliente conserva el orden relativo de sus llamadas
+    await asyncio.gather(*(
+        run_client(server_mod, calls[i::clients], latencies, errors) for i in range(clients)
+    ))
+    return latencies, errors, time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reproduce un cassette de tráfico Odoo contra las tools")
+    parser.add_argument("cassette", help="archivo grabado con ODOO_CASSETTE_MODE=record")
+    parser.add_argument("--clients", type=int, default=1, help="clientes MCP concurrentes")
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="multiplicador de la latencia RPC grabada (0 = sin espera, 1 = original)")
+    parser.add_argument("--tools", nargs="+", default=None, help="solo estas tools")
+    parser.add_argument("--out", default=None, help="guarda el resultado (JSON) para usarlo como --baseline")
+    parser.add_argument("--baseline", default=None, help="resultado anterior con el que comparar")
+    args = parser.parse_args()
+
+    os.environ["ODOO_CASSETTE_MODE"] = "replay"
+    os.environ["ODOO_CASSETTE"] = args.cassette
+    os.environ["ODOO_CASSETTE_LATENCY"] = str(args.latency)
+    # OdooClient exige conexión configurada; en replay no se usa
+    for name, value in {"ODOO_URL": "http://cassette.invalid", "ODOO_DB": "cassette",
+                        "ODOO_LOGIN": "cassette", "ODOO_API_KEY": "cassette"}.items():
+        os.environ.setdefault(name, value)
+    os.environ.setdefault("CACHE_INVALIDATION_POLL", "0")
+
+    import cassette
+    import server
+
+    calls = cassette.tool_calls(args.cassette)
+    if args.tools:
+        calls = [c for c in calls if c[0] in args.tools]
+    if not calls:
+        parser.error(f"{args.cassette} no tiene llamadas a tools grabadas")
+    recorded: Dict[str, List[float]] = defaultdict(list)
+    for tool, _, ms in calls:
+        recorded[tool].append(ms / 1000.0)
+
+    server.init_tools_once()
+    latencies, errors, wall = asyncio.run(replay(server, calls, args.clients))
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as fh:
+            baseline = json.load(fh)["tools"]
+
+    results: Dict[str, Dict[str, float]] = {}
+    print(f"{args.cassette} · {len(calls)} llamadas · {args.clients} clientes · latencia x{args.latency} · {wall:.2f}s")
+    print(f"{'tool':<22} {'calls':>6} {'p50 ms':>9} {'p99 ms':>9} {'media ms':>9} {'grabado':>9} {'vs base':>8}")
+    for tool in sorted(latencies):
+        values = latencies[tool]
+        r = results[tool] = {
+            "calls": len(values),
+            "p50_ms": percentile(values, 50) * 1000,
+            "p99_ms": percentile(values, 99) * 1000,
+            "mean_ms": statistics.fmean(values) * 1000,
+        }
+        recorded_ms = statistics.fmean(recorded[tool]) * 1000
+        delta = ""
+        if tool in baseline and baseline[tool]["mean_ms"]:
+            delta = f"{(r['mean_ms'] / baseline[tool]['mean_ms'] - 1) * 100:+.1f}%"
+        print(f"{tool:<22} {r['calls']:>6} {r['p50_ms']:>9.1f} {r['p99_ms']:>9.1f} "
+              f"{r['mean_ms']:>9.1f} {recorded_ms:>9.1f} {delta:>8}")
+    if errors:
+        print(f"errores: {len(errors)} · primero: {errors[0][:160]}")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as fh:
+            json.dump({"cassette": args.cassette, "latency": args.latency, "clients": args.clients,
+                       "wall_s": wall, "errors": len(errors), "tools": results}, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+# cassette.py
+"""Grabación y reproducción del tráfico RPC con Odoo (cassettes).
+
+Con `ODOO_CASSETTE_MODE=record` cada `execute_kw` (y la autenticación)
+se agrega a `ODOO_CASSETTE` como una línea JSON con el request, la
+respuesta decodificada (o el Fault / error de transporte) y su duración.
+También se graban las llamadas a tools (nombre, argumentos y duración), así
+`bench/replay.py` puede repetir la misma carga después.
+
+Con `ODOO_CASSETTE_MODE=replay` `OdooClient` no abre conexiones: responde
+desde el cassette. Cada request idéntico recibe las respuestas en el orden
+en que se grabaron, y cuando se acaban se repite la última. Si un request no
+está en el cassette se lanza `CassetteMiss`. `ODOO_CASSETTE_LATENCY`
+multiplica la duración original (0 = sin espera, 1 = latencia original).
+
+La clave de un request es (env, modelo, método, args, kwargs). La URL, la
+base y las credenciales quedan fuera: el password nunca se graba, y un
+cassette de producción se reproduce con cualquier configuración local.
+Los datos de negocio sí quedan en el archivo; trátalo como un volcado.
+
+Se graban resultados decodificados: el mismo cassette sirve con cualquier
+`OFFLOAD_MODE` (las llamadas raw se reconstruyen como XML-RPC).
+"""
+import base64
+import json
+import os
+import threading
+import time
+import xmlrpc.client
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+CASSETTE_MODE = os.getenv("ODOO_CASSETTE_MODE", "").lower()
+CASSETTE_PATH = os.getenv("ODOO_CASSETTE", "odoo-cassette.jsonl")
+CASSETTE_LATENCY = float(os.getenv("ODOO_CASSETTE_LATENCY", "0"))
+
+MODES = ("record", "replay")
+
+
+class CassetteMiss(LookupError):
+    """El request no está en el cassette que se reproduce."""
+
+
+def _json_default(obj: Any) -> Any:
+    if isinstance(obj, xmlrpc.client.DateTime):
+        return obj.value
+    if isinstance(obj, xmlrpc.client.Binary):
+        return base64.b64encode(obj.data).decode("ascii")
+    if isinstance(obj, bytes):
+        return obj.decode("utf-8", "replace")
+    return str(obj)
+
+
+def _request_key(env: str, model: str, method: str, args: Any, kwargs: Any) -> str:
+    # sort_keys: el orden de los kwargs no cambia el request
+    return json.dumps([env, model, method, args, kwargs], sort_keys=True, default=_json_default)
+
+
+def _encode_raw(entry: Dict[str, Any]) -> bytes:
+    """Respuesta XML-RPC equivalente a la grabada (para `execute_kw_raw`)."""
+    if "fault" in entry:
+        body = xmlrpc.client.dumps(xmlrpc.client.Fault(*entry["fault"]), methodresponse=True)
+    else:
+        body = xmlrpc.client.dumps((entry["result"],), methodresponse=True, allow_none=True)
+    return body.encode("utf-8", "xmlcharrefreplace")
+
+
+def _raise_recorded(entry: Dict[str, Any]) -> None:
+    if "fault" in entry:
+        raise xmlrpc.client.Fault(*entry["fault"])
+    error = entry["error"]
+    if error.get("errcode") is not None:
+        raise xmlrpc.client.ProtocolError(error.get("url", ""), error["errcode"], error["message"], {})
+    if error["type"] in ("timeout", "TimeoutError"):
+        raise TimeoutError(error["message"])
+    raise ConnectionError(f"{error['type']}: {error['message']}")
+
+
+class Cassette:
+    """Cassette en modo `record` (agrega líneas) o `replay` (responde desde el archivo)."""
+
+    def __init__(self, path: str, mode: str, latency: float = 0.0):
+        if mode not in MODES:
+            raise ValueError(f"ODOO_CASSETTE_MODE inválido: {mode!r} ({'|'.join(MODES)})")
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        self._lock = threading.Lock()
+        self._start = time.monotonic()
+        # replay: clave → respuestas en orden, y cuántas se consumieron
+        self._entries: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self._served: Dict[str, int] = defaultdict(int)
+        self._fh = None
+        if mode == "record":
+            self._fh = open(path, "a", encoding="utf-8")
+        else:
+            for entry in iter_entries(path):
+                if entry.get("type") == "rpc":
+                    self._entries[entry["key"]].append(entry)
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    def _append(self, entry: Dict[str, Any]) -> None:
+        entry["at"] = round(time.monotonic() - self._start, 6)
+        line = json.dumps(entry, default=_json_default, ensure_ascii=False)
+        with self._lock:
+            self._fh.write(line + "\n")
+            self._fh.flush()
+
+    def call(self, env: str, model: str, method: str, args: Any, kwargs: Any,
+             call: Callable[[], Any], raw: bool = False) -> Any:
+        """Graba `call()` o responde desde el cassette según el modo."""
+        key = _request_key(env, model, method, args, kwargs)
+        if self.replaying:
+            return self._replay(key, model, method, raw)
+        start = time.perf_counter()
+        entry: Dict[str, Any] = {"type": "rpc", "key": key, "env": env, "model": model, "method": method}
+        try:
+            result = call()
+        except xmlrpc.client.Fault as e:
+            entry["fault"] = [e.faultCode, e.faultString]
+            raise
+        except Exception as e:
+            entry["error"] = {"type": type(e).__name__, "message": str(e),
+                              "errcode": getattr(e, "errcode", None), "url": getattr(e, "url", None)}
+            raise
+        else:
+            if raw:
+                # Se graba decodificado; un Fault viene dentro del cuerpo
+                try:
+                    entry["result"] = xmlrpc.client.loads(result)[0][0]
+                except xmlrpc.client.Fault as e:
+                    entry["fault"] = [e.faultCode, e.faultString]
+            else:
+                entry["result"] = result
+            return result
+        finally:
+            entry["ms"] = round((time.perf_counter() - start) * 1000, 3)
+            self._append(entry)
+
+    def _replay(self, key: str, model: str, method: str, raw: bool) -> Any:
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                raise CassetteMiss(f"{model}.{method} no está en el cassette {self.path}")
+            index = min(self._served[key], len(entries) - 1)
+            self._served[key] += 1
+        entry = entries[index]
+        if self.latency > 0:
+            time.sleep(entry.get("ms", 0) / 1000.0 * self.latency)
+        if "error" in entry:
+            _raise_recorded(entry)
+        if raw:
+            return _encode_raw(entry)
+        if "fault" in entry:
+            _raise_recorded(entry)
+        return entry["result"]
+
+    def record_tool(self, name: str, arguments: Dict[str, Any], ms: float, status: str) -> None:
+        if self.mode == "record":
+            self._append({"type": "tool", "name": name, "arguments": arguments,
+                          "ms": round(ms, 3), "status": status})
+
+
+def iter_entries(path: str) -> Iterator[Dict[str, Any]]:
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            if line.strip():
+                yield json.loads(line)
+
+
+def tool_calls(path: str) -> List[Tuple[str, Dict[str, Any], float]]:
+    """(tool, argumentos, ms grabados) de las llamadas a tools del cassette, en orden."""
+    return [(e["name"], e["arguments"], e["ms"]) for e in iter_entries(path) if e.get("type") == "tool"]
+
+
+_cassette: Optional[Cassette] = None
+_cassette_lock = threading.Lock()
+
+
+def get_cassette() -> Optional[Cassette]:
+    """Cassette del proceso según ODOO_CASSETTE_MODE (None si está apagado)."""
+    global _cassette
+    if not CASSETTE_MODE:
+        return None
+    with _cassette_lock:
+        if _cassette is None:
+            _cassette = Cassette(CASSETTE_PATH, CASSETTE_MODE, CASSETTE_LATENCY)
+        return _cassette
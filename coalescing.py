@@ -0,0 +1,150 @@
+# coalescing.py
+"""Agrupación de escrituras repetidas sobre un mismo registro.
+
+Los agentes suelen llamar `dev_update_sale` varias veces seguidas sobre la
+misma orden, un campo a la vez. Con `DEV_WRITE_COALESCE_MS` > 0 cada
+escritura queda pendiente y se fusiona con las siguientes al mismo
+registro; un solo `write` sale al vencer la ventana (contada desde la
+primera escritura pendiente) o antes, con `flush` explícito o al leer el
+registro, de modo que una lectura siempre ve las escrituras previas.
+
+Si el `write` diferido falla, el error se reporta en la siguiente
+escritura, lectura o flush de ese registro.
+
+Al apagar el worker (shutdown del lifespan ASGI) `flush_all` envía lo que
+quede pendiente en todos los buffers y espera los `write` en curso: una
+escritura respondida con `pending: True` no se pierde por un reinicio.
+
+El buffer vive en el proceso: con varios workers una lectura podría caer en
+otro, así que la agrupación solo se activa con `WEB_CONCURRENCY=1`.
+"""
+import os
+import threading
+import time
+import weakref
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import metrics
+from shared_cache import KeyedLocks, worker_count
+
+Key = Tuple[str, int]
+
+
+def coalesce_window() -> float:
+    """Ventana en segundos (0 = escrituras inmediatas)."""
+    window = float(os.getenv("DEV_WRITE_COALESCE_MS", "0")) / 1000.0
+    if window > 0 and worker_count() > 1:
+        print("[WARN] DEV_WRITE_COALESCE_MS ignorado: requiere un solo worker (WEB_CONCURRENCY=1)")
+        return 0.0
+    return window
+
+
+def merge_values(pending: Dict[str, Any], values: Dict[str, Any]) -> None:
+    """Fusiona `values` en `pending`: el último valor gana, los comandos x2many se acumulan."""
+    for field, value in values.items():
+        previous = pending.get(field)
+        if isinstance(previous, list) and isinstance(value, list) and all(
+            isinstance(cmd, (list, tuple)) for cmd in previous + value
+        ):
+            pending[field] = previous + value
+        else:
+            pending[field] = value
+
+
+class WriteCoalescer:
+    """Buffer de `write` por (modelo, id) con ventana de tiempo."""
+
+    def __init__(self, write: Callable[[str, int, Dict[str, Any]], Any], window: float, env: str = "dev"):
+        self._write = write
+        self.window = window
+        self.env = env
+        self._pending: Dict[Key, Dict[str, Any]] = {}
+        self._errors: Dict[Key, Exception] = {}
+        self._lock = threading.Lock()
+        # Avisa cuando termina un write en curso (flush_all lo espera)
+        self._idle = threading.Condition(self._lock)
+        self._flushing = 0
+        # Serializa los flush de un mismo registro (timer vs. lectura)
+        self._key_locks = KeyedLocks()
+        _coalescers.add(self)
+
+    def _raise_error(self, key: Key) -> None:
+        with self._lock:
+            error = self._errors.pop(key, None)
+        if error is not None:
+            raise RuntimeError(f"La escritura diferida de {key[0]} {key[1]} falló: {error}") from error
+
+    def write(self, model: str, record_id: int, values: Dict[str, Any]) -> int:
+        """Encola `values`; devuelve cuántas escrituras lleva pendientes el registro."""
+        key = (model, int(record_id))
+        self._raise_error(key)
+        with self._lock:
+            entry = self._pending.get(key)
+            if entry is None:
+                timer = threading.Timer(self.window, self._flush_in_background, args=(key,))
+                timer.daemon = True
+                entry = self._pending[key] = {"values": {}, "writes": 0, "timer": timer}
+                timer.start()
+            else:
+                metrics.WRITES_COALESCED.inc(env=self.env, model=model)
+            merge_values(entry["values"], values)
+            entry["writes"] += 1
+            return entry["writes"]
+
+    def _flush(self, key: Key) -> Optional[Any]:
+        with self._key_locks.hold(key):
+            with self._lock:
+                entry = self._pending.pop(key, None)
+                if entry is None:
+                    return None
+                self._flushing += 1
+            try:
+                entry["timer"].cancel()
+                return self._write(key[0], key[1], entry["values"])
+            finally:
+                with self._lock:
+                    self._flushing -= 1
+                    self._idle.notify_all()
+
+    def _flush_in_background(self, key: Key) -> None:
+        try:
+            self._flush(key)
+        except Exception as e:
+            with self._lock:
+                self._errors[key] = e
+            print(f"[WARN] escritura diferida de {key[0]} {key[1]} falló: {e!r}")
+
+    def flush(self, model: str, record_id: int) -> Optional[Any]:
+        """Envía ya lo pendiente del registro (None si no había nada)."""
+        key = (model, int(record_id))
+        result = self._flush(key)
+        self._raise_error(key)
+        return result
+
+    def flush_all(self, timeout: float = 30.0) -> int:
+        """
+        Envía lo pendiente de todos los registros y espera (hasta `timeout`)
+        los write que ya estaban en curso; devuelve cuántos registros envió.
+        """
+        with self._lock:
+            keys = list(self._pending)
+        for key in keys:
+            self._flush_in_background(key)
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            while self._flushing:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    print(f"[WARN] {self._flushing} escrituras diferidas siguen en curso al apagar")
+                    break
+                self._idle.wait(remaining)
+        return len(keys)
+
+
+# Buffers vivos del proceso (para vaciarlos al apagar)
+_coalescers: "weakref.WeakSet[WriteCoalescer]" = weakref.WeakSet()
+
+
+def flush_all(timeout: float = 30.0) -> int:
+    """Vacía todos los buffers del proceso (shutdown); devuelve cuántos registros envió."""
+    return sum(c.flush_all(timeout) for c in list(_coalescers))
@@ -0,0 +1,91 @@
+# domains.py
+"""Construcción de dominios de Odoo para filtros de fecha e importe.
+
+Los filtros se traducen a condiciones del dominio de `search_read`, así la
+base de datos filtra y solo viajan las filas pedidas. Las fechas se aceptan
+como `YYYY-MM-DD` (o `YYYY-MM-DD HH:MM:SS` para campos datetime); en un
+campo datetime un `date_to` sin hora incluye el día completo.
+
+Odoo guarda los datetime en UTC: con `tz` (nombre IANA, p. ej.
+`America/Mexico_City`) los límites se interpretan en esa zona y se convierten a
+UTC; sin `tz` los días son días UTC.
+"""
+import datetime
+from typing import Any, List, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+DATE_FMT = "%Y-%m-%d"
+DATETIME_FMT = "%Y-%m-%d %H:%M:%S"
+
+
+def _parse(value: str, name: str) -> datetime.datetime:
+    for fmt in (DATETIME_FMT, DATE_FMT):
+        try:
+            return datetime.datetime.strptime(value.strip(), fmt)
+        except ValueError:
+            continue
+    raise ValueError(f"{name} inválido: {value!r} (usa YYYY-MM-DD)")
+
+
+def _zone(tz: Optional[str]) -> Optional[ZoneInfo]:
+    if not tz:
+        return None
+    try:
+        return ZoneInfo(tz)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"tz inválida: {tz!r} (usa un nombre IANA, p. ej. America/Mexico_City)") from None
+
+
+def _to_utc(value: datetime.datetime, zone: Optional[ZoneInfo]) -> str:
+    """Hora local de `zone` → texto UTC como lo guarda Odoo."""
+    if zone is not None:
+        value = value.replace(tzinfo=zone).astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return value.strftime(DATETIME_FMT)
+
+
+def date_range(field: str, date_from: Optional[str] = None, date_to: Optional[str] = None,
+               is_datetime: bool = False, tz: Optional[str] = None) -> List[List[Any]]:
+    """Condiciones `field >= date_from` y `field <= date_to` (ambos extremos incluidos)."""
+    domain: List[List[Any]] = []
+    start = _parse(date_from, "date_from") if date_from else None
+    end = _parse(date_to, "date_to") if date_to else None
+    if start and end and start > end:
+        raise ValueError(f"date_from ({date_from}) es posterior a date_to ({date_to})")
+    zone = _zone(tz) if is_datetime else None
+    if start:
+        domain.append([field, ">=", _to_utc(start, zone) if is_datetime else start.strftime(DATE_FMT)])
+    if end:
+        if not is_datetime:
+            domain.append([field, "<=", end.strftime(DATE_FMT)])
+        elif len(date_to.strip()) == 10:
+            # Solo fecha: hasta el final de ese día (en la zona pedida)
+            domain.append([field, "<", _to_utc(end + datetime.timedelta(days=1), zone)])
+        else:
+            domain.append([field, "<=", _to_utc(end, zone)])
+    return domain
+
+
+def amount_range(field: str, amount_min: Optional[float] = None,
+                 amount_max: Optional[float] = None) -> List[List[Any]]:
+    """Condiciones `amount_min <= field <= amount_max`."""
+    if amount_min is not None and amount_max is not None and amount_min > amount_max:
+        raise ValueError(f"amount_min ({amount_min}) es mayor que amount_max ({amount_max})")
+    domain: List[List[Any]] = []
+    if amount_min is not None:
+        domain.append([field, ">=", float(amount_min)])
+    if amount_max is not None:
+        domain.append([field, "<=", float(amount_max)])
+    return domain
+
+
+def overdue(field: str, today: Optional[datetime.date] = None, is_datetime: bool = False,
+            tz: Optional[str] = None) -> List[List[Any]]:
+    """Vencidos: `field` anterior a hoy (los registros sin fecha no califican)."""
+    zone = _zone(tz)
+    today = today or datetime.datetime.now(zone).date()
+    if is_datetime:
+        # Antes de la medianoche local de hoy, expresada en UTC
+        bound = _to_utc(datetime.datetime.combine(today, datetime.time()), zone)
+    else:
+        bound = today.strftime(DATE_FMT)
+    return [[field, "!=", False], [field, "<", bound]]
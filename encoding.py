@@ -0,0 +1,115 @@
+# encoding.py
+"""Codificación compacta de resultados para reducir bytes y tokens.
+
+Formato columnar:
+    {"fields": ["id", "name", "partner_id"],
+     "rows": [[1, "S00001", 10], [2, "S00002", 10]],
+     "refs": {"partner_id": {"10": "ACME"}}}
+
+Los many2one (`[id, "Nombre"]`) y listas de ellos se reemplazan por sus ids
+y el nombre se guarda una sola vez en `refs[campo]`.
+
+`dumps` es el serializador JSON común: usa orjson si está instalado (o si
+`JSON_BACKEND=orjson`) y cae a la librería estándar en otro caso.
+"""
+import json
+import os
+from typing import Any, Dict, Iterable, List
+
+from mcp.types import CallToolResult, TextContent
+
+try:  # backend rápido opcional
+    import orjson
+except ImportError:  # pragma: no cover - depende del entorno
+    orjson = None
+
+JSON_BACKEND = os.getenv("JSON_BACKEND", "auto").lower()
+if JSON_BACKEND not in ("auto", "orjson", "stdlib"):
+    raise ValueError(f"JSON_BACKEND inválido: {JSON_BACKEND!r} (auto|orjson|stdlib)")
+if JSON_BACKEND == "orjson" and orjson is None:
+    raise ImportError("JSON_BACKEND=orjson pero orjson no está instalado")
+_use_orjson = orjson is not None and JSON_BACKEND != "stdlib"
+
+
+def _orjson_default(obj: Any) -> Any:
+    # Tipos que orjson no serializa de forma nativa (p.ej. Decimal, modelos pydantic)
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump(mode="json")
+    return str(obj)
+
+
+def dumps(obj: Any, compact: bool = False) -> str:
+    """
+    Serializa `obj` a JSON (UTF-8 sin escapar, como `ensure_ascii=False`).
+
+    Con orjson la salida siempre es compacta; con la librería estándar
+    `compact=True` elimina los espacios tras `,` y `:`.
+    """
+    if _use_orjson:
+        return orjson.dumps(obj, default=_orjson_default).decode("utf-8")
+    separators = (",", ":") if compact else None
+    return json.dumps(obj, ensure_ascii=False, separators=separators, default=str)
+
+
+def _is_ref(value: Any) -> bool:
+    return (
+        isinstance(value, (list, tuple))
+        and len(value) == 2
+        and isinstance(value[0], int)
+        and not isinstance(value[0], bool)
+        and isinstance(value[1], str)
+    )
+
+
+def _compact_value(value: Any, refs: Dict[str, str]) -> Any:
+    if _is_ref(value):
+        refs[str(value[0])] = value[1]
+        return value[0]
+    if isinstance(value, list) and value and all(_is_ref(v) for v in value):
+        for v in value:
+            refs[str(v[0])] = v[1]
+        return [v[0] for v in value]
+    return value
+
+
+def compact_rows(rows: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Convierte una lista de dicts al formato columnar con tabla de referencias."""
+    rows = list(rows)
+    fields: List[str] = []
+    seen = set()
+    for r in rows:
+        for k in r:
+            if k not in seen:
+                seen.add(k)
+                fields.append(k)
+
+    refs: Dict[str, Dict[str, str]] = {}
+    out_rows = []
+    for r in rows:
+        out = []
+        for f in fields:
+            out.append(_compact_value(r.get(f), refs.setdefault(f, {})))
+        out_rows.append(out)
+
+    return {
+        "fields": fields,
+        "rows": out_rows,
+        "refs": {f: m for f, m in refs.items() if m},
+    }
+
+
+def tool_result(data: Any, compact: bool = False) -> CallToolResult:
+    """
+    Resultado MCP con un único bloque de texto serializado con `dumps`
+    (FastMCP generaría un bloque indentado por elemento) y el mismo objeto
+    como structuredContent (`{"result": data}`).
+    """
+    return CallToolResult(
+        content=[TextContent(type="text", text=dumps(data, compact=compact))],
+        structuredContent={"result": data},
+    )
+
+
+def compact_tool_result(rows: Iterable[Dict[str, Any]]) -> CallToolResult:
+    """Resultado MCP en formato columnar (ver `compact_rows`)."""
+    return tool_result(compact_rows(rows), compact=True)
@@ -0,0 +1,142 @@
+# htmltext.py
+"""Texto plano de campos HTML de Odoo (p.ej. `project.task.description`).
+
+Las descripciones llegan como HTML del editor de Odoo, a veces de cientos
+de KB por imágenes embebidas (`data:` URIs). `html_to_text` deja solo el
+texto: bloques y `<br>` como saltos de línea, `<li>` como viñetas, los
+enlaces con su URL y las imágenes como `[imagen: alt]` (o nada si no tienen
+`alt`); `<script>`/`<style>` se descartan.
+
+El texto extraído se cachea por (registro, `write_date`): mientras el
+registro no cambie no se vuelve a parsear el mismo HTML, y una edición
+genera otra clave, así que no hace falta invalidar. `peek_text` permite
+consultar ese cache antes de pedir el HTML a Odoo, así recorrer una
+descripción larga por tramos no la descarga entera en cada tramo. `text_range` corta el
+texto en `[offset, offset + max_chars)` y devuelve el `next_offset` para
+pedir el tramo siguiente.
+"""
+import html
+import os
+import re
+from html.parser import HTMLParser
+from typing import Any, Dict, List, Optional
+
+import metrics
+from shared_cache import get_cache
+
+TEXT_CACHE_TTL = float(os.getenv("TEXT_CACHE_TTL", "3600"))
+# Máximo de caracteres de una descripción por respuesta (0 = sin límite)
+TEXT_MAX_CHARS = int(os.getenv("TEXT_MAX_CHARS", "20000"))
+
+_BLOCK_TAGS = {
+    "p", "div", "section", "article", "header", "footer", "blockquote", "pre",
+    "h1", "h2", "h3", "h4", "h5", "h6", "ul", "ol", "table", "tr", "hr",
+}
+_SKIP_TAGS = {"script", "style", "head", "title"}
+_SPACES_RE = re.compile(r"[ \t\r\f\v\xa0]+")
+_BLANK_LINES_RE = re.compile(r"\n{3,}")
+
+
+class _TextParser(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: List[str] = []
+        self._skip = 0
+        self._href: Optional[str] = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _SKIP_TAGS:
+            self._skip += 1
+        elif tag == "br":
+            self.parts.append("\n")
+        elif tag == "li":
+            self.parts.append("\n- ")
+        elif tag in ("td", "th"):
+            self.parts.append(" | ")
+        elif tag in _BLOCK_TAGS:
+            self.parts.append("\n\n")
+        elif tag == "img":
+            alt = (dict(attrs).get("alt") or "").strip()
+            if alt:
+                self.parts.append(f"[imagen: {alt}]")
+        elif tag == "a":
+            href = dict(attrs).get("href") or ""
+            self._href = href if href.startswith(("http://", "https://")) else None
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag in _SKIP_TAGS:
+            self._skip -= 1
+
+    def handle_endtag(self, tag):
+        if tag in _SKIP_TAGS:
+            self._skip = max(0, self._skip - 1)
+        elif tag in _BLOCK_TAGS:
+            self.parts.append("\n\n")
+        elif tag == "a" and self._href:
+            self.parts.append(f" <{self._href}>")
+            self._href = None
+
+    def handle_data(self, data):
+        if not self._skip:
+            self.parts.append(data)
+
+
+def html_to_text(value: Any) -> str:
+    """Texto plano de un valor HTML de Odoo ("" si viene vacío / False)."""
+    if not value:
+        return ""
+    value = str(value)
+    if "<" not in value:
+        # Texto plano (campos text o descripciones antiguas)
+        return html.unescape(value).strip()
+    parser = _TextParser()
+    parser.feed(value)
+    parser.close()
+    lines = [_SPACES_RE.sub(" ", line).strip() for line in "".join(parser.parts).split("\n")]
+    return _BLANK_LINES_RE.sub("\n\n", "\n".join(lines)).strip()
+
+
+def _text_key(odoo, model: str, record_id: int, write_date: Any) -> str:
+    return f"text:{odoo.cache_prefix()}|{model}|{int(record_id)}|{write_date}"
+
+
+def cached_text(odoo, model: str, record_id: int, write_date: Any, value: Any) -> str:
+    """`html_to_text(value)` cacheado por (base, modelo, id, write_date)."""
+    if not write_date or TEXT_CACHE_TTL <= 0:
+        return html_to_text(value)
+    # También se cachea el texto vacío: `peek_text` evita releer el campo
+    key = _text_key(odoo, model, record_id, write_date)
+    return get_cache().get_or_load(key, TEXT_CACHE_TTL, lambda: html_to_text(value), name="text")
+
+
+def peek_text(odoo, model: str, record_id: int, write_date: Any) -> Optional[str]:
+    """Texto ya cacheado para esa versión del registro, o None (hay que leer el HTML)."""
+    if not write_date or TEXT_CACHE_TTL <= 0:
+        return None
+    text = get_cache().get(_text_key(odoo, model, record_id, write_date))
+    if text is not None:
+        metrics.cache_event("text", hit=True)
+    return text
+
+
+def text_range(text: str, offset: int = 0, max_chars: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Tramo `[offset, offset + max_chars)` de `text` y su posición:
+    {"text", "offset", "total_chars", "next_offset"} (`next_offset` None al final).
+    `max_chars` None usa `TEXT_MAX_CHARS`; 0 = sin límite.
+    """
+    if offset < 0:
+        raise ValueError(f"offset debe ser >= 0 (recibido {offset})")
+    if max_chars is None:
+        max_chars = TEXT_MAX_CHARS
+    if max_chars < 0:
+        raise ValueError(f"max_chars debe ser >= 0 (recibido {max_chars})")
+    total = len(text)
+    end = total if max_chars == 0 else min(total, offset + max_chars)
+    return {
+        "text": text[offset:end],
+        "offset": min(offset, total),
+        "total_chars": total,
+        "next_offset": end if end < total else None,
+    }
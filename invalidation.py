@@ -0,0 +1,231 @@
+# invalidation.py
+"""Invalidación de caches a partir de cambios en Odoo.
+
+Los caches sobre `OdooClient` (índice de nombres, `fields_get`) solo pueden
+usar TTL largos si se enteran de los cambios. Tres fuentes de avisos:
+
+- Escrituras propias: `OdooClient` avisa tras cada `create`/`write`/`unlink`/
+  `action_*` exitoso (p.ej. las tools `dev_*`).
+- Polling (`CACHE_INVALIDATION_POLL` segundos): `WriteDatePoller` consulta
+  los registros con `write_date` posterior al último visto en cada modelo
+  de `CACHE_INVALIDATION_MODELS`. No detecta borrados (quedan para el TTL o
+  el webhook). Con varios workers solo consulta Odoo el que tiene la reserva
+  `poller:<url|db>` del cache compartido; sus avisos descartan las entradas
+  compartidas, que es lo que leen los demás. Los cursores también viven en
+  el cache, así que si el líder muere el siguiente sigue desde donde quedó.
+- Webhook (`POST /invalidate`, ver server.app): acepta el payload de las
+  acciones "Enviar notificación webhook" de Odoo (`{"_model", "_id"}`) o
+  `{"model", "ids"}`; exige `CACHE_INVALIDATION_TOKEN`.
+
+Cada aviso `(prefijo url|db, modelo, ids)` se entrega a los suscriptores
+(`subscribe`), que descartan solo las entradas afectadas. Un cambio en
+`ir.model` / `ir.model.fields` descarta los esquemas cacheados de esa base.
+"""
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+import metrics
+import scheduling
+from shared_cache import get_cache
+
+INVALIDATION_POLL = float(os.getenv("CACHE_INVALIDATION_POLL", "0"))
+INVALIDATION_TOKEN = os.getenv("CACHE_INVALIDATION_TOKEN", "")
+# Máximo de registros cambiados que se leen por modelo y ronda de polling
+POLL_BATCH = int(os.getenv("CACHE_INVALIDATION_BATCH", "500"))
+# Vida de los cursores del polling en el cache compartido
+CURSOR_TTL = 7 * 86400.0
+
+WRITE_METHODS = {"create", "write", "unlink"}
+SCHEMA_MODELS = {"ir.model", "ir.model.fields"}
+
+Subscriber = Callable[[str, str, Optional[List[int]]], None]
+_subscribers: List[Subscriber] = []
+_subscribers_lock = threading.Lock()
+# prefijo url|db -> modelos que vigila un WriteDatePoller en marcha
+_polled: Dict[str, List[str]] = {}
+
+
+def subscribe(fn: Subscriber) -> None:
+    """Registra `fn(prefix, model, ids)`; `ids=None` significa todo el modelo."""
+    with _subscribers_lock:
+        _subscribers.append(fn)
+
+
+def notify(prefix: str, model: str, ids: Optional[List[int]] = None, source: str = "local") -> None:
+    """Propaga un cambio en `model` (base `prefix`) a los caches suscritos."""
+    metrics.CACHE_INVALIDATIONS.inc(model=model, source=source)
+    if model in SCHEMA_MODELS:
+        get_cache().delete_prefix(f"schema:{prefix}|")
+    with _subscribers_lock:
+        subscribers = list(_subscribers)
+    for fn in subscribers:
+        try:
+            fn(prefix, model, ids)
+        except Exception as e:
+            # Un suscriptor que falla no debe impedir la invalidación de los demás
+            print(f"[WARN] invalidación de {model} falló: {e!r}")
+
+
+def _as_ids(value: Any) -> Optional[List[int]]:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return [value]
+    if isinstance(value, (list, tuple)) and all(isinstance(v, int) and not isinstance(v, bool) for v in value):
+        return list(value)
+    return None
+
+
+def record_write(prefix: str, model: str, method: str, args: List[Any], result: Any) -> None:
+    """Aviso tras una escritura propia exitosa (llamado por OdooClient)."""
+    if method not in WRITE_METHODS and not method.startswith("action_"):
+        return
+    ids = _as_ids(result) if method == "create" else _as_ids(args[0] if args else None)
+    notify(prefix, model, ids, source="write")
+
+
+def parse_webhook(payload: Any) -> List[Dict[str, Any]]:
+    """
+    Normaliza el cuerpo de `POST /invalidate` a `[{"model", "ids"}]`.
+
+    Acepta un objeto o una lista de objetos, cada uno con `_model`/`_id`
+    (webhook nativo de Odoo) o `model` + `ids`/`id` (sin ids: todo el modelo).
+    """
+    items = payload if isinstance(payload, list) else [payload]
+    changes = []
+    for item in items:
+        if not isinstance(item, dict):
+            raise ValueError("cada aviso debe ser un objeto JSON")
+        model = item.get("_model") or item.get("model")
+        if not isinstance(model, str) or not model:
+            raise ValueError("falta 'model' (o '_model')")
+        raw_ids = item.get("_id", item.get("ids", item.get("id")))
+        ids = None if raw_ids is None else _as_ids(raw_ids)
+        if raw_ids is not None and ids is None:
+            raise ValueError(f"ids inválidos para {model}: {raw_ids!r}")
+        changes.append({"model": model, "ids": ids})
+    return changes
+
+
+class WriteDatePoller:
+    """Detecta registros modificados comparando `write_date` contra el último visto."""
+
+    def __init__(self, odoo, models: List[str], interval: float = 30.0, cache=None):
+        self.odoo = odoo
+        self.models = list(models)
+        self.interval = interval
+        self.cache = cache or get_cache()
+        # modelo -> (write_date más reciente, ids vistos con ese write_date)
+        self._cursors: Dict[str, Any] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # Un solo poller por base entre todos los workers (ver docstring del módulo)
+        self._owner = f"{os.getpid()}:{id(self)}"
+        self._lease_ttl = max(3 * interval, 10.0)
+        self.leader = False
+
+    def _lease_key(self) -> str:
+        return f"poller:{self.odoo.cache_prefix()}"
+
+    def _cursor_key(self, model: str) -> str:
+        return f"pollcursor:{self.odoo.cache_prefix()}|{model}"
+
+    def _lead(self) -> bool:
+        leader = self.cache.acquire_lease(self._lease_key(), self._owner, self._lease_ttl)
+        if leader and not self.leader:
+            # Otro worker pudo avanzar los cursores mientras este no era líder
+            self._cursors = {}
+            print(f"[INFO] polling de invalidación: worker {os.getpid()} es el líder de {self.odoo.cache_prefix()}")
+        self.leader = leader
+        return leader
+
+    def _load_cursor(self, model: str) -> bool:
+        saved = self.cache.get(self._cursor_key(model))
+        if saved is None:
+            return False
+        self._cursors[model] = (saved[0], set(saved[1]))
+        return True
+
+    def _save_cursor(self, model: str) -> None:
+        stamp, seen = self._cursors[model]
+        self.cache.set(self._cursor_key(model), [stamp, sorted(seen)], CURSOR_TTL)
+
+    def _latest(self, model: str) -> Any:
+        rows = self.odoo.execute_kw(model, "search_read", [[]],
+                                    {"fields": ["write_date"], "order": "write_date desc", "limit": 1})
+        stamp = rows[0]["write_date"] if rows else False
+        return stamp, {r["id"] for r in rows if r["write_date"] == stamp}
+
+    def _changed(self, model: str) -> List[int]:
+        stamp, seen = self._cursors[model]
+        domain = [["write_date", ">=", stamp]] if stamp else []
+        rows = self.odoo.execute_kw(model, "search_read", [domain],
+                                    {"fields": ["write_date"], "order": "write_date asc, id asc", "limit": POLL_BATCH})
+        # write_date tiene resolución de segundos: `>=` más los ids ya vistos en ese segundo
+        rows = [r for r in rows if not (r["write_date"] == stamp and r["id"] in seen)]
+        if rows:
+            last = rows[-1]["write_date"]
+            ids_at_last = {r["id"] for r in rows if r["write_date"] == last}
+            self._cursors[model] = (last, ids_at_last | (seen if last == stamp else set()))
+        return [r["id"] for r in rows]
+
+    def poll_once(self) -> Dict[str, List[int]]:
+        """
+        Una ronda sobre todos los modelos si este worker es el líder (si no,
+        no consulta Odoo). Un modelo sin cursor guardado solo lo fija.
+        """
+        changes: Dict[str, List[int]] = {}
+        if not self._lead():
+            return changes
+        with scheduling.call_context(scheduling.BULK):
+            for model in self.models:
+                if model not in self._cursors and not self._load_cursor(model):
+                    self._cursors[model] = self._latest(model)
+                    self._save_cursor(model)
+                    continue
+                ids = self._changed(model)
+                if ids:
+                    self._save_cursor(model)
+                    changes[model] = ids
+                    notify(self.odoo.cache_prefix(), model, ids, source="poll")
+        return changes
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll_once()
+            except Exception as e:
+                print(f"[WARN] polling de invalidación falló: {e!r}")
+
+    def start(self) -> "WriteDatePoller":
+        with _subscribers_lock:
+            _polled[self.odoo.cache_prefix()] = self.models
+        try:
+            self.poll_once()
+        except Exception as e:
+            print(f"[WARN] polling de invalidación falló: {e!r}")
+        self._thread = threading.Thread(target=self._run, name="cache-invalidation-poll", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self.leader:
+            self.cache.release_lease(self._lease_key(), self._owner)
+            self.leader = False
+        with _subscribers_lock:
+            if _polled.get(self.odoo.cache_prefix()) is self.models:
+                del _polled[self.odoo.cache_prefix()]
+
+
+def polled(prefix: str, model: str) -> bool:
+    """True si un poller avisa de los cambios de `model` en la base `prefix`."""
+    with _subscribers_lock:
+        return model in _polled.get(prefix, ())
+
+
+def watched_models(default: List[str]) -> List[str]:
+    raw = os.getenv("CACHE_INVALIDATION_MODELS", "")
+    models = [m.strip() for m in raw.split(",") if m.strip()]
+    return models or list(default)
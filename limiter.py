@@ -0,0 +1,255 @@
+# limiter.py
+"""Limitador de concurrencia adaptativo (AIMD) hacia Odoo, por ambiente.
+
+Cada ambiente (prod, dev, ...) tiene un límite de RPC en vuelo que se ajusta
+con lo observado:
+- éxito con latencia <= objetivo → incremento aditivo (+1 por ventana)
+- error de transporte/saturación o latencia > objetivo → decremento
+  multiplicativo (x `backoff`)
+
+El objetivo de latencia es por clase de prioridad: las llamadas `bulk`
+(exportaciones, streaming, listas grandes) son lentas por diseño y, salvo
+que se fije `bulk_latency_target`, solo las señales de saturación reducen el
+límite por ellas.
+
+Si el límite está lleno, las llamadas esperan en una cola acotada; con la cola
+llena (o al vencer `queue_timeout`) se rechazan de inmediato con
+`OdooOverloaded`, para degradar con rapidez en lugar de que todos expiren.
+
+Los límites configurados son por contenedor: con varios workers
+(`WEB_CONCURRENCY`) se reparten entre procesos para que agregar workers no
+multiplique la carga sobre Odoo.
+
+La cola es por prioridad (ver scheduling.py): las llamadas `bulk` nunca
+ocupan la fracción `interactive_reserve` del límite, la cola interactiva se
+atiende primero (salvo que un bulk lleve más de `bulk_aging` s esperando) y
+dentro de cada clase los turnos rotan entre sesiones MCP.
+"""
+import http.client
+import math
+import os
+import socket
+import threading
+import time
+import xmlrpc.client
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator
+
+import metrics
+from scheduling import BULK, INTERACTIVE, PRIORITIES, current
+from shared_cache import worker_count
+
+# Códigos HTTP que indican saturación del servidor Odoo
+OVERLOAD_STATUS = {429, 502, 503, 504}
+
+
+class OdooOverloaded(RuntimeError):
+    """Odoo está saturado: la llamada se rechaza sin enviarse."""
+
+
+def is_overload_error(exc: BaseException) -> bool:
+    """Errores que cuentan como señal de congestión (no los Fault de negocio)."""
+    if isinstance(exc, xmlrpc.client.ProtocolError):
+        return exc.errcode in OVERLOAD_STATUS
+    return isinstance(exc, (socket.timeout, TimeoutError, ConnectionError, http.client.HTTPException))
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, default))
+
+
+class _Ticket:
+    __slots__ = ("priority", "session", "enqueued", "granted")
+
+    def __init__(self, priority: str, session: Any):
+        self.priority = priority
+        self.session = session
+        self.enqueued = time.monotonic()
+        self.granted = False
+
+
+class AdaptiveLimiter:
+    def __init__(self, env: str, initial: float = 4, min_limit: float = 1, max_limit: float = 16,
+                 max_queue: int = 32, queue_timeout: float = 10.0, latency_target: float = 2.0,
+                 backoff: float = 0.7, interactive_reserve: float = 0.25, bulk_aging: float = 5.0,
+                 bulk_latency_target: float = 0.0):
+        self.env = env
+        self.min_limit = float(min_limit)
+        self.max_limit = float(max_limit)
+        self.limit = min(max(float(initial), self.min_limit), self.max_limit)
+        self.max_queue = int(max_queue)
+        self.queue_timeout = float(queue_timeout)
+        self.latency_target = float(latency_target)
+        # Objetivo de latencia por prioridad (0 = la latencia no reduce el límite)
+        self.latency_targets = {INTERACTIVE: self.latency_target, BULK: float(bulk_latency_target)}
+        self.backoff = float(backoff)
+        # Fracción del límite que bulk no puede usar, y espera tras la que bulk pasa primero
+        self.interactive_reserve = float(interactive_reserve)
+        self.bulk_aging = float(bulk_aging)
+        self.inflight = 0
+        self.waiting = 0
+        self._inflight_by: Dict[str, int] = {p: 0 for p in PRIORITIES}
+        # prioridad -> sesión -> tickets en espera (round-robin entre sesiones)
+        self._queues: Dict[str, "OrderedDict[Any, Deque[_Ticket]]"] = {p: OrderedDict() for p in PRIORITIES}
+        self._cond = threading.Condition()
+        self._publish()
+
+    def _publish(self) -> None:
+        metrics.LIMITER_LIMIT.set(self.limit, env=self.env)
+        metrics.LIMITER_INFLIGHT.set(self.inflight, env=self.env)
+
+    def _bulk_cap(self) -> int:
+        capacity = int(self.limit)
+        reserve = math.ceil(capacity * self.interactive_reserve) if capacity > 1 else 0
+        return max(1, capacity - reserve)
+
+    def _can_start(self, priority: str) -> bool:
+        if self.inflight >= int(self.limit):
+            return False
+        return priority != BULK or self._inflight_by[BULK] < self._bulk_cap()
+
+    def _start(self, priority: str) -> None:
+        self.inflight += 1
+        self._inflight_by[priority] += 1
+
+    def _oldest_wait(self, priority: str) -> float:
+        now = time.monotonic()
+        return max((now - q[0].enqueued for q in self._queues[priority].values()), default=0.0)
+
+    def _dispatch(self) -> None:
+        """Asigna los lugares libres a la cola (con el lock tomado)."""
+        order = (INTERACTIVE, BULK)
+        if self._oldest_wait(BULK) > self.bulk_aging:
+            order = (BULK, INTERACTIVE)
+        granted = False
+        for priority in order:
+            queue = self._queues[priority]
+            while queue and self._can_start(priority):
+                session, tickets = next(iter(queue.items()))
+                ticket = tickets.popleft()
+                if tickets:
+                    queue.move_to_end(session)
+                else:
+                    del queue[session]
+                self.waiting -= 1
+                ticket.granted = True
+                self._start(priority)
+                granted = True
+        if granted:
+            self._cond.notify_all()
+
+    def _withdraw(self, ticket: _Ticket) -> None:
+        queue = self._queues[ticket.priority]
+        tickets = queue.get(ticket.session)
+        if tickets is not None:
+            tickets.remove(ticket)
+            if not tickets:
+                del queue[ticket.session]
+            self.waiting -= 1
+
+    def _reject(self, priority: str, reason: str, message: str) -> None:
+        metrics.LIMITER_REJECTED.inc(env=self.env, reason=reason, priority=priority)
+        raise OdooOverloaded(message)
+
+    def _acquire(self, priority: str, session: Any) -> None:
+        with self._cond:
+            # Sin nadie adelante en la cola (de su clase o superior) entra directo
+            ahead = any(self._queues[p] for p in PRIORITIES[:PRIORITIES.index(priority) + 1])
+            if not ahead and self._can_start(priority):
+                self._start(priority)
+                metrics.SCHEDULER_WAIT.observe(0.0, env=self.env, priority=priority)
+                self._publish()
+                return
+            if self.waiting >= self.max_queue:
+                self._reject(priority, "queue_full",
+                             f"Odoo ({self.env}) saturado: {self.inflight} llamadas en curso y cola llena")
+            ticket = _Ticket(priority, session)
+            self._queues[priority].setdefault(session, deque()).append(ticket)
+            self.waiting += 1
+            self._cond.wait_for(lambda: ticket.granted, self.queue_timeout)
+            metrics.SCHEDULER_WAIT.observe(time.monotonic() - ticket.enqueued, env=self.env, priority=priority)
+            if not ticket.granted:
+                self._withdraw(ticket)
+                self._reject(priority, "queue_timeout",
+                             f"Odoo ({self.env}) saturado: sin turno tras {self.queue_timeout:g}s en cola")
+            self._publish()
+
+    def _release(self, priority: str, elapsed: float, overloaded: bool) -> None:
+        with self._cond:
+            self.inflight -= 1
+            self._inflight_by[priority] -= 1
+            target = self.latency_targets[priority]
+            if overloaded or (target > 0 and elapsed > target):
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+            else:
+                self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            self._dispatch()
+            self._publish()
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        """Reserva un lugar para una RPC (según la prioridad en curso); mide la respuesta para ajustar el límite."""
+        priority, session = current()
+        self._acquire(priority, session)
+        start = time.monotonic()
+        overloaded = False
+        try:
+            yield
+        except Exception as e:
+            overloaded = is_overload_error(e)
+            raise
+        finally:
+            self._release(priority, time.monotonic() - start, overloaded)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "limit": round(self.limit, 2),
+                "inflight": self.inflight,
+                "waiting": self.waiting,
+                "bulk_cap": self._bulk_cap(),
+                "by_priority": {
+                    p: {"inflight": self._inflight_by[p],
+                        "waiting": sum(len(t) for t in self._queues[p].values()),
+                        "sessions_waiting": len(self._queues[p])}
+                    for p in PRIORITIES
+                },
+            }
+
+
+_limiters: Dict[str, AdaptiveLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(env: str, settings_prefix: str = "") -> AdaptiveLimiter:
+    """
+    Limitador compartido del ambiente (configurable con ODOO_* en el entorno;
+    con `settings_prefix`, p.ej. `ACME_`, `ACME_ODOO_*` tiene prioridad).
+    """
+
+    def setting(name: str, default: float) -> float:
+        return _env_float(settings_prefix + name, _env_float(name, default))
+
+    with _limiters_lock:
+        limiter = _limiters.get(env)
+        if limiter is None:
+            workers = worker_count()
+            limiter = _limiters[env] = AdaptiveLimiter(
+                env,
+                initial=max(1.0, setting("ODOO_INITIAL_CONCURRENCY", 4) / workers),
+                min_limit=setting("ODOO_MIN_CONCURRENCY", 1),
+                max_limit=max(1.0, setting("ODOO_MAX_CONCURRENCY", 16) / workers),
+                max_queue=int(setting("ODOO_MAX_QUEUE", 32)),
+                queue_timeout=setting("ODOO_QUEUE_TIMEOUT", 10.0),
+                latency_target=setting("ODOO_LATENCY_TARGET", 2.0),
+                interactive_reserve=setting("ODOO_INTERACTIVE_RESERVE", 0.25),
+                bulk_aging=setting("ODOO_BULK_AGING", 5.0),
+                bulk_latency_target=setting("ODOO_BULK_LATENCY_TARGET", 0.0),
+            )
+        return limiter
+
+
+def limiter_states() -> Dict[str, Dict[str, Any]]:
+    with _limiters_lock:
+        return {env: lim.snapshot() for env, lim in _limiters.items()}
@@ -0,0 +1,172 @@
+# metrics.py
+"""Métricas en proceso con exposición en formato de texto de Prometheus.
+
+Registro mínimo (sin dependencias) de contadores e histogramas con labels:
+- mcp_tool_calls_total{tool,status}            llamadas por tool (ok/error)
+- mcp_tool_duration_seconds{tool}              latencia por tool
+- mcp_tool_response_bytes{tool}                tamaño de la respuesta
+- odoo_rpc_calls_total{env,model,method,status} llamadas execute_kw
+- odoo_rpc_duration_seconds{env,model,method}  latencia de execute_kw
+- cache_requests_total{cache,result}           aciertos/fallos de caches
+- cache_invalidations_total{model,source}      avisos de cambios en Odoo (write/poll/webhook)
+- odoo_limiter_*{env}                          límite/en vuelo/rechazos del limitador
+- odoo_scheduler_wait_seconds{env,priority}    espera en la cola del limitador por prioridad
+- odoo_rpc_retries_total{env,model,method}     reintentos de RPC idempotentes
+- odoo_breaker_state{env}                      circuit breaker (0=closed,1=half_open,2=open)
+- offload_decode_seconds{model,where}          decodificación de respuestas (inline/process)
+- odoo_writes_coalesced_total{env,model}       escrituras fusionadas en un write pendiente
+
+`render()` genera el cuerpo servido en `/metrics` (ver server.app).
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _fmt_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(key) + ([extra] if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, doc: str):
+        self.name = name
+        self.doc = doc
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = _key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_fmt_labels(key)} {value:g}")
+        return lines
+
+
+class Gauge:
+    def __init__(self, name: str, doc: str):
+        self.name = name
+        self.doc = doc
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[_key(labels)] = float(value)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} gauge"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_fmt_labels(key)} {value:g}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, doc: str, buckets: Sequence[float]):
+        self.name = name
+        self.doc = doc
+        self.buckets = tuple(buckets)
+        # key -> (conteos por bucket, suma, total)
+        self._values: Dict[LabelKey, List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = _key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total_sum, count) in sorted(self._values.items()):
+                for bound, c in zip(self.buckets, counts):
+                    lines.append(f"{self.name}_bucket{_fmt_labels(key, ('le', f'{bound:g}'))} {c}")
+                lines.append(f"{self.name}_bucket{_fmt_labels(key, ('le', '+Inf'))} {count}")
+                lines.append(f"{self.name}_sum{_fmt_labels(key)} {total_sum:g}")
+                lines.append(f"{self.name}_count{_fmt_labels(key)} {count}")
+        return lines
+
+
+TOOL_CALLS = Counter("mcp_tool_calls_total", "Llamadas a tools MCP por resultado.")
+TOOL_DURATION = Histogram("mcp_tool_duration_seconds", "Latencia de tools MCP.", LATENCY_BUCKETS)
+TOOL_RESPONSE_BYTES = Histogram("mcp_tool_response_bytes", "Tamaño de la respuesta de tools MCP.", SIZE_BUCKETS)
+RPC_CALLS = Counter("odoo_rpc_calls_total", "Llamadas execute_kw a Odoo por modelo/método.")
+RPC_DURATION = Histogram("odoo_rpc_duration_seconds", "Latencia de execute_kw a Odoo.", LATENCY_BUCKETS)
+CACHE_REQUESTS = Counter("cache_requests_total", "Consultas a caches locales (hit/miss).")
+CACHE_INVALIDATIONS = Counter("cache_invalidations_total", "Avisos de cambios en Odoo que invalidan caches.")
+LIMITER_LIMIT = Gauge("odoo_limiter_limit", "Límite adaptativo de RPC concurrentes por ambiente.")
+LIMITER_INFLIGHT = Gauge("odoo_limiter_inflight", "RPC en vuelo por ambiente.")
+SCHEDULER_WAIT = Histogram("odoo_scheduler_wait_seconds", "Espera en cola del limitador por prioridad.", LATENCY_BUCKETS)
+LIMITER_REJECTED = Counter("odoo_limiter_rejected_total", "RPC rechazadas por saturación (cola llena/timeout).")
+RPC_RETRIES = Counter("odoo_rpc_retries_total", "Reintentos de RPC idempotentes por error transitorio.")
+BREAKER_STATE = Gauge("odoo_breaker_state", "Circuit breaker por ambiente (0=closed, 1=half_open, 2=open).")
+OFFLOAD_DURATION = Histogram("offload_decode_seconds", "Decodificación y conversión de respuestas de Odoo.", LATENCY_BUCKETS)
+WRITES_COALESCED = Counter("odoo_writes_coalesced_total", "Escrituras fusionadas con un write pendiente del mismo registro.")
+
+REGISTRY = [
+    TOOL_CALLS, TOOL_DURATION, TOOL_RESPONSE_BYTES, RPC_CALLS, RPC_DURATION, CACHE_REQUESTS, CACHE_INVALIDATIONS,
+    LIMITER_LIMIT, LIMITER_INFLIGHT, LIMITER_REJECTED, SCHEDULER_WAIT, RPC_RETRIES, BREAKER_STATE, OFFLOAD_DURATION,
+    WRITES_COALESCED,
+]
+
+
+@contextmanager
+def observe_rpc(env: str, model: str, method: str) -> Iterator[None]:
+    """Mide una llamada execute_kw (cuenta errores con status="error")."""
+    start = time.perf_counter()
+    status = "ok"
+    try:
+        yield
+    except Exception:
+        status = "error"
+        raise
+    finally:
+        RPC_CALLS.inc(env=env, model=model, method=method, status=status)
+        RPC_DURATION.observe(time.perf_counter() - start, env=env, model=model, method=method)
+
+
+def observe_tool(tool: str, seconds: float, status: str, response_bytes: Optional[int] = None) -> None:
+    TOOL_CALLS.inc(tool=tool, status=status)
+    TOOL_DURATION.observe(seconds, tool=tool)
+    if response_bytes is not None:
+        TOOL_RESPONSE_BYTES.observe(response_bytes, tool=tool)
+
+
+def cache_event(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+def render() -> str:
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,236 @@
+# name_index.py
+"""Índice en memoria nombre → id para modelos de Odoo.
+
+Permite resolver filtros por nombre (p.ej. `assigned_to_name`) dentro del
+proceso, sin un `search_read` por llamada. Cada modelo se carga de forma
+perezosa la primera vez que se usa y se refresca cuando vence su TTL.
+La comparación ignora mayúsculas y acentos ("José" == "jose").
+
+Las filas cargadas se publican en el cache compartido (`shared_cache`), de
+modo que con varios workers solo uno consulta Odoo por modelo y TTL.
+
+Los avisos de `invalidation` corrigen solo los registros cambiados (una
+lectura por aviso) y publican una revisión por modelo: los demás workers la
+comparan en cada uso y recargan el snapshot compartido si cambió. Con la
+invalidación activa `NAME_INDEX_TTL` puede ser largo.
+
+La carga pagina por id (`NAME_INDEX_PAGE` filas por `search_read`) y corre
+con un lock por modelo: cargar `res.partner` no bloquea las búsquedas en
+`res.users`. Un modelo con más de `NAME_INDEX_MAX_ROWS` registros no se
+indexa: sus nombres se resuelven con un `name_search` acotado por llamada.
+"""
+import os
+import threading
+import time
+import unicodedata
+from typing import Any, Dict, List, Optional, Tuple
+
+import invalidation
+import metrics
+from shared_cache import get_cache
+
+# Modelos indexados: model -> campo de nombre
+DEFAULT_MODELS: Dict[str, str] = {
+    "res.users": "name",
+    "res.partner": "name",
+    "project.project": "name",
+    "product.product": "name",
+}
+
+# Avisos con más ids que esto recargan el modelo completo en vez de corregir filas
+PATCH_MAX_IDS = 1000
+# Filas por página al cargar un modelo, y máximo de filas que se indexan
+NAME_INDEX_PAGE = int(os.getenv("NAME_INDEX_PAGE", "2000"))
+NAME_INDEX_MAX_ROWS = int(os.getenv("NAME_INDEX_MAX_ROWS", "50000"))
+# Resultados del name_search de los modelos demasiado grandes para indexar
+NAME_SEARCH_LIMIT = 50
+
+
+def normalize_name(value: Any) -> str:
+    """Normaliza un nombre: sin acentos, casefold y espacios colapsados."""
+    text = unicodedata.normalize("NFKD", str(value or ""))
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join(text.casefold().split())
+
+
+class NameIndex:
+    """Cache nombre → ids por modelo, con refresco periódico."""
+
+    def __init__(self, odoo, models: Optional[Dict[str, str]] = None,
+                 ttl: Optional[float] = None, min_refresh: float = 30.0):
+        self.odoo = odoo
+        self.models = dict(models or DEFAULT_MODELS)
+        self.ttl = float(ttl if ttl is not None else os.getenv("NAME_INDEX_TTL", "300"))
+        # Intervalo mínimo entre refrescos forzados por un nombre no encontrado
+        self.min_refresh = min_refresh
+        self._entries: Dict[str, List[Tuple[str, int, str]]] = {}
+        self._loaded_at: Dict[str, float] = {}
+        # Revisión del snapshot compartido que refleja cada modelo local
+        self._revs: Dict[str, Optional[int]] = {}
+        # Modelos que superan NAME_INDEX_MAX_ROWS (se resuelven con name_search)
+        self._large: Dict[str, bool] = {}
+        self._lock = threading.Lock()
+        # Serializa la carga de cada modelo sin bloquear a los demás
+        self._load_locks = {model: threading.Lock() for model in self.models}
+        self.cache = getattr(odoo, "cache", None) or get_cache()
+        invalidation.subscribe(self.on_change)
+
+    def _prefix(self) -> str:
+        cache_prefix = getattr(self.odoo, "cache_prefix", None)
+        return cache_prefix() if callable(cache_prefix) else ""
+
+    def _shared_key(self, model: str) -> str:
+        return f"names:{self._prefix()}|{model}|{self.models[model]}"
+
+    def _rev_key(self, model: str) -> str:
+        return f"namesrev:{self._prefix()}|{model}|{self.models[model]}"
+
+    def _publish(self, model: str, snapshot: Dict[str, Any], ttl: float) -> None:
+        # La revisión avisa a los demás workers que su copia local quedó vieja
+        snapshot["rev"] = time.time_ns()
+        self.cache.set(self._shared_key(model), snapshot, ttl)
+        self.cache.set(self._rev_key(model), snapshot["rev"], ttl)
+
+    def _apply(self, model: str, snapshot: Dict[str, Any]) -> None:
+        self._entries[model] = [(normalize_name(name), rid, name) for rid, name in snapshot["rows"]]
+        # La edad local parte de cuando se consultó Odoo (posiblemente en otro worker)
+        age = max(0.0, time.time() - snapshot["loaded_at"])
+        self._loaded_at[model] = time.monotonic() - age
+        self._revs[model] = snapshot.get("rev")
+        self._large[model] = bool(snapshot.get("large"))
+
+    def _fetch(self, model: str) -> Dict[str, Any]:
+        field = self.models[model]
+        loaded_at = time.time()
+        if self.odoo.execute_kw(model, "search_count", [[]]) > NAME_INDEX_MAX_ROWS:
+            return {"loaded_at": loaded_at, "rows": [], "large": True}
+        rows: List[List[Any]] = []
+        while True:
+            domain = [["id", ">", rows[-1][0]]] if rows else []
+            page = self.odoo.execute_kw(model, "search_read", [domain],
+                                        {"fields": ["id", field], "order": "id asc", "limit": NAME_INDEX_PAGE})
+            rows += [[int(r["id"]), r.get(field) or ""] for r in page]
+            if len(page) < NAME_INDEX_PAGE:
+                break
+        return {"loaded_at": loaded_at, "rows": rows}
+
+    def _load(self, model: str, force: bool = False) -> None:
+        key = self._shared_key(model)
+        if force:
+            # Nombre no encontrado: se consulta Odoo (salvo que otro worker acabe de
+            # hacerlo) y se publica para los demás workers
+            snapshot = self.cache.get(key)
+            if not snapshot or time.time() - snapshot["loaded_at"] > self.min_refresh:
+                snapshot = self._fetch(model)
+                self._publish(model, snapshot, self.ttl)
+        else:
+            snapshot = self.cache.get_or_load(key, self.ttl, lambda: self._fetch(model), name="name_index_shared")
+        with self._lock:
+            self._apply(model, snapshot)
+
+    def _ensure(self, model: str, force: bool = False) -> None:
+        if model not in self.models:
+            raise KeyError(f"Modelo no indexado: {model}")
+        with self._load_locks[model]:
+            with self._lock:
+                loaded_at = self._loaded_at.get(model)
+                age = None if loaded_at is None else time.monotonic() - loaded_at
+                stale = age is None or age > self.ttl or (force and age > self.min_refresh)
+            if not stale:
+                # Otro worker corrigió o invalidó el snapshot compartido
+                rev = self.cache.get(self._rev_key(model))
+                stale = rev is not None and rev != self._revs.get(model)
+            metrics.cache_event("name_index", hit=not stale)
+            if stale:
+                # La consulta a Odoo corre fuera de self._lock
+                self._load(model, force=force)
+
+    def invalidate(self, model: Optional[str] = None) -> None:
+        """Descarta el índice de un modelo (o de todos) para recargarlo en el próximo uso."""
+        with self._lock:
+            for m in (self.models if model is None else [model]):
+                self._loaded_at.pop(m, None)
+                if m in self.models:
+                    self.cache.delete(self._shared_key(m))
+                    self.cache.set(self._rev_key(m), time.time_ns(), self.ttl)
+
+    def on_change(self, prefix: str, model: str, ids: Optional[List[int]] = None) -> None:
+        """
+        Aviso de `invalidation`: relee solo los `ids` cambiados y los corrige
+        en el snapshot (borrados/archivados salen del índice). Sin ids, o con
+        demasiados, descarta el modelo completo.
+        """
+        if model not in self.models or prefix != self._prefix():
+            return
+        if ids is None or len(ids) > PATCH_MAX_IDS:
+            self.invalidate(model)
+            return
+        cached = self.cache.get(self._shared_key(model))
+        if cached is None:
+            # Nada cacheado: la próxima carga ya verá el cambio
+            with self._lock:
+                self._loaded_at.pop(model, None)
+            return
+        if cached.get("large"):
+            # Sin índice: name_search ya consulta Odoo en cada llamada
+            return
+        field = self.models[model]
+        rows = self.odoo.execute_kw(model, "search_read", [[["id", "in", list(ids)]]], {"fields": ["id", field]})
+        changed = set(ids)
+        with self._lock:
+            snapshot = self.cache.get(self._shared_key(model))
+            remaining = self.ttl - (time.time() - snapshot["loaded_at"]) if snapshot else 0.0
+            if remaining <= 0:
+                self._loaded_at.pop(model, None)
+                return
+            snapshot["rows"] = [row for row in snapshot["rows"] if row[0] not in changed] + [
+                [int(r["id"]), r.get(field) or ""] for r in rows
+            ]
+            self._publish(model, snapshot, remaining)
+            self._apply(model, snapshot)
+
+    def _name_search(self, model: str, name: str) -> List[Tuple[str, int, str]]:
+        rows = self.odoo.execute_kw(model, "name_search", [name],
+                                    {"operator": "ilike", "limit": NAME_SEARCH_LIMIT})
+        return [(normalize_name(n), int(i), n) for i, n in rows]
+
+    @staticmethod
+    def _match(entries: List[Tuple[str, int, str]], needle: str) -> List[Dict[str, Any]]:
+        exact = [(i, n) for key, i, n in entries if key == needle]
+        if not exact:
+            exact = [(i, n) for key, i, n in entries if needle in key]
+        return [{"id": i, "name": n} for i, n in exact]
+
+    def resolve(self, model: str, name: str) -> List[Dict[str, Any]]:
+        """
+        Devuelve los registros cuyo nombre coincide con `name`.
+
+        Si hay coincidencias exactas (normalizadas) solo se devuelven esas;
+        si no, las que contienen el texto (equivalente a `ilike`). Ante un
+        nombre no encontrado se fuerza un refresco (limitado por `min_refresh`)
+        por si el registro es nuevo.
+        """
+        needle = normalize_name(name)
+        if not needle:
+            return []
+        self._ensure(model)
+        if self._large.get(model):
+            return self._match(self._name_search(model, name), needle)
+        matches = self._match(self._entries.get(model, []), needle)
+        if not matches:
+            self._ensure(model, force=True)
+            matches = self._match(self._entries.get(model, []), needle)
+        return matches
+
+    def resolve_one(self, model: str, name: str) -> int:
+        """Resuelve un nombre a un único id; lanza ValueError si no existe o es ambiguo."""
+        matches = self.resolve(model, name)
+        if not matches:
+            raise ValueError(f"No se encontró '{name}' en {model}")
+        if len(matches) > 1:
+            candidates = ", ".join(f"{m['name']} (ID: {m['id']})" for m in matches[:10])
+            extra = f" y {len(matches) - 10} más" if len(matches) > 10 else ""
+            raise ValueError(
+                f"Nombre ambiguo '{name}' en {model}: {candidates}{extra}. Usa el id."
+            )
+        return matches[0]["id"]
@@ -1,29 +1,229 @@
+import hashlib
+import http.client
 import os
+import threading
+import time
+import urllib.parse
 import xmlrpc.client
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+import invalidation
+from cassette import get_cassette
+import metrics
+import tracing
+from limiter import OdooOverloaded, get_limiter
+from resilience import IDEMPOTENT_METHODS, backoff_delay, get_breaker, is_transient_error
+from shared_cache import get_cache
+
+
+class _TimeoutHTTPConnection(http.client.HTTPConnection):
+    """Conexión con timeout de conexión y de lectura separados."""
+    read_timeout: float | None = None
+
+    def connect(self):
+        super().connect()
+        self.sock.settimeout(self.read_timeout)
+
+
+class _TimeoutHTTPSConnection(http.client.HTTPSConnection):
+    read_timeout: float | None = None
+
+    def connect(self):
+        super().connect()
+        self.sock.settimeout(self.read_timeout)
+
+
+class TimeoutTransport(xmlrpc.client.SafeTransport):
+    """Transport XML-RPC (http/https) con `connect_timeout` y `read_timeout`."""
+
+    # Con raw_response=True `request` devuelve el cuerpo XML sin decodificar
+    raw_response = False
+
+    def __init__(self, https: bool, connect_timeout: float, read_timeout: float):
+        super().__init__()
+        self.https = https
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+
+    def make_connection(self, host):
+        if self._connection and host == self._connection[0]:
+            return self._connection[1]
+        chost, self._extra_headers, x509 = self.get_host_info(host)
+        if self.https:
+            conn = _TimeoutHTTPSConnection(chost, timeout=self.connect_timeout,
+                                           context=self.context, **(x509 or {}))
+        else:
+            conn = _TimeoutHTTPConnection(chost, timeout=self.connect_timeout)
+        conn.read_timeout = self.read_timeout
+        self._connection = host, conn
+        return conn
+
+    def parse_response(self, response):
+        if not self.raw_response:
+            return super().parse_response(response)
+        body = response.read()
+        if response.getheader("Content-Encoding", "") == "gzip":
+            body = xmlrpc.client.gzip_decode(body, max_decode=-1)
+        return body
+
 
 class OdooClient:
     """Cliente base (solo conexión y utilidades genéricas)."""
     def __init__(self, url: str | None = None, db: str | None = None,
-                 username: str | None = None, password: str | None = None):
+                 username: str | None = None, password: str | None = None,
+                 env: str = "prod", settings_prefix: str = ""):
+        # Etiqueta del ambiente para métricas/health
+        self.env = env
         self.url = (url or os.environ["ODOO_URL"]).rstrip("/")
         self.db = db or os.environ["ODOO_DB"]
         self.username = username or os.environ["ODOO_LOGIN"]
         # Usa API key como password
         self.password = password or os.environ["ODOO_API_KEY"]
 
-        self.common = xmlrpc.client.ServerProxy(f"{self.url}/xmlrpc/2/common")
-        self.models = xmlrpc.client.ServerProxy(f"{self.url}/xmlrpc/2/object")
-        self.uid = self.common.authenticate(self.db, self.username, self.password, {})
+        # Timeouts (s) y reintentos de lecturas ante errores transitorios
+        self.connect_timeout = float(os.getenv("ODOO_CONNECT_TIMEOUT", "5"))
+        self.read_timeout = float(os.getenv("ODOO_READ_TIMEOUT", "60"))
+        self.retries = int(os.getenv("ODOO_RETRIES", "2"))
+        self.retry_base = float(os.getenv("ODOO_RETRY_BASE", "0.2"))
+        self.retry_max = float(os.getenv("ODOO_RETRY_MAX", "2"))
+
+        # Límite adaptativo de RPC concurrentes y circuit breaker, compartidos por ambiente
+        self.limiter = get_limiter(env, settings_prefix)
+        self.breaker = get_breaker(env)
+        # ServerProxy no es thread-safe: una conexión por hilo
+        self._local = threading.local()
+
+        # uid y esquemas se comparten entre workers (ver shared_cache)
+        self.cache = get_cache()
+        self.auth_ttl = float(os.getenv("AUTH_CACHE_TTL", "3600"))
+        self.schema_ttl = float(os.getenv("SCHEMA_CACHE_TTL", "3600"))
+
+        # Grabación / reproducción de RPC (ODOO_CASSETTE_MODE, ver cassette.py)
+        self.cassette = get_cassette()
+
+        self.common = self._proxy("common")
+        self.uid = self._authenticate()
+
+    def cache_prefix(self) -> str:
+        return f"{self.url}|{self.db}"
+
+    def _authenticate(self) -> int:
+        # El hash de la API key invalida el uid cacheado si cambia la credencial
+        secret = hashlib.sha256(self.password.encode("utf-8")).hexdigest()[:16]
+        key = f"auth:{self.cache_prefix()}|{self.username}|{secret}"
+        def authenticate():
+            if self.cassette is None:
+                return self.common.authenticate(self.db, self.username, self.password, {})
+            # Sin usuario en la clave: el cassette se reproduce con cualquier credencial
+            return self.cassette.call(
+                self.env, "common", "authenticate", [], {},
+                lambda: self.common.authenticate(self.db, self.username, self.password, {}),
+            )
+
+        uid = self.cache.get_or_load(key, self.auth_ttl, authenticate, name="auth")
+        if not uid:
+            # Credenciales rechazadas: no se cachea el fallo
+            self.cache.delete(key)
+        return uid
+
+    def _proxy(self, service: str) -> xmlrpc.client.ServerProxy:
+        transport = TimeoutTransport(self.url.startswith("https"), self.connect_timeout, self.read_timeout)
+        return xmlrpc.client.ServerProxy(f"{self.url}/xmlrpc/2/{service}", transport=transport)
+
+    @property
+    def models(self) -> xmlrpc.client.ServerProxy:
+        proxy = getattr(self._local, "models", None)
+        if proxy is None:
+            proxy = self._local.models = self._proxy("object")
+        return proxy
+
+    def _call(self, model: str, method: str, args, kwargs):
+        return self.models.execute_kw(self.db, self.uid, self.password, model, method, args, kwargs)
+
+    def _call_raw(self, model: str, method: str, args, kwargs) -> bytes:
+        transport = getattr(self._local, "raw_transport", None)
+        if transport is None:
+            transport = self._local.raw_transport = TimeoutTransport(
+                self.url.startswith("https"), self.connect_timeout, self.read_timeout
+            )
+            transport.raw_response = True
+        parts = urllib.parse.urlsplit(self.url)
+        request = xmlrpc.client.dumps(
+            (self.db, self.uid, self.password, model, method, args, kwargs), "execute_kw"
+        ).encode("utf-8", "xmlcharrefreplace")
+        return transport.request(parts.netloc, f"{parts.path}/xmlrpc/2/object", request)
 
     def execute_kw(self, model: str, method: str, args=None, kwargs=None):
-        args = args or []
-        kwargs = kwargs or {}
-        return self.models.execute_kw(
-            self.db, self.uid, self.password,
-            model, method, args, kwargs
+        return self._execute(model, method, args or [], kwargs or {}, self._call)
+
+    def execute_kw_raw(self, model: str, method: str, args=None, kwargs=None) -> bytes:
+        """
+        Como `execute_kw` pero devuelve la respuesta XML-RPC sin decodificar,
+        para parsearla fuera del hilo que hizo la llamada (ver offload.py).
+        Un Fault de Odoo no se lanza aquí sino al decodificar.
+        """
+        return self._execute(model, method, args or [], kwargs or {}, self._call_raw)
+
+    def _execute(self, model: str, method: str, args, kwargs, call):
+        attempts = 1 + (self.retries if method in IDEMPOTENT_METHODS else 0)
+        for attempt in range(attempts):
+            self.breaker.before_call()
+            try:
+                with self.limiter.slot(), metrics.observe_rpc(self.env, model, method), \
+                        tracing.rpc_span(self.env, model, method):
+                    if self.cassette is None:
+                        result = call(model, method, args, kwargs)
+                    else:
+                        result = self.cassette.call(
+                            self.env, model, method, args, kwargs,
+                            lambda: call(model, method, args, kwargs), raw=call == self._call_raw,
+                        )
+            except OdooOverloaded:
+                self.breaker.cancel()
+                raise
+            except Exception as e:
+                if not is_transient_error(e):
+                    # Odoo respondió (p.ej. Fault de negocio): el circuito sigue sano
+                    self.breaker.record_success()
+                    raise
+                self.breaker.record_failure()
+                if attempt + 1 >= attempts:
+                    raise
+                metrics.RPC_RETRIES.inc(env=self.env, model=model, method=method)
+                time.sleep(backoff_delay(attempt, self.retry_base, self.retry_max))
+                continue
+            self.breaker.record_success()
+            # Escrituras propias (p.ej. tools dev_*): los caches de esta base se enteran al instante
+            invalidation.record_write(self.cache_prefix(), model, method, args, result)
+            return result
+
+    def fields_get(self, model: str, attributes=None):
+        """`fields_get` cacheado (compartido entre workers por SCHEMA_CACHE_TTL segundos)."""
+        attributes = sorted(attributes or ["type"])
+        key = f"schema:{self.cache_prefix()}|{model}|{','.join(attributes)}"
+        return self.cache.get_or_load(
+            key, self.schema_ttl,
+            lambda: self.execute_kw(model, "fields_get", [], {"attributes": attributes}),
+            name="schema",
         )
 
-    def search_read(self, model: str, domain=None, fields=None, limit: int = 50):
+    def user_tz(self) -> str | None:
+        """Zona horaria (IANA) del usuario de Odoo, cacheada como el esquema; None si no tiene."""
+        def load():
+            rows = self.execute_kw("res.users", "read", [[self.uid]], {"fields": ["tz"]})
+            return (rows[0].get("tz") if rows else None) or ""
+        tz = self.cache.get_or_load(f"usertz:{self.cache_prefix()}|{self.uid}", self.schema_ttl, load,
+                                    name="schema")
+        try:
+            return ZoneInfo(tz).key if tz else None
+        except (ZoneInfoNotFoundError, ValueError):
+            # Una tz desconocida en el perfil no debe romper los filtros de fecha
+            return None
+
+    def search_read(self, model: str, domain=None, fields=None, limit: int = 50, order: str | None = None):
         domain = domain or []
         fields = fields or ["id", "name"]
-        return self.execute_kw(model, "search_read", [domain], {"fields": fields, "limit": limit})
+        kwargs = {"fields": fields, "limit": limit}
+        if order:
+            kwargs["order"] = order
+        return self.execute_kw(model, "search_read", [domain], kwargs)
@@ -0,0 +1,146 @@
+# offload.py
+"""Ejecución fuera del event loop del trabajo bloqueante o intensivo en CPU.
+
+FastMCP ejecuta las tools síncronas directamente en el event loop, y las
+respuestas grandes de `search_read` implican parseo XML más validación
+pydantic en ese mismo hilo. `OFFLOAD_MODE` elige cómo se reparte:
+
+- `off`: todo en el event loop (comportamiento original).
+- `thread` (default): las tools síncronas y las consultas de listas corren en
+  el pool de hilos de anyio; el loop queda libre para `/health` y llamadas
+  pequeñas concurrentes.
+- `process`: además, las respuestas de más de `OFFLOAD_MIN_BYTES` se
+  decodifican y convierten en un pool de procesos (`OFFLOAD_WORKERS`), sin
+  competir por el GIL. En un intérprete sin GIL se usan hilos.
+
+Las funciones de conversión que se pasan a `search_read_rows` deben poder
+serializarse con pickle (funciones de módulo o `functools.partial`).
+"""
+import asyncio
+import functools
+import multiprocessing
+import os
+import sys
+import threading
+import time
+import xmlrpc.client
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+import anyio
+
+import metrics
+import profiling
+import tracing
+
+OFFLOAD_MODE = os.getenv("OFFLOAD_MODE", "thread").lower()
+if OFFLOAD_MODE not in ("off", "thread", "process"):
+    raise ValueError(f"OFFLOAD_MODE inválido: {OFFLOAD_MODE!r} (off|thread|process)")
+OFFLOAD_MIN_BYTES = int(os.getenv("OFFLOAD_MIN_BYTES", "65536"))
+OFFLOAD_WORKERS = int(os.getenv("OFFLOAD_WORKERS", "0")) or max(1, min(4, os.cpu_count() or 1))
+
+# Python 3.13+ sin GIL: los hilos ya corren en paralelo, no hace falta el pool de procesos
+GIL_FREE = hasattr(sys, "_is_gil_enabled") and not sys._is_gil_enabled()
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _watch_parent(parent_pid: int) -> None:
+    # uvicorn termina por señal sin pasar por atexit: el worker se cierra solo al quedar huérfano
+    def watch() -> None:
+        while os.getppid() == parent_pid:
+            time.sleep(1.0)
+        os._exit(0)
+
+    threading.Thread(target=watch, name="offload-parent-watch", daemon=True).start()
+
+
+def _process_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: el proceso padre tiene hilos (uvicorn/anyio) y fork no es seguro
+            _pool = ProcessPoolExecutor(
+                OFFLOAD_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_watch_parent,
+                initargs=(os.getpid(),),
+            )
+        return _pool
+
+
+async def run_sync(fn: Callable[..., Any], *args: Any) -> Any:
+    """Ejecuta `fn(*args)` en un hilo (o en el loop con OFFLOAD_MODE=off)."""
+    if OFFLOAD_MODE == "off":
+        return fn(*args)
+    return await anyio.to_thread.run_sync(profiling.in_thread(functools.partial(fn, *args)))
+
+
+def offload_sync_tool(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Envuelve una tool síncrona en una corrutina que la ejecuta en un hilo.
+
+    `functools.wraps` conserva firma y anotaciones, así FastMCP genera el
+    mismo esquema de entrada/salida que para la función original.
+    """
+    if OFFLOAD_MODE == "off" or asyncio.iscoroutinefunction(fn):
+        return fn
+
+    @functools.wraps(fn)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        return await anyio.to_thread.run_sync(functools.partial(fn, *args, **kwargs))
+
+    return wrapper
+
+
+def decode_rows(body: bytes, convert: Optional[Callable[[Dict[str, Any]], Any]] = None) -> List[Any]:
+    """Decodifica una respuesta XML-RPC de `search_read` y aplica `convert` a cada fila."""
+    params, _ = xmlrpc.client.loads(body)
+    rows = params[0]
+    if convert is None:
+        return rows
+    return [convert(r) for r in rows]
+
+
+def _decode_in_worker(body: bytes, convert) -> Dict[str, Any]:
+    # xmlrpc.client.Fault no sobrevive a pickle: se devuelve como datos
+    try:
+        return {"rows": decode_rows(body, convert)}
+    except xmlrpc.client.Fault as e:
+        return {"fault": (e.faultCode, e.faultString)}
+
+
+async def search_read_rows(odoo, model: str, domain: List[Any], fields: List[str], limit: int,
+                           convert: Optional[Callable[[Dict[str, Any]], Any]] = None,
+                           order: Optional[str] = None) -> List[Any]:
+    """`search_read` + conversión de filas según OFFLOAD_MODE."""
+
+    def fetch_and_convert() -> List[Any]:
+        rows = odoo.search_read(model, domain, fields, limit, order)
+        return rows if convert is None else [convert(r) for r in rows]
+
+    if OFFLOAD_MODE == "off":
+        return fetch_and_convert()
+    if OFFLOAD_MODE == "thread" or GIL_FREE:
+        return await anyio.to_thread.run_sync(profiling.in_thread(fetch_and_convert))
+
+    kwargs = {"fields": fields, "limit": limit}
+    if order:
+        kwargs["order"] = order
+    body = await anyio.to_thread.run_sync(profiling.in_thread(
+        lambda: odoo.execute_kw_raw(model, "search_read", [domain], kwargs)
+    ))
+    start = time.perf_counter()
+    if len(body) < OFFLOAD_MIN_BYTES:
+        # Respuesta chica: el viaje al otro proceso cuesta más que decodificarla aquí
+        rows = decode_rows(body, convert)
+        metrics.OFFLOAD_DURATION.observe(time.perf_counter() - start, model=model, where="inline")
+        return rows
+    with tracing.span(f"decode {model}", **{"odoo.model": model, "response.bytes": len(body)}):
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(_process_pool(), _decode_in_worker, body, convert)
+    metrics.OFFLOAD_DURATION.observe(time.perf_counter() - start, model=model, where="process")
+    if "fault" in result:
+        raise xmlrpc.client.Fault(*result["fault"])
+    return result["rows"]
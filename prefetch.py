@@ -0,0 +1,136 @@
+# prefetch.py
+"""Cache de documentos de `fetch` con precarga especulativa tras `search`.
+
+El patrón típico de Deep Research es `search` seguido de `fetch` sobre los
+primeros resultados. Tras responder `search`, `DocCache.prefetch` lee en
+segundo plano los `PREFETCH_TOP_K` primeros documentos con un solo
+`search_read` por modelo (incluida la descripción de las tareas) y los deja
+en el cache compartido; el `fetch` siguiente se sirve localmente. Si llega
+mientras la precarga sigue en curso, espera su resultado en lugar de repetir
+la consulta.
+
+Las filas viven `FETCH_CACHE_TTL` segundos y los avisos de `invalidation`
+descartan exactamente los registros modificados; sin polling sobre el
+modelo, `fetch` no confía en ellas para responder `if_version`. La precarga corre con
+prioridad bulk para no quitarle capacidad a las llamadas interactivas.
+"""
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import invalidation
+import metrics
+import scheduling
+from shared_cache import get_cache
+
+PREFETCH_TOP_K = int(os.getenv("PREFETCH_TOP_K", "5"))
+FETCH_CACHE_TTL = float(os.getenv("FETCH_CACHE_TTL", "120"))
+# Máximo que un fetch espera a una precarga en curso del mismo documento
+PREFETCH_WAIT = float(os.getenv("PREFETCH_WAIT", "5"))
+
+# Campos que lee `fetch` por modelo (la precarga debe traer exactamente los mismos)
+FETCH_FIELDS: Dict[str, List[str]] = {
+    "project.project": ["id", "name", "active", "write_date"],
+    "project.task": [
+        "id", "name", "project_id", "user_id", "stage_id", "date_deadline", "description", "write_date",
+    ],
+}
+
+# Prefijo de doc_id de search/fetch → modelo
+KINDS = {"project": "project.project", "task": "project.task"}
+
+
+class DocCache:
+    """Filas de `fetch` por (base, modelo, id) en el cache compartido."""
+
+    def __init__(self, ttl: float = FETCH_CACHE_TTL, top_k: int = PREFETCH_TOP_K):
+        self.ttl = ttl
+        self.top_k = top_k
+        self.cache = get_cache()
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="prefetch")
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        invalidation.subscribe(self.on_change)
+
+    @staticmethod
+    def _key(prefix: str, model: str, record_id: int) -> str:
+        return f"doc:{prefix}|{model}|{int(record_id)}"
+
+    def get(self, odoo, model: str, record_id: int) -> Optional[Dict[str, Any]]:
+        """Fila cacheada (esperando una precarga en curso) o None."""
+        if self.ttl <= 0:
+            return None
+        key = self._key(odoo.cache_prefix(), model, record_id)
+        with self._lock:
+            pending = self._inflight.get(key)
+        if pending is not None:
+            try:
+                pending.result(timeout=PREFETCH_WAIT)
+            except Exception:
+                # La precarga falló o tarda: fetch consulta por su cuenta
+                pass
+        row = self.cache.get(key)
+        metrics.cache_event("fetch", hit=row is not None)
+        return row
+
+    def put(self, odoo, model: str, rows: List[Dict[str, Any]]) -> None:
+        if self.ttl <= 0:
+            return
+        prefix = odoo.cache_prefix()
+        for row in rows:
+            self.cache.set(self._key(prefix, model, row["id"]), row, self.ttl)
+
+    def _load(self, odoo, model: str, ids: List[int]) -> None:
+        with scheduling.call_context(scheduling.BULK):
+            rows = odoo.search_read(model, [["id", "in", ids]], FETCH_FIELDS[model], len(ids))
+        self.put(odoo, model, rows)
+
+    def _done(self, keys: List[str], future: Future) -> None:
+        with self._lock:
+            for key in keys:
+                if self._inflight.get(key) is future:
+                    del self._inflight[key]
+        if future.exception() is not None:
+            print(f"[WARN] precarga de fetch falló: {future.exception()!r}")
+
+    def prefetch(self, odoo, doc_ids: List[str]) -> int:
+        """
+        Precarga en segundo plano los primeros `top_k` doc_ids (`project:<id>`,
+        `task:<id>`) que no estén ya en cache; devuelve cuántos se encolaron.
+        """
+        if self.ttl <= 0 or self.top_k <= 0:
+            return 0
+        prefix = odoo.cache_prefix()
+        by_model: Dict[str, List[Tuple[int, str]]] = {}
+        for doc_id in doc_ids[: self.top_k]:
+            kind, _, raw_id = doc_id.partition(":")
+            model = KINDS.get(kind)
+            if model is None or not raw_id.isdigit():
+                continue
+            key = self._key(prefix, model, int(raw_id))
+            with self._lock:
+                if key in self._inflight:
+                    continue
+            if self.cache.get(key) is not None:
+                continue
+            by_model.setdefault(model, []).append((int(raw_id), key))
+        queued = 0
+        for model, items in by_model.items():
+            keys = [key for _, key in items]
+            with self._lock:
+                future = self._executor.submit(self._load, odoo, model, [rid for rid, _ in items])
+                for key in keys:
+                    self._inflight[key] = future
+            future.add_done_callback(lambda f, keys=keys: self._done(keys, f))
+            queued += len(items)
+        return queued
+
+    def on_change(self, prefix: str, model: str, ids: Optional[List[int]] = None) -> None:
+        if model not in FETCH_FIELDS:
+            return
+        if ids is None:
+            self.cache.delete_prefix(f"doc:{prefix}|{model}|")
+            return
+        for record_id in ids:
+            self.cache.delete(self._key(prefix, model, record_id))
@@ -0,0 +1,410 @@
+# profiling.py
+"""Perfilado bajo demanda de llamadas a tools en vivo (`/admin/profile`).
+
+Una sesión perfila las próximas `calls` llamadas a tools o las que lleguen
+durante `seconds` segundos, lo que ocurra primero, sin redeploy. Hay dos
+modos:
+
+- `cprofile`: cProfile determinista (tiempos exactos, más overhead).
+- `sample`: muestreo estadístico de pilas cada `interval_ms` (overhead bajo).
+
+Se perfila el hilo del event loop durante la llamada: validación de
+argumentos (pydantic), conversión y codificación JSON del resultado. También
+el hilo donde corre la tool síncrona (RPC y marshalling XML-RPC) y, en las
+tools asíncronas, los saltos a hilos de `offload` y `streaming` (`in_thread`). Como el
+loop es compartido, entran también otras corrutinas que corran en paralelo.
+Por eso se perfila una llamada a la vez: las que se solapan con una
+perfilada pasan sin perfilar y no cuentan.
+
+El reporte agrega las funciones más calientes (tiempo propio y acumulado),
+las pilas más frecuentes en modo `sample` y el reparto por categoría:
+`xmlrpc` (marshalling), `pydantic`, `json`, `network` (espera de socket) y
+`other`. Con `allocations` además toma snapshots de tracemalloc al inicio y
+al final y reporta dónde creció la memoria.
+
+Desde Python 3.12 cProfile usa `sys.monitoring`, que es del intérprete:
+solo puede haber un perfilador activo y ese ve todos los hilos. Ahí el
+perfilador del hilo del loop cubre también el de la tool (y cualquier otro
+hilo que trabaje durante la llamada, p.ej. la precarga de `fetch`).
+
+La sesión vive en el proceso: con varios workers solo ve las llamadas del
+worker que recibió el POST. La decodificación en procesos hijos
+(`OFFLOAD_MODE=process`) no se perfila.
+"""
+import asyncio
+import cProfile
+import functools
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+# Token del header `X-Admin-Token` (sin token la ruta responde 404)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+MODES = ("cprofile", "sample")
+MAX_CALLS = 1000
+MAX_SECONDS = 600.0
+TOP_N = 25
+STACK_DEPTH = 40
+# 3.12+: un único cProfile activo por intérprete, y perfila todos los hilos
+CPROFILE_ALL_THREADS = sys.version_info >= (3, 12)
+# tracemalloc multiplica el costo de cada asignación según los frames guardados;
+# el reporte agrupa por línea, así que basta con uno
+ALLOC_FRAMES = 1
+
+# (categoría, fragmentos de "archivo:función" que la identifican); la primera que coincide gana.
+# `idle` es el event loop esperando (p.ej. a que termine el hilo de la tool): se reporta
+# aparte y no cuenta en los porcentajes ni en las funciones calientes
+CATEGORIES = (
+    ("idle", ("selectors.py", "select.epoll", "select.kqueue", "select.poll")),
+    ("xmlrpc", ("xmlrpc/", "pyexpat", "expat")),
+    ("pydantic", ("pydantic",)),
+    ("json", ("/json/", "_json", "orjson", "/encoding.py")),
+    ("network", ("http/client.py", "socket", "ssl")),
+)
+
+
+def categorize(where: str) -> Optional[str]:
+    for category, needles in CATEGORIES:
+        if any(n in where for n in needles):
+            return category
+    return None
+
+
+def _func_label(filename: str, lineno: int, name: str) -> str:
+    if filename == "~":
+        # Funciones C de cProfile: "<built-in method orjson.dumps>"
+        return name
+    return f"{name} ({os.path.basename(filename)}:{lineno})"
+
+
+class _Session:
+    def __init__(self, calls: int, seconds: float, mode: str, allocations: bool,
+                 tools: Optional[List[str]], interval_ms: float):
+        self.max_calls = calls
+        self.seconds = seconds
+        self.mode = mode
+        self.allocations = allocations
+        self.tools = set(tools) if tools else None
+        self.interval = interval_ms / 1000.0
+        self.started = time.time()
+        self.deadline = time.monotonic() + seconds
+        self.state = "running"
+        self.calls: List[Dict[str, Any]] = []
+        self.busy = False
+        self.lock = threading.Lock()
+        self.stats: Optional[pstats.Stats] = None
+        # modo sample: hilos a muestrear y conteos de pilas / categorías
+        self.threads: Dict[int, int] = {}
+        self.samples = 0
+        self.idle_samples = 0
+        self.stacks: Counter = Counter()
+        self.self_counts: Counter = Counter()
+        self.inclusive_counts: Counter = Counter()
+        self.category_counts: Counter = Counter()
+        self.snapshot_start = None
+        self.alloc_report: Optional[Dict[str, Any]] = None
+        self._started_tracemalloc = False
+        self._sampler: Optional[threading.Thread] = None
+        self._timer = threading.Timer(seconds, finish)
+        self._timer.daemon = True
+
+    def begin(self) -> None:
+        if self.allocations:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(ALLOC_FRAMES)
+                self._started_tracemalloc = True
+            tracemalloc.reset_peak()
+            self.snapshot_start = tracemalloc.take_snapshot()
+        if self.mode == "sample":
+            self._sampler = threading.Thread(target=self._sample_loop, name="profiling-sampler", daemon=True)
+            self._sampler.start()
+        self._timer.start()
+
+    def end(self) -> None:
+        self.state = "done"
+        self._timer.cancel()
+        if self.allocations and self.snapshot_start is not None:
+            self.alloc_report = _allocation_report(self.snapshot_start, tracemalloc.take_snapshot())
+            if self._started_tracemalloc:
+                tracemalloc.stop()
+
+    # -- modo sample --------------------------------------------------
+    def _sample_loop(self) -> None:
+        me = threading.get_ident()
+        while self.state == "running":
+            time.sleep(self.interval)
+            with self.lock:
+                idents = [t for t in self.threads if t != me]
+            if not idents:
+                continue
+            frames = sys._current_frames()
+            for ident in idents:
+                frame = frames.get(ident)
+                if frame is not None:
+                    self._record_stack(frame)
+
+    def _record_stack(self, frame) -> None:
+        labels: List[str] = []
+        category = None
+        while frame is not None and len(labels) < STACK_DEPTH:
+            code = frame.f_code
+            labels.append(_func_label(code.co_filename, code.co_firstlineno, code.co_name))
+            if category is None:
+                category = categorize(f"{code.co_filename}:{code.co_name}")
+            frame = frame.f_back
+        with self.lock:
+            if category == "idle":
+                self.idle_samples += 1
+                return
+            self.samples += 1
+            self.self_counts[labels[0]] += 1
+            for label in set(labels):
+                self.inclusive_counts[label] += 1
+            self.category_counts[category or "other"] += 1
+            self.stacks[";".join(reversed(labels))] += 1
+
+    # -- reporte ------------------------------------------------------
+    def report(self) -> Dict[str, Any]:
+        with self.lock:
+            report: Dict[str, Any] = {
+                "mode": self.mode,
+                "state": self.state,
+                "started_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(self.started)),
+                "elapsed_s": round(time.time() - self.started, 3),
+                "max_calls": self.max_calls,
+                "seconds": self.seconds,
+                "calls": list(self.calls),
+            }
+            if self.mode == "cprofile":
+                report.update(_cprofile_report(self.stats))
+            else:
+                report.update(self._sample_report())
+        if self.alloc_report is not None:
+            report["allocations"] = self.alloc_report
+        return report
+
+    def _sample_report(self) -> Dict[str, Any]:
+        total = self.samples or 1
+        return {
+            "samples": self.samples,
+            "idle_samples": self.idle_samples,
+            "interval_ms": self.interval * 1000,
+            "categories": {
+                c: {"samples": n, "pct": round(100.0 * n / total, 1)}
+                for c, n in self.category_counts.most_common()
+            },
+            "hot": [
+                {"function": label, "self_pct": round(100.0 * n / total, 1),
+                 "total_pct": round(100.0 * self.inclusive_counts[label] / total, 1)}
+                for label, n in self.self_counts.most_common(TOP_N)
+            ],
+            "stacks": [{"stack": s, "samples": n} for s, n in self.stacks.most_common(TOP_N)],
+        }
+
+
+def _cprofile_report(stats: Optional[pstats.Stats]) -> Dict[str, Any]:
+    if stats is None:
+        return {"total_ms": 0.0, "idle_ms": 0.0, "categories": {}, "hot": [], "cumulative": []}
+    entries = stats.stats  # (archivo, línea, función) → (cc, nc, tottime, cumtime, callers)
+    categories: Counter = Counter()
+    busy = {}
+    for key, value in entries.items():
+        category = categorize(f"{key[0]}:{key[2]}") or "other"
+        categories[category] += value[2]
+        if category != "idle":
+            busy[key] = value
+    idle = categories.pop("idle", 0.0)
+    total = sum(categories.values()) or 1e-9
+
+    def row(key, value) -> Dict[str, Any]:
+        return {"function": _func_label(*key), "calls": value[1],
+                "self_ms": round(value[2] * 1000, 3), "cum_ms": round(value[3] * 1000, 3)}
+
+    by_self = sorted(busy.items(), key=lambda kv: kv[1][2], reverse=True)[:TOP_N]
+    by_cum = sorted(busy.items(), key=lambda kv: kv[1][3], reverse=True)[:TOP_N]
+    return {
+        "total_ms": round(total * 1000, 3),
+        "idle_ms": round(idle * 1000, 3),
+        "categories": {
+            c: {"ms": round(t * 1000, 3), "pct": round(100.0 * t / total, 1)}
+            for c, t in categories.most_common()
+        },
+        "hot": [row(k, v) for k, v in by_self],
+        "cumulative": [row(k, v) for k, v in by_cum],
+    }
+
+
+def _allocation_report(before, after) -> Dict[str, Any]:
+    current, peak = tracemalloc.get_traced_memory()
+    diffs = after.compare_to(before, "lineno")
+    return {
+        "current_kib": round(current / 1024, 1),
+        "peak_kib": round(peak / 1024, 1),
+        "top": [
+            {"where": f"{os.path.basename(d.traceback[0].filename)}:{d.traceback[0].lineno}",
+             "file": d.traceback[0].filename,
+             "size_diff_kib": round(d.size_diff / 1024, 1), "count_diff": d.count_diff}
+            for d in diffs[:TOP_N] if d.size_diff
+        ],
+    }
+
+
+_session: Optional[_Session] = None
+_lock = threading.Lock()
+# Sesión de la llamada perfilada en curso e hilo del event loop que la atiende
+# (viaja al hilo de la tool con el contexto)
+_profiling: ContextVar[Optional[Tuple[_Session, int]]] = ContextVar("profiling_call", default=None)
+
+
+def start(calls: int = 10, seconds: float = 60.0, mode: str = "cprofile", allocations: bool = False,
+          tools: Optional[List[str]] = None, interval_ms: float = 5.0) -> Dict[str, Any]:
+    """Inicia una sesión (ValueError si los parámetros no son válidos o ya hay una en curso)."""
+    global _session
+    if mode not in MODES:
+        raise ValueError(f"mode inválido: {mode!r} ({'|'.join(MODES)})")
+    if not 1 <= int(calls) <= MAX_CALLS:
+        raise ValueError(f"calls debe estar entre 1 y {MAX_CALLS}")
+    if not 0 < float(seconds) <= MAX_SECONDS:
+        raise ValueError(f"seconds debe estar entre 0 y {MAX_SECONDS:g}")
+    if not 0.5 <= float(interval_ms) <= 1000:
+        raise ValueError("interval_ms debe estar entre 0.5 y 1000")
+    with _lock:
+        if _session is not None and _session.state == "running":
+            raise RuntimeError("ya hay una sesión de perfilado en curso")
+        _session = _Session(int(calls), float(seconds), mode, bool(allocations), tools, float(interval_ms))
+        _session.begin()
+        return _session.report()
+
+
+def finish() -> Optional[Dict[str, Any]]:
+    """Termina la sesión en curso (si la hay) y devuelve su reporte."""
+    with _lock:
+        session = _session
+        if session is None:
+            return None
+        if session.state == "running":
+            session.end()
+    return session.report()
+
+
+def report() -> Optional[Dict[str, Any]]:
+    """Reporte de la sesión actual o de la última (None si nunca hubo una)."""
+    session = _session
+    if session is None:
+        return None
+    if session.state == "running" and time.monotonic() >= session.deadline:
+        return finish()
+    return session.report()
+
+
+def _claim(tool: str) -> Optional[_Session]:
+    session = _session
+    if session is None or session.state != "running" or _profiling.get() is not None:
+        return None
+    if session.tools is not None and tool not in session.tools:
+        return None
+    with session.lock:
+        if session.busy or len(session.calls) >= session.max_calls:
+            return None
+        session.busy = True
+    return session
+
+
+@contextmanager
+def _profile_thread(session: _Session, worker: bool = False) -> Iterator[None]:
+    """Perfila el hilo actual mientras dura el bloque (`worker`: un hilo que no es el del loop)."""
+    ident = threading.get_ident()
+    if session.mode == "sample":
+        with session.lock:
+            session.threads[ident] = session.threads.get(ident, 0) + 1
+        try:
+            yield
+        finally:
+            with session.lock:
+                session.threads[ident] -= 1
+                if not session.threads[ident]:
+                    del session.threads[ident]
+        return
+    if worker and CPROFILE_ALL_THREADS:
+        # El perfilador del hilo del loop ya registra este hilo
+        yield
+        return
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # 3.12+: otra herramienta de perfilado ya está activa en el proceso
+        print("[WARN] perfilado omitido: otro perfilador ya está activo")
+        yield
+        return
+    try:
+        yield
+    finally:
+        profiler.disable()
+        with session.lock:
+            if session.stats is None:
+                session.stats = pstats.Stats(profiler)
+            else:
+                session.stats.add(profiler)
+
+
+@contextmanager
+def profile_call(tool: str) -> Iterator[None]:
+    """Perfila la llamada `tool` si hay una sesión que la acepte (si no, no hace nada)."""
+    session = _claim(tool)
+    if session is None:
+        yield
+        return
+    start_time = time.perf_counter()
+    token = _profiling.set((session, threading.get_ident()))
+    try:
+        with _profile_thread(session):
+            yield
+    finally:
+        _profiling.reset(token)
+        with session.lock:
+            session.calls.append({"tool": tool, "ms": round((time.perf_counter() - start_time) * 1000, 3)})
+            session.busy = False
+            done = len(session.calls) >= session.max_calls
+        if done or time.monotonic() >= session.deadline:
+            finish()
+
+
+def _run_profiled(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    active = _profiling.get()
+    # Sin sesión, o corre en el mismo hilo del loop (OFFLOAD_MODE=off), ya perfilado
+    if active is None or active[1] == threading.get_ident():
+        return fn(*args, **kwargs)
+    with _profile_thread(active[0], worker=True):
+        return fn(*args, **kwargs)
+
+
+def wrap_tool(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """Envuelve una tool síncrona para perfilar también el hilo donde corre."""
+    if asyncio.iscoroutinefunction(fn):
+        # Corre en el loop, que ya se perfila; sus saltos a hilos usan `in_thread`
+        return fn
+
+    @functools.wraps(fn)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        return _run_profiled(fn, *args, **kwargs)
+
+    return wrapper
+
+
+def in_thread(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    `fn` para pasar a `anyio.to_thread.run_sync` desde una corrutina: si la
+    llamada en curso se perfila, también se perfila el hilo donde corre.
+    """
+    if _profiling.get() is None:
+        return fn
+    return functools.partial(_run_profiled, fn)
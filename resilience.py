@@ -0,0 +1,131 @@
+# resilience.py
+"""Reintentos con backoff y circuit breaker por ambiente para las RPC a Odoo.
+
+- Solo se reintentan métodos idempotentes (lecturas) y solo ante errores
+  transitorios (timeouts, conexión, HTTP 429/5xx), con backoff exponencial
+  y jitter completo.
+- El circuit breaker de cada ambiente se abre tras N fallos transitorios
+  consecutivos y rechaza de inmediato (`OdooUnavailable`) mientras Odoo está
+  caído; pasado `reset_timeout` deja pasar una llamada de prueba (half-open).
+  Un `Fault` de Odoo cuenta como respuesta (Odoo está vivo).
+"""
+import os
+import random
+import threading
+import time
+import xmlrpc.client
+from typing import Any, Dict
+
+import metrics
+from limiter import is_overload_error
+
+# Métodos de solo lectura que es seguro repetir
+IDEMPOTENT_METHODS = {
+    "search_read", "read", "search", "search_count", "fields_get",
+    "name_search", "name_get", "read_group", "check_access_rights", "default_get",
+}
+
+
+class OdooUnavailable(RuntimeError):
+    """El circuit breaker del ambiente está abierto: Odoo no responde."""
+
+
+def is_transient_error(exc: BaseException) -> bool:
+    """Errores de transporte que pueden resolverse reintentando."""
+    if isinstance(exc, xmlrpc.client.ProtocolError):
+        return exc.errcode >= 500 or exc.errcode == 429
+    if isinstance(exc, xmlrpc.client.Fault):
+        return False
+    return is_overload_error(exc) or isinstance(exc, OSError)
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Backoff exponencial con jitter completo: U(0, min(cap, base * 2^attempt))."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, env: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.env = env
+        self.failure_threshold = int(failure_threshold)
+        self.reset_timeout = float(reset_timeout)
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+        self._publish()
+
+    def _publish(self) -> None:
+        value = {self.CLOSED: 0, self.HALF_OPEN: 1, self.OPEN: 2}[self.state]
+        metrics.BREAKER_STATE.set(value, env=self.env)
+
+    def before_call(self) -> None:
+        """Lanza OdooUnavailable si el circuito está abierto (o ya hay una prueba en curso)."""
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    raise OdooUnavailable(
+                        f"Odoo ({self.env}) no disponible: circuito abierto tras {self.failures} fallos"
+                    )
+                self.state = self.HALF_OPEN
+                self._publish()
+            if self.state == self.HALF_OPEN:
+                if self._probe_in_flight:
+                    raise OdooUnavailable(f"Odoo ({self.env}) en recuperación: esperando llamada de prueba")
+                self._probe_in_flight = True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self._probe_in_flight = False
+            if self.state != self.CLOSED:
+                self.state = self.CLOSED
+                self._publish()
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._probe_in_flight = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self._publish()
+
+    def cancel(self) -> None:
+        """La llamada no llegó a Odoo (p.ej. rechazo local): libera la prueba sin cambiar estado."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            snap: Dict[str, Any] = {"state": self.state, "failures": self.failures}
+            if self.state == self.OPEN:
+                snap["retry_in"] = round(max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at)), 1)
+            return snap
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(env: str) -> CircuitBreaker:
+    """Circuit breaker compartido del ambiente (ODOO_BREAKER_FAILURES / ODOO_BREAKER_RESET)."""
+    with _breakers_lock:
+        breaker = _breakers.get(env)
+        if breaker is None:
+            breaker = _breakers[env] = CircuitBreaker(
+                env,
+                failure_threshold=int(os.getenv("ODOO_BREAKER_FAILURES", "5")),
+                reset_timeout=float(os.getenv("ODOO_BREAKER_RESET", "30")),
+            )
+        return breaker
+
+
+def breaker_states() -> Dict[str, Dict[str, Any]]:
+    with _breakers_lock:
+        return {env: b.snapshot() for env, b in _breakers.items()}
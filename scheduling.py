@@ -0,0 +1,77 @@
+# scheduling.py
+"""Clases de prioridad de las llamadas a tools frente a Odoo.
+
+Cada llamada MCP se clasifica como `interactive` (fetch, get_*, listas
+cortas) o `bulk` (listas grandes, streaming, exportaciones). La clase y la
+sesión MCP de origen viajan en un contextvar (anyio lo copia a los hilos),
+y el limitador de cada ambiente (`limiter.AdaptiveLimiter`) las usa para:
+
+- reservar parte de la capacidad para llamadas interactivas,
+- atender la cola interactiva antes que la bulk (con envejecimiento para
+  que bulk no espere indefinidamente),
+- repartir turnos en round-robin entre sesiones dentro de cada clase.
+
+`TOOL_PRIORITIES="list_sales=bulk,get_sale=interactive"` fija la clase de
+una tool; si no, las tools `export_*` son bulk, y el resto lo es cuando pide
+`stream=True`, `limit=0` o un `limit` mayor que `BULK_LIMIT`.
+"""
+import contextvars
+import os
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+PRIORITIES = (INTERACTIVE, BULK)
+
+BULK_LIMIT = int(os.getenv("BULK_LIMIT", "500"))
+
+
+def _parse_priorities(raw: str) -> Dict[str, str]:
+    mapping = {}
+    for item in raw.split(","):
+        tool, _, priority = item.strip().partition("=")
+        if not tool:
+            continue
+        priority = priority.strip().lower()
+        if priority not in PRIORITIES:
+            raise ValueError(f"TOOL_PRIORITIES: prioridad inválida {priority!r} para {tool!r} (interactive|bulk)")
+        mapping[tool.strip()] = priority
+    return mapping
+
+
+TOOL_PRIORITIES = _parse_priorities(os.getenv("TOOL_PRIORITIES", ""))
+
+# (prioridad, sesión) de la llamada en curso; fuera de una tool cuenta como interactiva
+_current: contextvars.ContextVar[Tuple[str, Optional[Any]]] = contextvars.ContextVar(
+    "odoo_call_priority", default=(INTERACTIVE, None)
+)
+
+
+def classify(tool: str, arguments: Optional[Dict[str, Any]] = None) -> str:
+    """Clase de prioridad de una llamada según la tool y sus argumentos."""
+    if tool in TOOL_PRIORITIES:
+        return TOOL_PRIORITIES[tool]
+    if tool.startswith("export_"):
+        return BULK
+    args = arguments or {}
+    if args.get("stream"):
+        return BULK
+    limit = args.get("limit")
+    if isinstance(limit, int) and not isinstance(limit, bool) and (limit == 0 or limit > BULK_LIMIT):
+        return BULK
+    return INTERACTIVE
+
+
+@contextmanager
+def call_context(priority: str, session: Optional[Any] = None) -> Iterator[None]:
+    """Marca las RPC hechas dentro del bloque con la prioridad y la sesión dadas."""
+    token = _current.set((priority, session))
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def current() -> Tuple[str, Optional[Any]]:
+    return _current.get()
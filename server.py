@@ -1,61 +1,296 @@
 # server.py
+import time
+
+# Inicio del import de server (perfil de arranque con STARTUP_PROFILE=1)
+_IMPORT_START = time.perf_counter()
+
 import os
+import hmac
 import json
+import threading
+import urllib.parse
 from typing import Dict, Any, List, Optional
+import anyio
 from dotenv import load_dotenv
 from mcp.server.fastmcp import FastMCP
+from mcp.types import CallToolResult, TextContent, Tool as MCPTool
 
 # Cargar variables de entorno del archivo .env
 load_dotenv()
 
+import artifacts
+import coalescing
+import invalidation
+import metrics
+import offload
+import profiling
+import scheduling
+import tenants
+import tracing
+from cassette import get_cassette
 from odoo_client import OdooClient
-from tools import load_all
+from versioning import check_not_modified, version_token
+from htmltext import cached_text, text_range
+from prefetch import FETCH_FIELDS, KINDS, DocCache
+from limiter import limiter_states
+from resilience import breaker_states
+from shared_cache import worker_count
+from name_index import NameIndex
+from encoding import compact_rows, dumps
+from tools import STARTUP_PROFILE, TOOL_FILTER, TOOLS_LAZY, load_all, tool_allowed
 
 # -----------------------------
 # Helpers de inicialización
 # -----------------------------
+def _response_size(result: Any) -> int:
+    """Bytes de texto en los bloques `content` del resultado de una tool.
+
+    No se re-serializa structuredContent (lleva los mismos datos) para no
+    duplicar el costo de codificación en cada llamada.
+    """
+    if isinstance(result, tuple):
+        result = result[0]
+    content = getattr(result, "content", result)
+    return sum(len(getattr(block, "text", "") or "") for block in content or [])
+
+
+TRACE_DEBUG = os.getenv("TRACE_DEBUG", "").lower() in ("1", "true", "yes")
+
+
+def _wants_timings(server: FastMCP) -> bool:
+    """Desglose de RPC si TRACE_DEBUG=1 o el request trae `_meta.debug_timings`."""
+    if TRACE_DEBUG:
+        return True
+    try:
+        meta = server.get_context().request_context.meta
+    except (LookupError, ValueError):
+        return False
+    extra = getattr(meta, "model_extra", None) or {}
+    return bool(extra.get("debug_timings"))
+
+
+def _attach_timings(result: Any, timings: Dict[str, Any]) -> Any:
+    """Agrega un bloque de texto `{"_timings": ...}` al content del resultado."""
+    block = TextContent(type="text", text=json.dumps({"_timings": timings}))
+    if isinstance(result, tuple):
+        content, structured = result
+        return list(content) + [block], structured
+    if isinstance(result, CallToolResult):
+        result.content.append(block)
+        return result
+    return list(result) + [block]
+
+
+def _record_tool(name: str, arguments: Dict[str, Any], elapsed: float, status: str) -> None:
+    """Graba la llamada en el cassette (ODOO_CASSETTE_MODE=record) para `bench/replay.py`."""
+    tape = get_cassette()
+    if tape is not None:
+        tape.record_tool(name, arguments or {}, elapsed * 1000, status)
+
+
+class OdooMCP(FastMCP):
+    """FastMCP con métricas, trazas, desglose opcional de RPC y registro perezoso de tools."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # nombre -> (metadatos anunciados, loader del módulo que registra la tool real)
+        self._lazy_tools: Dict[str, Any] = {}
+        self._lazy_lock = threading.Lock()
+
+    def add_lazy_tools(self, tools: List[Dict[str, Any]], loader) -> None:
+        """Anuncia tools desde metadatos; `loader` registra las reales en la primera llamada."""
+        for meta in tools:
+            if tool_allowed(meta["name"]):
+                self._lazy_tools[meta["name"]] = (MCPTool.model_validate(meta), loader)
+
+    def _load_lazy(self, name: str) -> None:
+        with self._lazy_lock:
+            entry = self._lazy_tools.get(name)
+            if entry is None:
+                return
+            loader = entry[1]
+            loader()
+            for other in [n for n, (_, l) in self._lazy_tools.items() if l is loader]:
+                del self._lazy_tools[other]
+
+    async def list_tools(self) -> List[MCPTool]:
+        tools = await super().list_tools()
+        tools = tools + [meta for meta, _ in list(self._lazy_tools.values())]
+        if tenants.MULTI_TENANT:
+            tools = [_with_tenant_arg(t) for t in tools]
+        return tools
+
+    def add_tool(self, fn, name: Optional[str] = None, *args, **kwargs) -> None:
+        # Tools fuera del perfil de despliegue (TOOLS_PROFILE / TOOLS_ENABLED / ...) no se registran
+        if not tool_allowed(name or fn.__name__):
+            return
+        # Las tools síncronas bloquean el event loop: se ejecutan en hilos (OFFLOAD_MODE)
+        super().add_tool(offload.offload_sync_tool(profiling.wrap_tool(fn)), name, *args, **kwargs)
+
+    def _request_tenant(self) -> Optional[str]:
+        """Tenant del header HTTP de la sesión (None sin header o fuera de HTTP)."""
+        try:
+            request = self.get_context().request_context.request
+        except (LookupError, ValueError):
+            return None
+        headers = getattr(request, "headers", None)
+        return headers.get(tenants.TENANT_HEADER) if headers is not None else None
+
+    def _session_key(self) -> Optional[int]:
+        """Identifica la sesión MCP de la llamada (para repartir turnos entre sesiones)."""
+        try:
+            return id(self.get_context().request_context.session)
+        except (LookupError, ValueError):
+            return None
+
+    async def call_tool(self, name: str, arguments: Dict[str, Any]):
+        start = time.perf_counter()
+        recorded_arguments = arguments
+        # Tenant: argumento `tenant` > header de la sesión > tenant por defecto
+        tenant = None
+        if tenants.MULTI_TENANT:
+            arguments = dict(arguments or {})
+            tenant = arguments.pop("tenant", None) or self._request_tenant()
+        if name in self._lazy_tools:
+            # Primer uso: importa el módulo (y crea sus clientes) fuera del event loop
+            await offload.run_sync(self._load_lazy, name)
+        priority = scheduling.classify(name, arguments)
+        with tenants.tenant_context(tenant) as tenant, \
+                tracing.span(f"tool {name}", **{"mcp.tool": name, "mcp.priority": priority, "odoo.tenant": tenant}), \
+                tracing.collect_timings() as rpcs, scheduling.call_context(priority, self._session_key()):
+            try:
+                with profiling.profile_call(name):
+                    result = await super().call_tool(name, arguments)
+            except Exception:
+                metrics.observe_tool(name, time.perf_counter() - start, "error")
+                _record_tool(name, recorded_arguments, time.perf_counter() - start, "error")
+                raise
+        elapsed = time.perf_counter() - start
+        status = "error" if getattr(result, "isError", False) else "ok"
+        metrics.observe_tool(name, elapsed, status, _response_size(result))
+        _record_tool(name, recorded_arguments, elapsed, status)
+        if _wants_timings(self):
+            result = _attach_timings(result, {
+                "total_ms": round(elapsed * 1000, 3),
+                "rpc_ms": round(sum(r["ms"] for r in rpcs), 3),
+                "rpcs": rpcs,
+            })
+        return result
+
+
+def _with_tenant_arg(tool: MCPTool) -> MCPTool:
+    """Copia de `tool` con el argumento opcional `tenant` en su esquema de entrada."""
+    schema = dict(tool.inputSchema or {"type": "object"})
+    properties = dict(schema.get("properties") or {})
+    properties["tenant"] = {
+        "type": "string",
+        "enum": tenants.TENANTS,
+        "description": f"Base de Odoo a consultar (default: {tenants.DEFAULT_TENANT})",
+    }
+    schema["properties"] = properties
+    return tool.model_copy(update={"inputSchema": schema})
+
+
 # Configurar FastMCP
-mcp = FastMCP("OdooMCP")
+# Con varios workers cada request puede caer en otro proceso: las sesiones
+# Streamable HTTP no se comparten, así que se atiende en modo stateless.
+MCP_STATELESS_HTTP = os.getenv("MCP_STATELESS_HTTP", "1" if worker_count() > 1 else "0").lower() in ("1", "true", "yes")
+mcp = OdooMCP("OdooMCP", stateless_http=MCP_STATELESS_HTTP)
 deps: Dict[str, Any] = {}
+# Documentos de fetch (precargados tras search); ver prefetch.py
+doc_cache = DocCache()
 _tools_loaded = False
+_deps_lock = threading.Lock()
+
+
+def _tenant_deps(name: str, config: Dict[str, Any]) -> Dict[str, Any]:
+    """Cliente Odoo, índice de nombres y poller de invalidación de un tenant."""
+    env_names = {"url": "ODOO_URL", "db": "ODOO_DB", "username": "ODOO_LOGIN", "password": "ODOO_API_KEY"}
+    missing = [config["settings_prefix"] + env for key, env in env_names.items() if not config[key]]
+    if missing and config["settings_prefix"]:
+        # Sin esto OdooClient caería en las variables ODOO_* del tenant por defecto
+        raise ValueError(f"Tenant {name}: faltan {', '.join(missing)}")
+    if missing:
+        # No abortamos el arranque para que /health funcione; pero logueamos.
+        print(f"[WARN] missing envs: {missing}")
+    odoo = OdooClient(config["url"] or None, config["db"] or None, config["username"] or None,
+                      config["password"] or None, env=config["env"],
+                      settings_prefix=config["settings_prefix"])
+    tenant_deps: Dict[str, Any] = {"odoo": odoo, "names": NameIndex(odoo)}
+    if invalidation.INVALIDATION_POLL > 0:
+        # Las filas de fetch también se cachean: sus modelos entran en el polling
+        models = invalidation.watched_models(list(dict.fromkeys([*tenant_deps["names"].models, *FETCH_FIELDS])))
+        tenant_deps["poller"] = invalidation.WriteDatePoller(odoo, models, invalidation.INVALIDATION_POLL).start()
+    return tenant_deps
+
+
+def _init_deps() -> None:
+    """Crea (una vez) el cliente Odoo de producción y el índice de nombres.
+
+    Con varios tenants (ODOO_TENANTS) `deps["odoo"]` y `deps["names"]` son
+    delegados que resuelven el tenant de cada llamada; sus dependencias se
+    crean en el primer uso de cada tenant.
+    """
+    with _deps_lock:
+        if "odoo" in deps:
+            return
+        if tenants.MULTI_TENANT:
+            registry = deps["tenants"] = tenants.TenantRegistry(_tenant_deps)
+            deps["names"] = tenants.TenantProxy(registry, "names")
+            deps["odoo"] = tenants.TenantProxy(registry, "odoo")
+            return
+        tenant_deps = _tenant_deps(tenants.DEFAULT_TENANT, tenants.tenant_config(tenants.DEFAULT_TENANT))
+        deps["names"] = tenant_deps["names"]
+        deps["odoo"] = tenant_deps["odoo"]
+        if "poller" in tenant_deps:
+            deps["poller"] = tenant_deps["poller"]
 
 
 def init_tools_once() -> None:
-    """Carga cliente Odoo y registra tools modulares una sola vez (idempotente)."""
+    """Registra tools modulares una sola vez (idempotente).
+
+    Con TOOLS_LAZY=1 el cliente Odoo y los módulos de tools se cargan en la
+    primera llamada que los necesita; si no, aquí mismo.
+    """
     global _tools_loaded
     if _tools_loaded:
         return
-    required = ["ODOO_URL", "ODOO_DB", "ODOO_LOGIN", "ODOO_API_KEY"]
-    missing = [k for k in required if not os.getenv(k)]
-    if missing:
-        # No abortamos el arranque para que /health funcione; pero logueamos.
-        print(f"[WARN] missing envs: {missing}")
-    deps["odoo"] = OdooClient()
+    start = time.perf_counter()
+    if not TOOLS_LAZY:
+        _init_deps()
     print("[INFO] Loading tools from tools/ directory...")
-    load_all(mcp, deps)
+    load_all(mcp, deps, lazy=TOOLS_LAZY, before_load=_init_deps)
     _tools_loaded = True
-    print("[INFO] MCP tools registered successfully.")
+    print(f"[INFO] MCP tools registered successfully "
+          f"({len(mcp._tool_manager.list_tools()) + len(mcp._lazy_tools)} tools, perfil {TOOL_FILTER['profile']}).")
+    if STARTUP_PROFILE:
+        print(f"[PROFILE] init_tools_once: {(time.perf_counter() - start) * 1000:.1f}ms (lazy={TOOLS_LAZY})")
 
 
 def _odoo():
     init_tools_once()
-    return deps["odoo"]
+    _init_deps()
+    # Cliente concreto del tenant de la llamada (la precarga lo usa en otros hilos)
+    return tenants.resolve(deps["odoo"])
 
 
 def _odoo_form_url(model: str, rec_id: int) -> str:
-    base = os.environ.get("ODOO_URL", "").rstrip("/")
+    base = tenants.tenant_config(tenants.current())["url"].rstrip("/")
     if not base:
         return f"odoo://{model}/{rec_id}"
     return f"{base}/web#id={rec_id}&model={model}&view_type=form"
 
 
-def _encode_content(obj: Any) -> Dict[str, Any]:
-    """Envuelve en content array (1 item, type=text, JSON-encoded string)."""
+def _encode_content(obj: Any, compact: bool = False) -> Dict[str, Any]:
+    """Envuelve en content array (1 item, type=text, JSON-encoded string).
+
+    Con `compact=True` el JSON se emite sin espacios entre separadores.
+    """
     return {
         "content": [
             {
                 "type": "text",
-                "text": json.dumps(obj, ensure_ascii=False),
+                "text": dumps(obj, compact=compact),
             }
         ]
     }
@@ -85,15 +320,18 @@ def _wants_tasks(q: str) -> bool:
     name="search",
     description="Busca en Odoo proyectos y/o tareas según el query. Devuelve results[] con id/title/url.",
 )
-def mcp_search(query: str, limit: int = 10) -> Dict[str, Any]:
+def mcp_search(query: str, limit: int = 10, compact: bool = False) -> Dict[str, Any]:
     """
     Args:
         query: cadena de búsqueda (ilike)
         limit: máximo de resultados total
+        compact: si True, results va en formato columnar (fields/rows)
 
     Returns (content array, type=text, JSON string):
       {"results":[{"id":"project:1","title":"Project · X","url":"..."},
                   {"id":"task:2","title":"Task · Y","url":"..."}]}
+      compact=True:
+      {"results":{"fields":["id","title","url"],"rows":[["project:1","Project · X","..."]],"refs":{}}}
     """
     odoo = _odoo()
     want_p = _wants_projects(query)
@@ -141,6 +379,11 @@ def mcp_search(query: str, limit: int = 10) -> Dict[str, Any]:
                 }
             )
 
+    # Deep Research suele pedir fetch de los primeros resultados: se precargan en segundo plano
+    doc_cache.prefetch(odoo, [item["id"] for item in results])
+
+    if compact:
+        return _encode_content({"results": compact_rows(results)}, compact=True)
     return _encode_content({"results": results})
 
 
@@ -148,13 +391,20 @@ def mcp_search(query: str, limit: int = 10) -> Dict[str, Any]:
     name="fetch",
     description="Recupera el documento completo por id (project:<id> o task:<id>) con texto y metadatos.",
 )
-def mcp_fetch(doc_id: str) -> Dict[str, Any]:
+def mcp_fetch(doc_id: str, compact: bool = False, if_version: Optional[str] = None,
+              offset: int = 0, max_chars: Optional[int] = None) -> Dict[str, Any]:
     """
     Args:
         doc_id: "project:<id>" o "task:<id>"
+        compact: si True, JSON sin espacios y sin metadatos vacíos
+        if_version: `metadata.version` de un fetch anterior; si el registro no
+            cambió se responde solo {"id","not_modified":true,"version"}
+        offset / max_chars: tramo del texto a devolver (`max_chars` por defecto
+            `TEXT_MAX_CHARS`, 0 = completo); si queda texto,
+            `metadata.text_range.next_offset` indica desde dónde seguir
 
     Returns (content array, type=text, JSON string):
-      {"id":"task:123","title":"...","text":"...","url":"...","metadata":{...}}
+      {"id":"task:123","title":"...","text":"...","url":"...","metadata":{...,"version":"..."}}
     """
     odoo = _odoo()
     if ":" not in doc_id:
@@ -168,45 +418,68 @@ def mcp_fetch(doc_id: str) -> Dict[str, Any]:
     except ValueError:
         return _encode_content({"error": "Invalid numeric id."})
 
+    try:
+        text_range("", offset, max_chars)
+    except ValueError as e:
+        return _encode_content({"error": str(e)})
+
+    model = KINDS.get(kind)
+    variant = f"fetch:{compact}:{offset}:{max_chars}"
+    # Fila precargada por search (o por un fetch reciente), si la hay
+    cached = doc_cache.get(odoo, model, rid) if model else None
+    if model and if_version:
+        # Sin polling sobre el modelo la fila cacheada puede no reflejar ediciones
+        # hechas en Odoo: la versión se confirma contra el registro
+        if cached is not None and invalidation.polled(odoo.cache_prefix(), model):
+            unchanged = version_token(model, rid, cached.get("write_date"), variant) == if_version
+            metrics.cache_event("if_version", hit=unchanged)
+        else:
+            unchanged = check_not_modified(odoo, model, rid, if_version, variant) is not None
+            if not unchanged and cached is not None and \
+                    version_token(model, rid, cached.get("write_date"), variant) == if_version:
+                # La fila cacheada es la versión que el cliente ya tiene: está vencida
+                cached = None
+        if unchanged:
+            return _encode_content({"id": doc_id, "not_modified": True, "version": if_version}, compact=compact)
+
+    def read_row() -> Optional[Dict[str, Any]]:
+        if cached is not None:
+            return cached
+        rows = odoo.search_read(model, [["id", "=", rid]], FETCH_FIELDS[model], 1)
+        doc_cache.put(odoo, model, rows)
+        return rows[0] if rows else None
+
     if kind == "project":
-        rows = odoo.search_read(
-            "project.project", [["id", "=", rid]], ["id", "name", "active"], 1
-        )
-        if not rows:
+        r = read_row()
+        if r is None:
             return _encode_content({"error": f"Project {rid} not found"})
-        r = rows[0]
         title = f"Project · {r.get('name','(sin nombre)')}"
-        text = r.get("name", "")
+        part = text_range(r.get("name", ""), offset, max_chars)
         url = _odoo_form_url("project.project", rid)
         doc = {
             "id": f"project:{rid}",
             "title": title,
-            "text": text,
+            "text": part.pop("text"),
             "url": url,
-            "metadata": {"model": "project.project", "active": r.get("active", True)},
+            "metadata": {
+                "model": "project.project",
+                "active": r.get("active", True),
+                "version": version_token("project.project", rid, r.get("write_date"), variant),
+            },
         }
-        return _encode_content(doc)
+        if part["offset"] or part["next_offset"] is not None:
+            doc["metadata"]["text_range"] = part
+        return _encode_content(doc, compact=compact)
 
     if kind == "task":
-        rows = odoo.search_read(
-            "project.task",
-            [["id", "=", rid]],
-            [
-                "id",
-                "name",
-                "project_id",
-                "user_id",
-                "stage_id",
-                "date_deadline",
-                "description",
-            ],
-            1,
-        )
-        if not rows:
+        r = read_row()
+        if r is None:
             return _encode_content({"error": f"Task {rid} not found"})
-        r = rows[0]
         title = f"Task · {r.get('name','(sin nombre)')}"
-        text = (r.get("description") or r.get("name") or "").strip()
+        # Descripción HTML → texto plano (cacheado por write_date)
+        text = cached_text(odoo, "project.task", rid, r.get("write_date"), r.get("description"))
+        part = text_range(text or (r.get("name") or "").strip(), offset, max_chars)
+        text = part.pop("text")
         url = _odoo_form_url("project.task", rid)
         # project_id/user_id/stage_id suelen venir como [id, "Nombre"]
         meta: Dict[str, Any] = {"model": "project.task"}
@@ -217,6 +490,9 @@ def mcp_fetch(doc_id: str) -> Dict[str, Any]:
             else:
                 meta[key] = val
         meta["date_deadline"] = r.get("date_deadline")
+        meta["version"] = version_token("project.task", rid, r.get("write_date"), variant)
+        if part["offset"] or part["next_offset"] is not None:
+            meta["text_range"] = part
         doc = {
             "id": f"task:{rid}",
             "title": title,
@@ -224,7 +500,9 @@ def mcp_fetch(doc_id: str) -> Dict[str, Any]:
             "url": url,
             "metadata": meta,
         }
-        return _encode_content(doc)
+        if compact:
+            doc["metadata"] = {k: v for k, v in meta.items() if v not in (None, False)}
+        return _encode_content(doc, compact=compact)
 
     return _encode_content(
         {"error": f"Unknown kind '{kind}'. Use 'project' or 'task'."}
@@ -264,10 +542,190 @@ async def mcp_app(scope, receive, send):
     await _mcp_app_internal(scope, receive, send)
 
 
+async def _read_body(receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+
+async def _send_json(send, status: int, obj: Any) -> None:
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json")],
+        }
+    )
+    await send({"type": "http.response.body", "body": json.dumps(obj).encode("utf-8")})
+
+
+def _webhook_token(scope) -> str:
+    for name, value in scope.get("headers", []):
+        if name.lower() == b"x-invalidation-token":
+            return value.decode("latin-1")
+    # Las notificaciones webhook de Odoo no permiten headers propios: token en la URL
+    query = urllib.parse.parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    return (query.get("token") or [""])[0]
+
+
+def _webhook_tenant(scope) -> str:
+    """Tenant del aviso: header `X-Odoo-Tenant` o `?tenant=` (default: tenant por defecto)."""
+    for name, value in scope.get("headers", []):
+        if name.lower() == tenants.TENANT_HEADER.encode("latin-1"):
+            return value.decode("latin-1")
+    query = urllib.parse.parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    return (query.get("tenant") or [tenants.DEFAULT_TENANT])[0]
+
+
+async def _invalidate_endpoint(scope, receive, send) -> None:
+    """POST /invalidate: avisos de cambios en Odoo (ver invalidation.py)."""
+    if not invalidation.INVALIDATION_TOKEN:
+        await _send_json(send, 404, {"error": "invalidation webhook disabled (CACHE_INVALIDATION_TOKEN)"})
+        return
+    if scope.get("method") != "POST":
+        await _send_json(send, 405, {"error": "use POST"})
+        return
+    if not hmac.compare_digest(_webhook_token(scope).encode("utf-8"), invalidation.INVALIDATION_TOKEN.encode("utf-8")):
+        await _send_json(send, 401, {"error": "invalid token"})
+        return
+    try:
+        changes = invalidation.parse_webhook(json.loads(await _read_body(receive) or b"null"))
+    except ValueError as e:
+        await _send_json(send, 400, {"error": str(e)})
+        return
+    try:
+        prefix = tenants.cache_prefix(_webhook_tenant(scope))
+    except ValueError as e:
+        await _send_json(send, 400, {"error": str(e)})
+        return
+    for change in changes:
+        # Corregir el índice de nombres puede releer registros de Odoo: fuera del loop
+        await offload.run_sync(invalidation.notify, prefix, change["model"], change["ids"], "webhook")
+    await _send_json(send, 200, {"ok": True, "changes": len(changes)})
+
+
+def _admin_token(scope) -> str:
+    for name, value in scope.get("headers", []):
+        if name.lower() == b"x-admin-token":
+            return value.decode("latin-1")
+    return ""
+
+
+async def _profile_endpoint(scope, receive, send) -> None:
+    """/admin/profile: POST inicia una sesión de perfilado, GET la consulta, DELETE la termina."""
+    if not profiling.ADMIN_TOKEN:
+        await _send_json(send, 404, {"error": "admin endpoints disabled (ADMIN_TOKEN)"})
+        return
+    if not hmac.compare_digest(_admin_token(scope).encode("utf-8"), profiling.ADMIN_TOKEN.encode("utf-8")):
+        await _send_json(send, 401, {"error": "invalid token"})
+        return
+    method = scope.get("method")
+    if method == "POST":
+        try:
+            options = json.loads(await _read_body(receive) or b"{}")
+            if not isinstance(options, dict):
+                raise ValueError("el cuerpo debe ser un objeto JSON")
+            unknown = set(options) - {"calls", "seconds", "mode", "allocations", "tools", "interval_ms"}
+            if unknown:
+                raise ValueError(f"opciones desconocidas: {', '.join(sorted(unknown))}")
+            report = profiling.start(**options)
+        except RuntimeError as e:
+            await _send_json(send, 409, {"error": str(e)})
+            return
+        except (TypeError, ValueError) as e:
+            await _send_json(send, 400, {"error": str(e)})
+            return
+        await _send_json(send, 200, report)
+        return
+    if method in ("GET", "DELETE"):
+        # Armar el reporte (pstats / tracemalloc) puede tardar: fuera del loop
+        report = await offload.run_sync(profiling.finish if method == "DELETE" else profiling.report)
+        if report is None:
+            await _send_json(send, 404, {"error": "no profiling session"})
+            return
+        await _send_json(send, 200, report)
+        return
+    await _send_json(send, 405, {"error": "use POST, GET or DELETE"})
+
+
+async def _export_endpoint(scope, send) -> None:
+    """GET /exports/<handle>: descarga por chunks de un archivo de `export_records` (HEAD: solo headers)."""
+    method = scope.get("method")
+    if method not in ("GET", "HEAD"):
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 405,
+                "headers": [(b"content-type", b"application/json"), (b"allow", b"GET, HEAD")],
+            }
+        )
+        await send({"type": "http.response.body", "body": json.dumps({"error": "use GET"}).encode("utf-8")})
+        return
+    handle = scope["path"][len("/exports/"):]
+    found = await offload.run_sync(artifacts.open_export, handle)
+    if found is None:
+        await _send_json(send, 404, {"error": "export not found or expired"})
+        return
+    meta, chunks = found
+    content_type = artifacts.FORMATS[meta["format"]][0]
+    await send(
+        {
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", content_type.encode("latin-1")),
+                (b"content-length", str(meta["bytes"]).encode("latin-1")),
+                (b"content-disposition", f'attachment; filename="{meta["filename"]}"'.encode("latin-1")),
+            ],
+        }
+    )
+    if method == "HEAD":
+        await send({"type": "http.response.body", "body": b""})
+        return
+    sentinel = object()
+    try:
+        while True:
+            chunk = await offload.run_sync(next, chunks, sentinel)
+            if chunk is sentinel:
+                break
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+    finally:
+        # Cliente desconectado a mitad de la descarga: cierra el archivo
+        chunks.close()
+    await send({"type": "http.response.body", "body": b""})
+
+
+def _shutdown() -> None:
+    """Al apagar el worker: envía las escrituras agrupadas que queden pendientes."""
+    flushed = coalescing.flush_all()
+    if flushed:
+        print(f"[INFO] shutdown: {flushed} escrituras diferidas enviadas")
+
+
+def _lifespan_send(send):
+    async def wrapped(message):
+        if message["type"] == "lifespan.shutdown.complete":
+            await anyio.to_thread.run_sync(_shutdown)
+        await send(message)
+
+    return wrapped
+
+
 async def app(scope, receive, send):
+    # Lifespan: el shutdown vacía antes los buffers de escritura
+    if scope["type"] == "lifespan":
+        await mcp_app(scope, receive, _lifespan_send(send))
+        return
+
     # Health para App Runner
     if scope["type"] == "http" and scope.get("path") == "/health":
-        body = b'{"ok": true}'
+        # Siempre 200 (App Runner); el estado de Odoo se informa sin bloquear
+        body = json.dumps(
+            {"ok": True, "odoo": {"breakers": breaker_states(), "limiters": limiter_states()}}
+        ).encode("utf-8")
         await send(
             {
                 "type": "http.response.start",
@@ -278,6 +736,34 @@ async def app(scope, receive, send):
         await send({"type": "http.response.body", "body": body})
         return
 
+    # Métricas en formato Prometheus
+    if scope["type"] == "http" and scope.get("path") == "/metrics":
+        body = metrics.render().encode("utf-8")
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [(b"content-type", b"text/plain; version=0.0.4; charset=utf-8")],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
+        return
+
+    # Webhook de invalidación de caches (Odoo → servidor)
+    if scope["type"] == "http" and scope.get("path") == "/invalidate":
+        await _invalidate_endpoint(scope, receive, send)
+        return
+
+    # Perfilado bajo demanda (protegido con ADMIN_TOKEN)
+    if scope["type"] == "http" and scope.get("path") == "/admin/profile":
+        await _profile_endpoint(scope, receive, send)
+        return
+
+    # Descarga de exportaciones (el handle aleatorio es la credencial)
+    if scope["type"] == "http" and scope.get("path", "").startswith("/exports/"):
+        await _export_endpoint(scope, send)
+        return
+
     # Primer request real: registra tools modulares
     if not _tools_loaded:
         try:
@@ -302,6 +788,10 @@ async def app(scope, receive, send):
     await mcp_app(scope, receive, send)
 
 
+if STARTUP_PROFILE:
+    print(f"[PROFILE] import server: {(time.perf_counter() - _IMPORT_START) * 1000:.1f}ms")
+
+
 # Local run
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,284 @@
+# shared_cache.py
+"""Cache clave → valor compartido entre workers del servidor.
+
+Con varios workers (uvicorn `--workers` / gunicorn) cada proceso tiene su
+propia memoria: sin un almacén común cada worker repetiría autenticación,
+`fields_get` e índices de nombres contra Odoo. Este módulo ofrece dos
+backends con la misma interfaz:
+
+- `MemoryCache`: dict en proceso (un solo worker, el default).
+- `SQLiteCache`: archivo SQLite local en modo WAL, compartido por todos los
+  procesos del contenedor. `get_or_load` coordina a los workers con una
+  reserva (lease) por clave para que solo uno consulte Odoo ante un fallo.
+
+`acquire_lease` elige un único dueño para una tarea periódica (p.ej. el
+polling de invalidación): el dueño la renueva en cada ronda y, si deja de
+hacerlo, otro worker la toma cuando vence.
+
+`CACHE_BACKEND=memory|sqlite` elige el backend; por defecto se usa SQLite
+cuando `WEB_CONCURRENCY` > 1. Los valores deben ser serializables a JSON.
+"""
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional, Tuple
+
+import metrics
+from encoding import dumps
+
+_MISSING = object()
+
+
+def worker_count() -> int:
+    """Workers del servidor según WEB_CONCURRENCY (la misma variable que lee uvicorn)."""
+    try:
+        return max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+    except ValueError:
+        return 1
+
+
+class KeyedLocks:
+    """Un Lock por clave que solo existe mientras algún hilo lo usa."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # clave → [lock, hilos que lo usan o esperan]
+        self._locks: Dict[Hashable, List[Any]] = {}
+
+    @contextmanager
+    def hold(self, key: Hashable) -> Iterator[None]:
+        with self._lock:
+            entry = self._locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._locks[key]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._locks)
+
+
+class MemoryCache:
+    """Cache en proceso con TTL por clave."""
+
+    backend = "memory"
+    # Cada cuántas escrituras se purgan las entradas vencidas
+    PURGE_EVERY = 500
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[Any, float]] = {}
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._key_locks = KeyedLocks()
+        # clave → (dueño, vencimiento)
+        self._leases: Dict[str, Tuple[str, float]] = {}
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            value, expires = item
+            if expires < time.time():
+                del self._data[key]
+                return default
+            return value
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        now = time.time()
+        with self._lock:
+            self._data[key] = (value, now + ttl)
+            self._writes += 1
+            if self._writes % self.PURGE_EVERY == 0:
+                # Claves que nunca se vuelven a leer (p.ej. precargas) no deben acumularse
+                for k in [k for k, (_, expires) in self._data.items() if expires < now]:
+                    del self._data[k]
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_prefix(self, prefix: str) -> int:
+        with self._lock:
+            keys = [k for k in self._data if k.startswith(prefix)]
+            for k in keys:
+                del self._data[k]
+            return len(keys)
+
+    def acquire_lease(self, key: str, owner: str, ttl: float) -> bool:
+        """Toma o renueva la reserva `key` para `owner`; False si otro la tiene vigente."""
+        now = time.time()
+        with self._lock:
+            current = self._leases.get(key)
+            if current is not None and current[0] != owner and current[1] >= now:
+                return False
+            self._leases[key] = (owner, now + ttl)
+            return True
+
+    def release_lease(self, key: str, owner: str) -> None:
+        with self._lock:
+            if self._leases.get(key, ("",))[0] == owner:
+                del self._leases[key]
+
+    def get_or_load(self, key: str, ttl: float, loader: Callable[[], Any], name: str = "shared") -> Any:
+        """Devuelve el valor cacheado o lo carga una sola vez (los demás hilos esperan)."""
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            metrics.cache_event(name, hit=True)
+            return value
+        with self._key_locks.hold(key):
+            value = self.get(key, _MISSING)
+            if value is not _MISSING:
+                metrics.cache_event(name, hit=True)
+                return value
+            metrics.cache_event(name, hit=False)
+            value = loader()
+            self.set(key, value, ttl)
+            return value
+
+
+class SQLiteCache:
+    """Cache en un archivo SQLite compartido por los procesos del host."""
+
+    backend = "sqlite"
+    # Cada cuántas escrituras se purgan las entradas vencidas
+    PURGE_EVERY = 500
+
+    def __init__(self, path: str, lease_timeout: float = 30.0):
+        self.path = path
+        # Tiempo máximo que un worker espera a que otro termine de cargar una clave
+        self.lease_timeout = lease_timeout
+        self._local = threading.local()
+        self._writes = 0
+        conn = self._conn()
+        conn.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL)")
+        conn.execute("CREATE TABLE IF NOT EXISTS leases (key TEXT PRIMARY KEY, expires REAL NOT NULL)")
+        conn.execute("CREATE TABLE IF NOT EXISTS owned_leases "
+                     "(key TEXT PRIMARY KEY, owner TEXT NOT NULL, expires REAL NOT NULL)")
+
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite3.Connection no se comparte entre hilos: una por hilo
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str, default: Any = None) -> Any:
+        row = self._conn().execute(
+            "SELECT value FROM cache WHERE key = ? AND expires >= ?", (key, time.time())
+        ).fetchone()
+        return default if row is None else json.loads(row[0])
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)",
+            (key, dumps(value, compact=True), now + ttl),
+        )
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY == 0:
+            conn.execute("DELETE FROM cache WHERE expires < ?", (now,))
+            conn.execute("DELETE FROM leases WHERE expires < ?", (now,))
+
+    def delete(self, key: str) -> None:
+        self._conn().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def delete_prefix(self, prefix: str) -> int:
+        escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        cur = self._conn().execute("DELETE FROM cache WHERE key LIKE ? ESCAPE '\\'", (escaped + "%",))
+        return cur.rowcount
+
+    def _take_lease(self, key: str) -> bool:
+        now = time.time()
+        conn = self._conn()
+        conn.execute("DELETE FROM leases WHERE key = ? AND expires < ?", (key, now))
+        cur = conn.execute("INSERT OR IGNORE INTO leases (key, expires) VALUES (?, ?)",
+                           (key, now + self.lease_timeout))
+        return cur.rowcount == 1
+
+    def _release_lease(self, key: str) -> None:
+        self._conn().execute("DELETE FROM leases WHERE key = ?", (key,))
+
+    def acquire_lease(self, key: str, owner: str, ttl: float) -> bool:
+        """Toma o renueva la reserva `key` para `owner`; False si otro worker la tiene vigente."""
+        now = time.time()
+        cur = self._conn().execute(
+            "INSERT INTO owned_leases (key, owner, expires) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET owner = excluded.owner, expires = excluded.expires "
+            "WHERE owned_leases.owner = excluded.owner OR owned_leases.expires < ?",
+            (key, owner, now + ttl, now),
+        )
+        return cur.rowcount == 1
+
+    def release_lease(self, key: str, owner: str) -> None:
+        self._conn().execute("DELETE FROM owned_leases WHERE key = ? AND owner = ?", (key, owner))
+
+    def get_or_load(self, key: str, ttl: float, loader: Callable[[], Any], name: str = "shared") -> Any:
+        """
+        Devuelve el valor cacheado o lo carga una sola vez entre todos los workers.
+
+        El worker que obtiene la reserva llama a `loader`; los demás esperan el
+        resultado hasta `lease_timeout` y, si no llega, cargan por su cuenta.
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            metrics.cache_event(name, hit=True)
+            return value
+        deadline = time.monotonic() + self.lease_timeout
+        delay = 0.01
+        leased = self._take_lease(key)
+        while not leased and time.monotonic() < deadline:
+            time.sleep(delay)
+            delay = min(delay * 2, 0.2)
+            value = self.get(key, _MISSING)
+            if value is not _MISSING:
+                metrics.cache_event(name, hit=True)
+                return value
+            leased = self._take_lease(key)
+        try:
+            # Otro worker pudo terminar la carga justo antes de liberar la reserva
+            value = self.get(key, _MISSING)
+            if value is not _MISSING:
+                metrics.cache_event(name, hit=True)
+                return value
+            metrics.cache_event(name, hit=False)
+            value = loader()
+            self.set(key, value, ttl)
+            return value
+        finally:
+            if leased:
+                self._release_lease(key)
+
+
+_cache: Optional[Any] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Cache compartido del proceso (backend según CACHE_BACKEND / WEB_CONCURRENCY)."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            backend = os.getenv("CACHE_BACKEND", "sqlite" if worker_count() > 1 else "memory").lower()
+            if backend == "sqlite":
+                path = os.getenv("CACHE_PATH") or os.path.join(tempfile.gettempdir(), "mcp-odoo-cache.sqlite3")
+                _cache = SQLiteCache(path)
+            elif backend == "memory":
+                _cache = MemoryCache()
+            else:
+                raise ValueError(f"CACHE_BACKEND inválido: {backend!r} (memory|sqlite)")
+        return _cache
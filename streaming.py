@@ -0,0 +1,78 @@
+# streaming.py
+"""Entrega por páginas de resultados grandes sobre Streamable HTTP.
+
+Las tools de listado pueden enviar cada página como notificación MCP
+(`notifications/message`, ligada al request) y reportar progreso, en lugar
+de materializar todo el resultado en un único mensaje. El servidor nunca
+retiene más de una página en memoria.
+"""
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import anyio
+
+import profiling
+from encoding import compact_rows
+
+
+def iter_keyset_pages(odoo, model: str, domain: list, fields: List[str],
+                      page_size: int = 200, limit: Optional[int] = None) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Recorre `model` por páginas usando paginación por clave (`id > último`).
+
+    A diferencia de `offset`, el costo por página es constante y no se
+    duplican/pierden filas si se insertan registros durante el recorrido.
+    `limit=None` (o 0) recorre todo el dominio.
+    """
+    page_size = max(1, int(page_size))
+    fields = list(fields)
+    if "id" not in fields:
+        fields.insert(0, "id")
+    last_id = 0
+    remaining = int(limit) if limit else None
+    while remaining is None or remaining > 0:
+        size = page_size if remaining is None else min(page_size, remaining)
+        rows = odoo.execute_kw(
+            model, "search_read", [list(domain) + [["id", ">", last_id]]],
+            {"fields": fields, "limit": size, "order": "id asc"},
+        )
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1]["id"]
+        if remaining is not None:
+            remaining -= len(rows)
+        if len(rows) < size:
+            return
+
+
+async def stream_rows(ctx, tool: str, pages: Iterator[List[Dict[str, Any]]],
+                      convert: Callable[[Dict[str, Any]], Dict[str, Any]],
+                      total: Optional[int] = None, compact: bool = False) -> Dict[str, Any]:
+    """
+    Envía cada página de `pages` al cliente como notificación de log con
+    `data={"tool", "page", "rows"}` y reporta progreso (filas enviadas).
+    Con `compact=True` cada página va en formato columnar (fields/rows/refs).
+
+    Las páginas se obtienen en un hilo para no bloquear el event loop
+    mientras se espera a Odoo. Devuelve un resumen (filas y páginas).
+    """
+    sent = 0
+    page_no = 0
+    sentinel = object()
+    while True:
+        rows = await anyio.to_thread.run_sync(profiling.in_thread(next), pages, sentinel)
+        if rows is sentinel:
+            break
+        page_no += 1
+        data = [convert(r) for r in rows]
+        sent += len(data)
+        if ctx is not None:
+            payload = compact_rows(data) if compact else {"rows": data}
+            await ctx.session.send_log_message(
+                level="info",
+                data={"tool": tool, "page": page_no, **payload},
+                logger=tool,
+                related_request_id=ctx.request_id,
+            )
+            await ctx.report_progress(sent, total)
+    return {"streamed": True, "tool": tool, "count": sent, "pages": page_no}
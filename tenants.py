@@ -0,0 +1,121 @@
+# tenants.py
+"""Varias bases de Odoo (tenants) servidas desde un mismo despliegue.
+
+Sin `ODOO_TENANTS` hay un solo tenant (`ODOO_URL`, `ODOO_DB`, ...) y nada
+cambia. Con `ODOO_TENANTS=acme,globex` cada tenant toma su conexión de
+`ACME_ODOO_URL`, `ACME_ODOO_DB`, `ACME_ODOO_LOGIN` y `ACME_ODOO_API_KEY`
+(nombre en mayúsculas, `-` → `_`). El tenant por defecto (`ODOO_DEFAULT_TENANT`,
+default `default`) usa las variables `ODOO_*` sin prefijo.
+
+Cada llamada elige tenant con el argumento `tenant` (se agrega al esquema de
+todas las tools) o, si no lo trae, con el header `X-Odoo-Tenant` de la
+sesión HTTP. El tenant elegido viaja en un ContextVar, igual que la
+prioridad de `scheduling`, y `TenantProxy` resuelve con él el cliente y el
+índice de nombres de ese tenant: las tools siguen usando `deps["odoo"]`.
+
+Cada tenant tiene su propio `OdooClient` (conexiones por hilo, uid
+autenticado), índice de nombres, poller de invalidación, limitador y
+circuit breaker (`env` = `prod:<tenant>`); los límites se pueden ajustar
+por tenant con `ACME_ODOO_MAX_CONCURRENCY`, etc. Los caches compartidos ya
+separan las claves por `url|db`.
+"""
+import os
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+TENANT_HEADER = os.getenv("TENANT_HEADER", "X-Odoo-Tenant").lower()
+DEFAULT_TENANT = os.getenv("ODOO_DEFAULT_TENANT", "default")
+TENANTS: List[str] = list(dict.fromkeys(
+    [DEFAULT_TENANT] + [t.strip() for t in os.getenv("ODOO_TENANTS", "").split(",") if t.strip()]
+))
+MULTI_TENANT = len(TENANTS) > 1
+
+_current: ContextVar[Optional[str]] = ContextVar("odoo_tenant", default=None)
+
+
+def _env_prefix(name: str) -> str:
+    """Prefijo de las variables del tenant ("" para el tenant por defecto)."""
+    if name == DEFAULT_TENANT:
+        return ""
+    return name.upper().replace("-", "_") + "_"
+
+
+def tenant_config(name: str) -> Dict[str, Any]:
+    """Conexión del tenant: url, db, username, password, env y prefijo de variables."""
+    if name not in TENANTS:
+        raise ValueError(f"Tenant desconocido: {name!r} (disponibles: {', '.join(TENANTS)})")
+    prefix = _env_prefix(name)
+    return {
+        "url": os.getenv(f"{prefix}ODOO_URL", ""),
+        "db": os.getenv(f"{prefix}ODOO_DB", ""),
+        "username": os.getenv(f"{prefix}ODOO_LOGIN", ""),
+        "password": os.getenv(f"{prefix}ODOO_API_KEY", ""),
+        "env": "prod" if not prefix else f"prod:{name}",
+        "settings_prefix": prefix,
+    }
+
+
+def cache_prefix(name: str) -> str:
+    """`url|db` del tenant sin crear su cliente (igual que `OdooClient.cache_prefix`)."""
+    config = tenant_config(name)
+    return f"{config['url'].rstrip('/')}|{config['db']}"
+
+
+def current() -> str:
+    return _current.get() or DEFAULT_TENANT
+
+
+@contextmanager
+def tenant_context(name: Optional[str]) -> Iterator[str]:
+    """Fija el tenant de la llamada en curso (None = tenant por defecto)."""
+    name = name or DEFAULT_TENANT
+    if name not in TENANTS:
+        raise ValueError(f"Tenant desconocido: {name!r} (disponibles: {', '.join(TENANTS)})")
+    token = _current.set(name)
+    try:
+        yield name
+    finally:
+        _current.reset(token)
+
+
+class TenantRegistry:
+    """Dependencias por tenant (cliente, índice de nombres, ...), creadas en su primer uso."""
+
+    def __init__(self, factory: Callable[[str, Dict[str, Any]], Dict[str, Any]]):
+        self._factory = factory
+        self._deps: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: Optional[str] = None) -> Dict[str, Any]:
+        name = name or current()
+        deps = self._deps.get(name)
+        if deps is None:
+            with self._lock:
+                deps = self._deps.get(name)
+                if deps is None:
+                    deps = self._deps[name] = self._factory(name, tenant_config(name))
+        return deps
+
+    def loaded(self) -> Dict[str, Dict[str, Any]]:
+        return dict(self._deps)
+
+
+class TenantProxy:
+    """Delegado de `deps[key]` del tenant de la llamada en curso."""
+
+    def __init__(self, registry: TenantRegistry, key: str):
+        self._registry = registry
+        self._key = key
+
+    def target(self) -> Any:
+        return self._registry.get()[self._key]
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self.target(), attr)
+
+
+def resolve(obj: Any) -> Any:
+    """El objeto concreto del tenant actual (para pasarlo a hilos sin el ContextVar)."""
+    return obj.target() if isinstance(obj, TenantProxy) else obj
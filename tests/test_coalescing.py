@@ -0,0 +1,52 @@
+# tests/test_coalescing.py
+import threading
+import time
+
+import coalescing
+from coalescing import WriteCoalescer
+
+
+class _Writes:
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls = []
+        self.done = threading.Event()
+
+    def __call__(self, model, record_id, values):
+        time.sleep(self.delay)
+        self.calls.append((model, record_id, dict(values)))
+        self.done.set()
+        return True
+
+
+def test_flush_all_sends_pending_writes():
+    writes = _Writes()
+    coalescer = WriteCoalescer(writes, window=60.0)
+    coalescer.write("sale.order", 7, {"note": "a"})
+    coalescer.write("sale.order", 7, {"client_order_ref": "b"})
+
+    assert coalescing.flush_all() >= 1
+    assert writes.calls == [("sale.order", 7, {"note": "a", "client_order_ref": "b"})]
+    # Ya no queda nada pendiente: un segundo flush no escribe otra vez
+    assert coalescer.flush_all() == 0
+    assert len(writes.calls) == 1
+
+
+def test_flush_all_waits_for_inflight_write():
+    writes = _Writes(delay=0.3)
+    coalescer = WriteCoalescer(writes, window=0.01)
+    coalescer.write("sale.order", 8, {"note": "x"})
+    # El timer ya sacó la escritura del buffer y el write está en curso
+    time.sleep(0.1)
+
+    assert coalescer.flush_all(timeout=5.0) == 0
+    assert writes.done.is_set()
+    assert writes.calls == [("sale.order", 8, {"note": "x"})]
+
+
+def test_key_locks_are_released():
+    coalescer = WriteCoalescer(_Writes(), window=60.0)
+    for record_id in range(50):
+        coalescer.write("sale.order", record_id, {"note": "n"})
+    coalescer.flush_all()
+    assert len(coalescer._key_locks) == 0
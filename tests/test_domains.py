@@ -0,0 +1,45 @@
+# tests/test_domains.py
+import datetime
+
+import pytest
+
+from domains import date_range, overdue
+
+
+def test_datetime_range_uses_utc_days_without_tz():
+    assert date_range("date_deadline", "2024-03-10", "2024-03-10", is_datetime=True) == [
+        ["date_deadline", ">=", "2024-03-10 00:00:00"],
+        ["date_deadline", "<", "2024-03-11 00:00:00"],
+    ]
+
+
+def test_datetime_range_converts_local_day_to_utc():
+    # Ciudad de México es UTC-6: el día local empieza a las 06:00 UTC
+    assert date_range("date_deadline", "2024-03-10", "2024-03-10", is_datetime=True,
+                      tz="America/Mexico_City") == [
+        ["date_deadline", ">=", "2024-03-10 06:00:00"],
+        ["date_deadline", "<", "2024-03-11 06:00:00"],
+    ]
+
+
+def test_date_range_ignores_tz_for_date_fields():
+    assert date_range("date_deadline", "2024-03-10", None, tz="Asia/Tokyo") == [
+        ["date_deadline", ">=", "2024-03-10"],
+    ]
+
+
+def test_overdue_datetime_bound_is_local_midnight():
+    today = datetime.date(2024, 3, 10)
+    assert overdue("date_deadline", today, is_datetime=True, tz="Asia/Tokyo") == [
+        ["date_deadline", "!=", False],
+        ["date_deadline", "<", "2024-03-09 15:00:00"],
+    ]
+    assert overdue("date_deadline", today) == [
+        ["date_deadline", "!=", False],
+        ["date_deadline", "<", "2024-03-10"],
+    ]
+
+
+def test_unknown_tz_is_rejected():
+    with pytest.raises(ValueError, match="tz inválida"):
+        date_range("date_order", "2024-03-10", is_datetime=True, tz="Mars/Olympus")
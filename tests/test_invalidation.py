@@ -0,0 +1,48 @@
+# tests/test_invalidation.py
+import invalidation
+from invalidation import WriteDatePoller
+from shared_cache import SQLiteCache
+
+
+class _Odoo:
+    """Cliente mínimo: un modelo con registros (id, write_date)."""
+
+    def __init__(self):
+        self.rows = {1: "2025-01-01 09:00:00", 2: "2025-01-01 10:00:00"}
+        self.calls = 0
+
+    def cache_prefix(self):
+        return "http://odoo|test"
+
+    def execute_kw(self, model, method, args, kwargs):
+        self.calls += 1
+        domain = args[0]
+        rows = [{"id": i, "write_date": w} for i, w in self.rows.items()
+                if not domain or w >= domain[0][2]]
+        rows.sort(key=lambda r: (r["write_date"], r["id"]), reverse="desc" in kwargs["order"])
+        return rows[: kwargs["limit"]]
+
+
+def test_single_poller_per_database(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "cache.sqlite3"))
+    odoo = _Odoo()
+    first = WriteDatePoller(odoo, ["res.partner"], interval=60, cache=cache)
+    second = WriteDatePoller(odoo, ["res.partner"], interval=60, cache=cache)
+
+    first.poll_once()
+    second.poll_once()
+    assert first.leader and not second.leader
+    assert odoo.calls == 1
+
+    seen = []
+    invalidation.subscribe(lambda prefix, model, ids: seen.append((model, ids)))
+    odoo.rows[2] = "2025-01-02 09:00:00"
+    assert second.poll_once() == {}
+    assert first.poll_once() == {"res.partner": [2]}
+
+    # El líder se va: el otro toma la reserva y sigue desde el cursor guardado
+    first.stop()
+    odoo.rows[1] = "2025-01-03 09:00:00"
+    assert second.poll_once() == {"res.partner": [1]}
+    assert second.leader
+    assert seen == [("res.partner", [2]), ("res.partner", [1])]
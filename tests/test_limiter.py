@@ -0,0 +1,34 @@
+# tests/test_limiter.py
+import time
+
+import pytest
+
+import scheduling
+from limiter import AdaptiveLimiter
+
+
+def _call(limiter, priority, seconds=0.0, error=None):
+    with scheduling.call_context(priority):
+        with limiter.slot():
+            time.sleep(seconds)
+            if error is not None:
+                raise error
+
+
+def test_slow_bulk_call_does_not_shrink_limit():
+    limiter = AdaptiveLimiter("test-bulk", initial=8, latency_target=0.01)
+    _call(limiter, scheduling.BULK, seconds=0.05)
+    assert limiter.limit > 8
+
+
+def test_slow_interactive_call_shrinks_limit():
+    limiter = AdaptiveLimiter("test-interactive", initial=8, latency_target=0.01)
+    _call(limiter, scheduling.INTERACTIVE, seconds=0.05)
+    assert limiter.limit < 8
+
+
+def test_bulk_overload_still_shrinks_limit():
+    limiter = AdaptiveLimiter("test-overload", initial=8, latency_target=0.01)
+    with pytest.raises(TimeoutError):
+        _call(limiter, scheduling.BULK, error=TimeoutError())
+    assert limiter.limit < 8
@@ -0,0 +1,18 @@
+# tests/test_manifest.py
+import invalidation
+import name_index
+import tools
+
+
+def test_write_manifest_has_no_side_effects(tmp_path, monkeypatch):
+    built, subscribed = [], []
+    monkeypatch.setattr(name_index.NameIndex, "__init__",
+                        lambda self, *a, **k: built.append(a))
+    monkeypatch.setattr(invalidation, "subscribe", subscribed.append)
+
+    modules = tools.write_manifest(str(tmp_path / "manifest.json"))
+
+    assert any(m["tools"] for m in modules.values())
+    # Sin cliente no se construyen índices ni se registran suscripciones
+    assert built == []
+    assert subscribed == []
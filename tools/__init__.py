@@ -4,18 +4,196 @@ Cada módulo debe exponer una función:
     register(mcp: FastMCP, deps: dict) -> None
 
 donde `deps` puede contener clientes compartidos (p.ej. {'odoo': OdooClient}).
+
+Modo perezoso (`TOOLS_LAZY=1`): las tools se anuncian desde `manifest.json`
+(nombre, descripción y esquemas generados con `write_manifest()`) y cada
+módulo, junto con sus clientes, se importa y registra recién en la primera
+llamada a una de sus tools. Un módulo sin entrada en el manifest o cuyo
+código cambió (hash distinto) se carga de forma inmediata.
+
+`STARTUP_PROFILE=1` imprime el tiempo de import y registro de cada módulo.
+
+Superficie de tools por despliegue (`TOOLS_PROFILE`, ver `TOOL_PROFILES`):
+- `all` (default): todos los módulos y tools.
+- `prod-readonly`: sin tools `dev_*` ni el módulo crm (solo escritura).
+- `dev-writer`: solo las tools `dev_*` (módulos sales y crm).
+`TOOLS_MODULES` / `TOOLS_DISABLED_MODULES` (nombres cortos, p.ej. `tasks`)
+y `TOOLS_ENABLED` / `TOOLS_DISABLED` (patrones fnmatch, p.ej. `dev_*`)
+ajustan el perfil. Un módulo deshabilitado ni siquiera se importa.
 """
+import fnmatch
+import hashlib
 import importlib
+import json
+import os
 import pkgutil
+import time
 from types import ModuleType
+from typing import Any, Callable, Dict, List, Optional
+
+MANIFEST_PATH = os.path.join(os.path.dirname(__file__), "manifest.json")
+TOOLS_LAZY = os.getenv("TOOLS_LAZY", "").lower() in ("1", "true", "yes")
+STARTUP_PROFILE = os.getenv("STARTUP_PROFILE", "").lower() in ("1", "true", "yes")
+
+# Perfiles de despliegue: módulos (None = todos) y patrones de tools habilitadas/deshabilitadas
+TOOL_PROFILES: Dict[str, Dict[str, Optional[List[str]]]] = {
+    "all": {"modules": None, "disabled_modules": [], "enabled": None, "disabled": []},
+    "prod-readonly": {"modules": None, "disabled_modules": ["crm"], "enabled": None, "disabled": ["dev_*"]},
+    "dev-writer": {"modules": ["sales", "crm"], "disabled_modules": [], "enabled": ["dev_*"], "disabled": []},
+}
+
+
+def _env_list(name: str) -> Optional[List[str]]:
+    raw = os.getenv(name)
+    if raw is None or not raw.strip():
+        return None
+    return [item.strip() for item in raw.split(",") if item.strip()]
+
+
+def _load_filter() -> Dict[str, Any]:
+    profile = os.getenv("TOOLS_PROFILE", "all").lower()
+    if profile not in TOOL_PROFILES:
+        raise ValueError(f"TOOLS_PROFILE inválido: {profile!r} ({'|'.join(TOOL_PROFILES)})")
+    base = TOOL_PROFILES[profile]
+    modules = _env_list("TOOLS_MODULES")
+    enabled = _env_list("TOOLS_ENABLED")
+    return {
+        "profile": profile,
+        "modules": modules if modules is not None else base["modules"],
+        "disabled_modules": list(base["disabled_modules"]) + (_env_list("TOOLS_DISABLED_MODULES") or []),
+        "enabled": enabled if enabled is not None else base["enabled"],
+        "disabled": list(base["disabled"]) + (_env_list("TOOLS_DISABLED") or []),
+    }
+
+
+TOOL_FILTER = _load_filter()
+
+
+def module_allowed(module_name: str) -> bool:
+    """¿Se carga el módulo de tools? Acepta `tools.tasks` o `tasks`."""
+    short = module_name.rsplit(".", 1)[-1]
+    if TOOL_FILTER["modules"] is not None and short not in TOOL_FILTER["modules"]:
+        return False
+    return short not in TOOL_FILTER["disabled_modules"]
+
+
+def tool_allowed(name: str) -> bool:
+    """¿Se registra y anuncia la tool? (incluye las definidas en server.py)"""
+    enabled = TOOL_FILTER["enabled"]
+    if enabled is not None and not any(fnmatch.fnmatchcase(name, p) for p in enabled):
+        return False
+    return not any(fnmatch.fnmatchcase(name, p) for p in TOOL_FILTER["disabled"])
+
+
+# Tiempos de carga por módulo: {"module", "import_ms", "register_ms", "tools", "lazy"}
+LOAD_PROFILE: List[Dict[str, Any]] = []
+
 
-def load_all(mcp, deps: dict, package_name: str = __name__):
+def _module_infos(package_name: str):
     package = importlib.import_module(package_name)
-    for info in pkgutil.iter_modules(package.__path__, package.__name__ + "."):
-        mod = importlib.import_module(info.name)
-        _register_from_module(mod, mcp, deps)
+    return list(pkgutil.iter_modules(package.__path__, package.__name__ + "."))
+
+
+def _source_hash(info) -> Optional[str]:
+    path = os.path.join(info.module_finder.path, info.name.rsplit(".", 1)[-1] + ".py")
+    try:
+        with open(path, "rb") as fh:
+            return hashlib.sha1(fh.read()).hexdigest()
+    except OSError:
+        return None
+
+
+def _read_manifest(path: str) -> Dict[str, Any]:
+    try:
+        with open(path, encoding="utf-8") as fh:
+            return json.load(fh).get("modules", {})
+    except (OSError, ValueError):
+        return {}
+
+
+def load_all(mcp, deps: dict, package_name: str = __name__, lazy: Optional[bool] = None,
+             before_load: Optional[Callable[[], None]] = None):
+    """
+    Registra las tools de todos los módulos del paquete.
+
+    Con `lazy` (default: TOOLS_LAZY) y un `mcp` que soporte `add_lazy_tools`,
+    los módulos vigentes en el manifest se registran desde metadatos.
+    `before_load` se llama antes de importar cualquier módulo (p.ej. para
+    crear los clientes de `deps` solo cuando hacen falta).
+    """
+    lazy = TOOLS_LAZY if lazy is None else lazy
+    manifest = _read_manifest(MANIFEST_PATH) if lazy and hasattr(mcp, "add_lazy_tools") else {}
+    for info in _module_infos(package_name):
+        if not module_allowed(info.name):
+            continue
+        entry = manifest.get(info.name)
+        if entry and entry.get("sha1") == _source_hash(info):
+            mcp.add_lazy_tools(entry["tools"], _lazy_loader(info.name, mcp, deps, before_load))
+            LOAD_PROFILE.append({"module": info.name, "import_ms": 0.0, "register_ms": 0.0,
+                                 "tools": len(entry["tools"]), "lazy": True})
+            continue
+        if lazy and manifest:
+            print(f"[WARN] {info.name}: sin entrada vigente en manifest.json, carga inmediata")
+        if before_load:
+            before_load()
+        _load_module(info.name, mcp, deps)
+    if STARTUP_PROFILE:
+        for p in LOAD_PROFILE:
+            mode = "lazy" if p["lazy"] else f"import {p['import_ms']:.1f}ms, register {p['register_ms']:.1f}ms"
+            print(f"[PROFILE] {p['module']}: {p['tools']} tools ({mode})")
+
+
+def _lazy_loader(module_name: str, mcp, deps: dict, before_load: Optional[Callable[[], None]]):
+    def load() -> None:
+        if before_load:
+            before_load()
+        _load_module(module_name, mcp, deps)
+        if STARTUP_PROFILE:
+            p = LOAD_PROFILE[-1]
+            print(f"[PROFILE] {module_name} (primer uso): import {p['import_ms']:.1f}ms, "
+                  f"register {p['register_ms']:.1f}ms")
+    return load
+
+
+def _load_module(module_name: str, mcp, deps: dict) -> None:
+    t0 = time.perf_counter()
+    mod = importlib.import_module(module_name)
+    t1 = time.perf_counter()
+    before = _tool_count(mcp)
+    _register_from_module(mod, mcp, deps)
+    t2 = time.perf_counter()
+    LOAD_PROFILE.append({"module": module_name, "import_ms": (t1 - t0) * 1000,
+                         "register_ms": (t2 - t1) * 1000, "tools": _tool_count(mcp) - before, "lazy": False})
+
+
+def _tool_count(mcp) -> int:
+    manager = getattr(mcp, "_tool_manager", None)
+    return len(manager.list_tools()) if manager is not None else 0
+
 
 def _register_from_module(mod: ModuleType, mcp, deps: dict):
     reg = getattr(mod, "register", None)
     if callable(reg):
         reg(mcp, deps)
+
+
+def write_manifest(path: str = MANIFEST_PATH, package_name: str = __name__) -> Dict[str, Any]:
+    """
+    Genera el manifest de tools (nombre, descripción, inputSchema/outputSchema)
+    registrando cada módulo en un FastMCP aislado, sin conectarse a Odoo.
+    """
+    import anyio
+    from mcp.server.fastmcp import FastMCP
+
+    modules: Dict[str, Any] = {}
+    for info in _module_infos(package_name):
+        scratch = FastMCP("manifest")
+        # Sin cliente, register() solo guarda referencias: no se llama a Odoo ni
+        # se crean índices, suscripciones o entradas en la caché compartida
+        _register_from_module(importlib.import_module(info.name), scratch, {"odoo": None, "names": None})
+        tools = [t.model_dump(mode="json", by_alias=True, exclude_none=True)
+                 for t in anyio.run(scratch.list_tools)]
+        modules[info.name] = {"sha1": _source_hash(info), "tools": tools}
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump({"modules": modules}, fh, ensure_ascii=False, indent=1)
+    return modules
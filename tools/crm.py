@@ -7,6 +7,8 @@ from typing import Optional, Dict, Any
 from pydantic import BaseModel
 import os
 
+from odoo_client import OdooClient
+
 
 class QuotationResult(BaseModel):
     """Modelo para el resultado de crear una cotización."""
@@ -23,46 +25,32 @@ class QuotationResult(BaseModel):
     steps: Dict[str, str]
 
 
-class DevOdooCRMClient:
+class DevOdooCRMClient(OdooClient):
     """
     Cliente Odoo específico para el ambiente de DESARROLLO (CRM/Cotizaciones).
     Se conecta a: pegasuscontrol-dev18-25468489.dev.odoo.com
     """
 
     def __init__(self):
-        import xmlrpc.client
-
         # Configuración específica para DESARROLLO
-        self.url = os.environ.get(
+        url = os.environ.get(
             "DEV_ODOO_URL", "https://pegasuscontrol-dev18-25468489.dev.odoo.com"
-        ).rstrip("/")
-        self.db = os.environ.get("DEV_ODOO_DB", "pegasuscontrol-dev18-25468489")
-        self.username = os.environ.get("DEV_ODOO_LOGIN")
-        self.password = os.environ.get("DEV_ODOO_API_KEY")
+        )
+        db = os.environ.get("DEV_ODOO_DB", "pegasuscontrol-dev18-25468489")
+        username = os.environ.get("DEV_ODOO_LOGIN")
+        password = os.environ.get("DEV_ODOO_API_KEY")
 
-        if not self.username or not self.password:
+        if not username or not password:
             raise ValueError(
                 "Faltan credenciales DEV_ODOO_LOGIN o DEV_ODOO_API_KEY en .env"
             )
 
-        # Conexión XML-RPC a desarrollo
-        self.common = xmlrpc.client.ServerProxy(f"{self.url}/xmlrpc/2/common")
-        self.models = xmlrpc.client.ServerProxy(f"{self.url}/xmlrpc/2/object")
-
-        # Autenticación
-        self.uid = self.common.authenticate(self.db, self.username, self.password, {})
+        # Conexión XML-RPC y autenticación (limitador/métricas del ambiente "dev")
+        super().__init__(url, db, username, password, env="dev")
 
         if not self.uid:
             raise ValueError("No se pudo autenticar en el ambiente de desarrollo")
 
-    def execute_kw(self, model: str, method: str, args=None, kwargs=None):
-        """Ejecuta un método en el modelo especificado."""
-        args = args or []
-        kwargs = kwargs or {}
-        return self.models.execute_kw(
-            self.db, self.uid, self.password, model, method, args, kwargs
-        )
-
     def search_read(
         self, model: str, domain: list, fields: list, limit: int = 1
     ) -> list:
@@ -0,0 +1,80 @@
+# tools/exports.py
+"""
+PRODUCCIÓN (Solo Lectura):
+- export_records: exporta órdenes de venta o tareas completas a un archivo
+  CSV / JSONL / Parquet descargable desde /exports/<handle>
+"""
+from typing import Any, Dict, List, Literal, Optional
+
+from artifacts import EXPORT_TTL, write_export
+from offload import run_sync
+
+# Modelos exportables y sus campos por defecto (se omiten los que no existan en la versión de Odoo)
+EXPORT_MODELS: Dict[str, List[str]] = {
+    "sale.order": [
+        "id", "name", "partner_id", "user_id", "date_order", "state",
+        "amount_untaxed", "amount_tax", "amount_total",
+    ],
+    "project.task": [
+        "id", "name", "project_id", "stage_id", "user_id", "user_ids", "date_deadline",
+    ],
+}
+
+_DOMAIN_OPERATORS = {"&", "|", "!"}
+
+
+def _check_domain(domain: List[Any]) -> List[Any]:
+    for item in domain:
+        if isinstance(item, str) and item in _DOMAIN_OPERATORS:
+            continue
+        if not (isinstance(item, (list, tuple)) and len(item) == 3 and isinstance(item[0], str)):
+            raise ValueError(f"Condición de dominio inválida: {item!r} (usa [campo, operador, valor])")
+    return [list(item) if isinstance(item, tuple) else item for item in domain]
+
+
+def register(mcp, deps: dict):
+    """
+    Registra la herramienta de exportación.
+
+    PRODUCCIÓN (Solo Lectura):
+    - export_records
+    """
+    odoo = deps["odoo"]
+
+    @mcp.tool(
+        name="export_records",
+        description="Exporta todas las órdenes de venta o tareas que cumplan un dominio a un archivo "
+                    "CSV/JSONL/Parquet y devuelve la URL de descarga y el número de filas",
+    )
+    async def export_records(
+        model: Literal["sale.order", "project.task"] = "sale.order",
+        format: Literal["csv", "jsonl", "parquet"] = "csv",
+        domain: Optional[List[Any]] = None,
+        fields: Optional[List[str]] = None,
+        limit: int = 0,
+        page_size: int = 1000,
+    ) -> Dict[str, Any]:
+        """
+        Exporta un modelo completo sin cargarlo en memoria: recorre Odoo por
+        páginas (`id > último`) y escribe cada una al archivo.
+
+        Args:
+            model: 'sale.order' o 'project.task'.
+            format: 'csv' (default), 'jsonl' o 'parquet' (requiere pyarrow).
+            domain: Dominio de Odoo, p.ej. [["date_order", ">=", "2025-01-01"], ["state", "=", "sale"]].
+            fields: Campos a exportar (default: campos principales del modelo).
+            limit: Máximo de filas (0 = todas).
+            page_size: Filas por página leída de Odoo (default 1000).
+
+        Returns:
+            {"handle", "url", "model", "format", "filename", "columns", "rows", "bytes", "expires_at"}.
+            Los many2one se exportan como `campo` (id) y `campo_name`.
+        """
+        domain = _check_domain(domain or [])
+        if fields is None:
+            available = await run_sync(odoo.fields_get, model, ["type"])
+            fields = [f for f in EXPORT_MODELS[model] if f in available]
+        page_size = max(1, min(int(page_size), 5000))
+        meta = await run_sync(write_export, odoo, model, domain, fields, format, page_size, limit or None)
+        meta["ttl_seconds"] = int(EXPORT_TTL)
+        return meta
@@ -10,10 +10,20 @@ DESARROLLO (Lectura y Escritura):
 - dev_update_sale: actualiza orden existente en desarrollo
 - dev_read_sale: lee orden desde desarrollo
 """
-from typing import Optional, List, Any, Dict
+from typing import Optional, List, Any, Dict, Union
 from pydantic import BaseModel, field_validator
+from mcp.server.fastmcp import Context
 import os
 
+from odoo_client import OdooClient
+from name_index import NameIndex
+from encoding import compact_tool_result, tool_result
+from streaming import iter_keyset_pages, stream_rows
+from offload import run_sync, search_read_rows
+from coalescing import WriteCoalescer, coalesce_window
+from domains import amount_range, date_range
+from versioning import check_not_modified, version_token, with_children
+
 
 class SaleOrder(BaseModel):
     """Modelo para órdenes de venta (sale.order)."""
@@ -42,46 +52,32 @@ class DevSaleOrder(BaseModel):
     environment: str = "development"
 
 
-class DevOdooSalesClient:
+class DevOdooSalesClient(OdooClient):
     """
     Cliente Odoo específico para el ambiente de DESARROLLO (ventas).
     Se conecta a: pegasuscontrol-dev18-25468489.dev.odoo.com
     """
 
     def __init__(self):
-        import xmlrpc.client
-
         # Configuración específica para DESARROLLO
-        self.url = os.environ.get(
+        url = os.environ.get(
             "DEV_ODOO_URL", "https://pegasuscontrol-dev18-25468489.dev.odoo.com"
-        ).rstrip("/")
-        self.db = os.environ.get("DEV_ODOO_DB", "pegasuscontrol-dev18-25468489")
-        self.username = os.environ.get("DEV_ODOO_LOGIN")
-        self.password = os.environ.get("DEV_ODOO_API_KEY")
+        )
+        db = os.environ.get("DEV_ODOO_DB", "pegasuscontrol-dev18-25468489")
+        username = os.environ.get("DEV_ODOO_LOGIN")
+        password = os.environ.get("DEV_ODOO_API_KEY")
 
-        if not self.username or not self.password:
+        if not username or not password:
             raise ValueError(
                 "Faltan credenciales DEV_ODOO_LOGIN o DEV_ODOO_API_KEY en .env"
             )
 
-        # Conexión XML-RPC a desarrollo
-        self.common = xmlrpc.client.ServerProxy(f"{self.url}/xmlrpc/2/common")
-        self.models = xmlrpc.client.ServerProxy(f"{self.url}/xmlrpc/2/object")
-
-        # Autenticación
-        self.uid = self.common.authenticate(self.db, self.username, self.password, {})
+        # Conexión XML-RPC y autenticación (limitador/métricas del ambiente "dev")
+        super().__init__(url, db, username, password, env="dev")
 
         if not self.uid:
             raise ValueError("No se pudo autenticar en el ambiente de desarrollo")
 
-    def execute_kw(self, model: str, method: str, args=None, kwargs=None):
-        """Ejecuta un método en el modelo especificado."""
-        args = args or []
-        kwargs = kwargs or {}
-        return self.models.execute_kw(
-            self.db, self.uid, self.password, model, method, args, kwargs
-        )
-
     def create(self, model: str, values: Dict[str, Any]) -> int:
         """Crea un nuevo registro en el modelo especificado."""
         return self.execute_kw(model, "create", [values])
@@ -99,6 +95,25 @@ class DevOdooSalesClient:
         return result[0] if result else {}
 
 
+def _sale_from_row(r: Dict[str, Any]) -> SaleOrder:
+    return SaleOrder.model_validate(
+        {
+            "id": r["id"],
+            "name": r.get("name") or "",
+            "partner_id": r.get("partner_id"),
+            "date_order": r.get("date_order"),
+            "amount_total": r.get("amount_total", 0.0),
+            "state": r.get("state"),
+            "user_id": r.get("user_id"),
+        }
+    )
+
+
+def sale_to_dict(r: Dict[str, Any]) -> Dict[str, Any]:
+    """Fila de search_read → dict JSON de SaleOrder (a nivel de módulo para offload)."""
+    return _sale_from_row(r).model_dump(mode="json")
+
+
 def register(mcp, deps: dict):
     """
     Registra las herramientas MCP para Órdenes de Venta.
@@ -111,9 +126,15 @@ def register(mcp, deps: dict):
     """
     # Cliente de PRODUCCIÓN (solo lectura)
     odoo = deps["odoo"]
+    # Sin cliente (p. ej. write_manifest) no se crea el índice: NameIndex se
+    # suscribe a invalidaciones y abre la caché compartida al construirse
+    names = deps.get("names") or (NameIndex(odoo) if odoo is not None else None)
 
     # Cliente de DESARROLLO (lectura y escritura) - lazy loading
     dev_client = None
+    # Agrupación de dev_update_sale consecutivos (DEV_WRITE_COALESCE_MS); None = desactivada
+    window = coalesce_window()
+    dev_writes = None
 
     def get_dev_client():
         """Inicializa el cliente de desarrollo solo cuando se necesita."""
@@ -122,32 +143,70 @@ def register(mcp, deps: dict):
             dev_client = DevOdooSalesClient()
         return dev_client
 
+    def get_dev_writes() -> Optional[WriteCoalescer]:
+        nonlocal dev_writes
+        if dev_writes is None and window > 0:
+            dev_writes = WriteCoalescer(get_dev_client().write, window)
+        return dev_writes
+
+    def flush_sale(sale_id: int) -> None:
+        """Lectura tras escritura: envía los cambios pendientes de la orden."""
+        if dev_writes is not None:
+            dev_writes.flush("sale.order", sale_id)
+
     @mcp.tool(
         name="list_sales",
         description="Listar órdenes de venta (sale.order) con filtros opcionales",
     )
-    def list_sales(
+    async def list_sales(
         partner_id: Optional[int] = None,
+        partner_name: Optional[str] = None,
         user_id: Optional[int] = None,
         state: Optional[str] = None,
         q: Optional[str] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        amount_min: Optional[float] = None,
+        amount_max: Optional[float] = None,
+        tz: Optional[str] = None,
         limit: int = 50,
-    ) -> List[SaleOrder]:
+        stream: bool = False,
+        page_size: int = 200,
+        compact: bool = False,
+        ctx: Optional[Context] = None,
+    ) -> Union[List[SaleOrder], Dict[str, Any]]:
         """
         Lista órdenes de venta desde Odoo.
 
         Args:
             partner_id: Filtrar por cliente (res.partner id).
+            partner_name: Filtrar por nombre de cliente (sin acentos/mayúsculas); se ignora si hay partner_id.
             user_id: Filtrar por vendedor (res.users id).
             state: Filtrar por estado ('draft', 'sent', 'sale', 'done', 'cancel').
             q: Búsqueda por nombre/referencia de la orden (ilike).
-            limit: Límite de resultados (por defecto 50).
+            date_from: Órdenes con date_order desde esta fecha (YYYY-MM-DD, incluida).
+            date_to: Órdenes con date_order hasta esta fecha (YYYY-MM-DD, día completo incluido).
+            amount_min: amount_total mínimo.
+            amount_max: amount_total máximo.
+            tz: Zona horaria (IANA) en la que se cuentan los días de date_from/date_to;
+                por defecto la del usuario de Odoo y, si no tiene, UTC.
+            limit: Límite de resultados (por defecto 50; 0 = sin límite al usar stream).
+            stream: Si True, envía las órdenes por páginas como notificaciones MCP
+                y devuelve solo un resumen ({"streamed", "count", "pages"}).
+            page_size: Tamaño de página cuando stream=True (por defecto 200).
+            compact: Si True, devuelve formato columnar
+                ({"fields", "rows", "refs"}) con many2one deduplicados.
 
         Returns:
             Lista de SaleOrder (id, name, partner_id, date_order, amount_total, state, user_id).
+            Con filtros de fecha o importe se ordena por date_order descendente
+            (salvo en stream, que recorre por id).
         """
         domain = []
 
+        if partner_name and not partner_id:
+            partner_id = await run_sync(names.resolve_one, "res.partner", partner_name)
+
         if partner_id:
             domain.append(["partner_id", "=", int(partner_id)])
 
@@ -160,6 +219,14 @@ def register(mcp, deps: dict):
         if q:
             domain.append(["name", "ilike", q])
 
+        # Rangos de fecha/importe en el dominio: Odoo filtra y solo viajan las filas pedidas
+        if (date_from or date_to) and not tz:
+            tz = await run_sync(odoo.user_tz)
+        domain += date_range("date_order", date_from, date_to, is_datetime=True, tz=tz)
+        domain += amount_range("amount_total", amount_min, amount_max)
+        filtered = bool(date_from or date_to) or amount_min is not None or amount_max is not None
+        order = "date_order desc, id desc" if filtered else None
+
         fields = [
             "id",
             "name",
@@ -169,37 +236,48 @@ def register(mcp, deps: dict):
             "state",
             "user_id",
         ]
-        rows = odoo.search_read("sale.order", domain, fields, limit)
-
-        sales: List[SaleOrder] = []
-        for r in rows:
-            payload = {
-                "id": r["id"],
-                "name": r.get("name") or "",
-                "partner_id": r.get("partner_id"),
-                "date_order": r.get("date_order"),
-                "amount_total": r.get("amount_total", 0.0),
-                "state": r.get("state"),
-                "user_id": r.get("user_id"),
-            }
-            sales.append(SaleOrder.model_validate(payload))
-        return sales
+
+        if stream:
+            pages = iter_keyset_pages(odoo, "sale.order", domain, fields, page_size, limit)
+            return await stream_rows(
+                ctx,
+                "list_sales",
+                pages,
+                sale_to_dict,
+                total=limit or None,
+                compact=compact,
+            )
+
+        data = await search_read_rows(odoo, "sale.order", domain, fields, limit, sale_to_dict, order)
+        if compact:
+            return compact_tool_result(data)
+        return tool_result(data)
 
     @mcp.tool(
         name="get_sale",
         description="Obtener detalle completo de una orden de venta por id",
     )
-    def get_sale(sale_id: int, include_lines: bool = False) -> Dict[str, Any]:
+    def get_sale(
+        sale_id: int, include_lines: bool = False, if_version: Optional[str] = None
+    ) -> Dict[str, Any]:
         """
         Obtiene los detalles de una orden de venta específica.
 
         Args:
             sale_id: ID de la orden de venta.
             include_lines: Si True, incluye las líneas de la orden (order_line).
+            if_version: `version` de una respuesta anterior; si la orden no
+                cambió se devuelve solo {"id","model","not_modified":true,"version"}.
 
         Returns:
-            Diccionario con los datos de la orden de venta.
+            Diccionario con los datos de la orden de venta y su `version`.
         """
+        variant = f"get_sale:{include_lines}"
+        children = ("sale.order.line", "order_id") if include_lines else None
+        unchanged = check_not_modified(odoo, "sale.order", sale_id, if_version, variant, children)
+        if unchanged:
+            return unchanged
+
         fields = [
             "id",
             "name",
@@ -213,6 +291,7 @@ def register(mcp, deps: dict):
             "payment_term_id",
             "validity_date",
             "note",
+            "write_date",
         ]
 
         if include_lines:
@@ -226,17 +305,7 @@ def register(mcp, deps: dict):
         r = rows[0]
 
         # Construir el documento de respuesta
-        doc = SaleOrder.model_validate(
-            {
-                "id": r["id"],
-                "name": r.get("name") or "",
-                "partner_id": r.get("partner_id"),
-                "date_order": r.get("date_order"),
-                "amount_total": r.get("amount_total", 0.0),
-                "state": r.get("state"),
-                "user_id": r.get("user_id"),
-            }
-        ).model_dump()
+        doc = _sale_from_row(r).model_dump()
 
         # Agregar campos adicionales
         doc["amount_untaxed"] = r.get("amount_untaxed", 0.0)
@@ -244,6 +313,7 @@ def register(mcp, deps: dict):
         doc["payment_term_id"] = r.get("payment_term_id")
         doc["validity_date"] = r.get("validity_date")
         doc["note"] = r.get("note")
+        write_date = r.get("write_date")
 
         # Si se solicitan las líneas de la orden
         if include_lines and r.get("order_line"):
@@ -260,13 +330,20 @@ def register(mcp, deps: dict):
                         "product_uom_qty",
                         "price_unit",
                         "price_subtotal",
+                        "write_date",
                     ],
                     len(line_ids),
                 )
                 doc["order_lines"] = lines
             else:
                 doc["order_lines"] = []
+        if include_lines:
+            # Editar una línea no siempre cambia el write_date de la orden
+            write_date = with_children(write_date, doc.get("order_lines", []))
+            for line in doc.get("order_lines", []):
+                line.pop("write_date", None)
 
+        doc["version"] = version_token("sale.order", sale_id, write_date, variant)
         return doc
 
     # ═══════════════════════════════════════════════════════════════
@@ -358,6 +435,8 @@ def register(mcp, deps: dict):
             )
         """
         client = get_dev_client()
+        # La línea se crea sobre la orden con sus cambios pendientes ya escritos
+        flush_sale(order_id)
 
         # Valores para crear la línea
         values = {
@@ -386,16 +465,24 @@ def register(mcp, deps: dict):
         name="dev_update_sale",
         description="Actualiza una orden de venta existente en el ambiente de DESARROLLO",
     )
-    def dev_update_sale(sale_id: int, values: Dict[str, Any]) -> Dict[str, Any]:
+    def dev_update_sale(
+        sale_id: int, values: Dict[str, Any], flush: bool = False
+    ) -> Dict[str, Any]:
         """
         Actualiza una orden de venta existente en DESARROLLO.
 
+        Con DEV_WRITE_COALESCE_MS > 0 las actualizaciones seguidas a la misma
+        orden se fusionan en un solo `write`, que se envía al vencer la
+        ventana, con `flush=True` o al leerla con `dev_read_sale`.
+
         Args:
             sale_id: ID de la orden a actualizar - REQUERIDO
             values: Diccionario con los campos a actualizar
+            flush: Si True, escribe ya (junto con lo pendiente de la orden)
 
         Returns:
             Diccionario con el resultado de la actualización
+            (`pending=True` si la escritura quedó agrupada)
 
         Ejemplo:
             dev_update_sale(
@@ -407,9 +494,27 @@ def register(mcp, deps: dict):
             )
         """
         client = get_dev_client()
-
-        # Actualizar el registro
-        success = client.write("sale.order", sale_id, values)
+        writes = get_dev_writes()
+
+        if writes is not None:
+            pending_writes = writes.write("sale.order", sale_id, values)
+            if not flush:
+                return {
+                    "success": True,
+                    "pending": True,
+                    "pending_writes": pending_writes,
+                    "model": "sale.order",
+                    "sale_id": sale_id,
+                    "updated_values": values,
+                    "environment": "development",
+                }
+            success = writes.flush("sale.order", sale_id)
+            if success is None:
+                # La ventana venció justo antes: el timer ya envió el write
+                success = True
+        else:
+            # Actualizar el registro
+            success = client.write("sale.order", sale_id, values)
 
         return {
             "success": success,
@@ -443,6 +548,7 @@ def register(mcp, deps: dict):
             )
         """
         client = get_dev_client()
+        flush_sale(sale_id)
 
         # Leer el registro
         record = client.read("sale.order", sale_id, fields or [])
@@ -1,6 +1,15 @@
 # tools/tasks.py
-from typing import Optional, List, Any, Dict
+from functools import partial
+from typing import Optional, List, Any, Dict, Literal, Union
 from pydantic import BaseModel, field_validator
+from mcp.server.fastmcp import Context
+from name_index import NameIndex
+from encoding import compact_tool_result, tool_result
+from streaming import iter_keyset_pages, stream_rows
+from offload import run_sync, search_read_rows
+from domains import date_range, overdue as overdue_domain
+from versioning import check_not_modified, version_token
+from htmltext import cached_text, peek_text, text_range
 
 class Task(BaseModel):
     id: int
@@ -16,6 +25,32 @@ class Task(BaseModel):
             return None
         return str(v)
 
+def _assignees_from_row(row: Dict[str, Any], user_field: str) -> List[Any]:
+    val = row.get(user_field)
+    if not val:
+        return []
+    if user_field == "user_id":
+        return [val] if isinstance(val, list) else []
+    if isinstance(val, list):
+        if len(val) >= 1 and isinstance(val[0], int):
+            return [val]
+        return val
+    return []
+
+def _task_from_row(r: Dict[str, Any], user_field: str) -> Task:
+    return Task.model_validate({
+        "id": r["id"],
+        "name": r.get("name") or "",
+        "project_id": r.get("project_id"),
+        "stage_id": r.get("stage_id"),
+        "date_deadline": r.get("date_deadline"),
+        "assignees": _assignees_from_row(r, user_field),
+    })
+
+def task_to_dict(r: Dict[str, Any], user_field: str) -> Dict[str, Any]:
+    """Fila de search_read → dict JSON de Task (a nivel de módulo para poder usarse en offload)."""
+    return _task_from_row(r, user_field).model_dump(mode="json")
+
 def register(mcp, deps: dict):
     """
     Herramientas MCP para Tareas (project.task).
@@ -23,50 +58,77 @@ def register(mcp, deps: dict):
     - get_task: obtiene detalles de una tarea por id.
     """
     odoo = deps["odoo"]
+    # Sin cliente (p. ej. write_manifest) no se crea el índice: NameIndex se
+    # suscribe a invalidaciones y abre la caché compartida al construirse
+    names = deps.get("names") or (NameIndex(odoo) if odoo is not None else None)
 
     def _detect_user_field() -> Dict[str, str]:
-        fields = odoo.execute_kw("project.task", "fields_get", [], {"attributes": ["type"]})
+        fields = odoo.fields_get("project.task", ["type"])
         if "user_id" in fields:
             return {"field": "user_id", "mode": "single"}
         return {"field": "user_ids", "mode": "multi"}
 
-    def _assignees_from_row(row: Dict[str, Any], user_field: str) -> List[Any]:
-        val = row.get(user_field)
-        if not val:
-            return []
-        if user_field == "user_id":
-            return [val] if isinstance(val, list) else []
-        if isinstance(val, list):
-            if len(val) >= 1 and isinstance(val[0], int):
-                return [val]
-            return val
+    def _open_task_domain() -> List[Any]:
+        # Tareas no cerradas: is_closed (Odoo 15+) o state (17+); sin ninguno, no se filtra
+        fields = odoo.fields_get("project.task", ["type"])
+        if "is_closed" in fields:
+            return [["is_closed", "=", False]]
+        if "state" in fields:
+            return [["state", "not in", ["1_done", "1_canceled"]]]
         return []
 
+    def _deadline_is_datetime() -> bool:
+        # date_deadline es Date hasta Odoo 16 y Datetime desde 17
+        meta = odoo.fields_get("project.task", ["type"]).get("date_deadline") or {}
+        return meta.get("type") == "datetime"
+
     @mcp.tool(
         name="list_tasks",
         description="Listar tareas (project.task) con filtros opcionales; incluye búsqueda por nombre de usuario"
     )
-    def list_tasks(project_id: Optional[int] = None,
-                   assigned_to: Optional[int] = None,
-                   assigned_to_name: Optional[str] = None,
-                   stage_id: Optional[int] = None,
-                   q: Optional[str] = None,
-                   limit: int = 50) -> List[Task]:
-        user_info = _detect_user_field()
+    async def list_tasks(project_id: Optional[int] = None,
+                       project_name: Optional[str] = None,
+                       assigned_to: Optional[int] = None,
+                       assigned_to_name: Optional[str] = None,
+                       stage_id: Optional[int] = None,
+                       q: Optional[str] = None,
+                       deadline_from: Optional[str] = None,
+                       deadline_to: Optional[str] = None,
+                       overdue: bool = False,
+                       tz: Optional[str] = None,
+                       limit: int = 50,
+                       stream: bool = False,
+                       page_size: int = 200,
+                       compact: bool = False,
+                       ctx: Optional[Context] = None) -> Union[List[Task], Dict[str, Any]]:
+        """
+        Con `stream=True` las tareas se envían por páginas de `page_size` como
+        notificaciones MCP y la respuesta final es solo un resumen (count/pages).
+        Con `compact=True` se devuelve el formato columnar de `encoding.compact_rows`.
+
+        `deadline_from` / `deadline_to` (YYYY-MM-DD, incluidos) filtran por
+        `date_deadline`; `overdue=True` deja solo tareas abiertas con fecha límite
+        anterior a hoy. Con esos filtros el resultado se ordena por fecha límite
+        ascendente (salvo en stream, que recorre por id). Los días se cuentan en la
+        zona `tz` (nombre IANA); sin `tz` se usa la del usuario de Odoo y, si no
+        tiene, UTC.
+        """
+        # fields_get e índice de nombres pueden ir a Odoo si su cache venció: fuera del loop
+        user_info = await run_sync(_detect_user_field)
         user_field = user_info["field"]
         is_single = user_info["mode"] == "single"
 
         domain = []
 
+        # Nombres → ids desde el índice en memoria (ValueError si no existe o es ambiguo)
+        if project_name and not project_id:
+            project_id = await run_sync(names.resolve_one, "project.project", project_name)
+        if assigned_to_name and not assigned_to:
+            assigned_to = await run_sync(names.resolve_one, "res.users", assigned_to_name)
+
         if project_id:
             domain.append(["project_id", "=", int(project_id)])
 
-        # --- Nuevo: buscar por nombre de usuario ---
-        if assigned_to_name and not assigned_to:
-            users = odoo.search_read("res.users", [["name", "ilike", assigned_to_name]], ["id"], 1)
-            if users:
-                assigned_to = users[0]["id"]
-
         if assigned_to:
             if is_single:
                 domain.append([user_field, "=", int(assigned_to)])
@@ -78,32 +140,70 @@ def register(mcp, deps: dict):
         if q:
             domain.append(["name", "ilike", q])
 
+        # Filtros de fecha en el dominio: Odoo filtra y solo viajan las filas pedidas
+        if deadline_from or deadline_to or overdue:
+            is_datetime = await run_sync(_deadline_is_datetime)
+            if is_datetime or overdue:
+                tz = tz or await run_sync(odoo.user_tz)
+        if deadline_from or deadline_to:
+            domain += date_range("date_deadline", deadline_from, deadline_to,
+                                 is_datetime=is_datetime, tz=tz)
+        if overdue:
+            domain += (overdue_domain("date_deadline", is_datetime=is_datetime, tz=tz)
+                       + await run_sync(_open_task_domain))
+        order = "date_deadline asc, id asc" if (overdue or deadline_from or deadline_to) else None
+
         fields = ["id", "name", "project_id", "stage_id", "date_deadline", user_field]
-        rows = odoo.search_read("project.task", domain, fields, limit)
-
-        tasks: List[Task] = []
-        for r in rows:
-            payload = {
-                "id": r["id"],
-                "name": r.get("name") or "",
-                "project_id": r.get("project_id"),
-                "stage_id": r.get("stage_id"),
-                "date_deadline": r.get("date_deadline"),
-                "assignees": _assignees_from_row(r, user_field),
-            }
-            tasks.append(Task.model_validate(payload))
-        return tasks
+
+        if stream:
+            pages = iter_keyset_pages(odoo, "project.task", domain, fields, page_size, limit)
+            return await stream_rows(
+                ctx, "list_tasks", pages,
+                partial(task_to_dict, user_field=user_field),
+                total=limit or None,
+                compact=compact,
+            )
+
+        data = await search_read_rows(
+            odoo, "project.task", domain, fields, limit, partial(task_to_dict, user_field=user_field), order
+        )
+        if compact:
+            return compact_tool_result(data)
+        return tool_result(data)
 
     @mcp.tool(
         name="get_task",
         description="Obtener detalle de una tarea por id; compatibilidad user_id/user_ids."
     )
-    def get_task(task_id: int, include_description: bool = True) -> Dict[str, Any]:
+    def get_task(task_id: int, include_description: bool = True,
+                 if_version: Optional[str] = None,
+                 description_format: Literal["text", "html"] = "text",
+                 offset: int = 0, max_chars: Optional[int] = None) -> Dict[str, Any]:
+        """
+        La descripción se devuelve como texto plano (`description_format="html"`
+        para el HTML original), cortada en `[offset, offset + max_chars)`
+        (`max_chars` por defecto `TEXT_MAX_CHARS`, 0 = completa). Si quedó
+        texto, `description_range.next_offset` indica desde dónde seguir.
+
+        Con `if_version` (la `version` de una respuesta anterior) y la tarea sin
+        cambios, devuelve solo {"id","model","not_modified":true,"version"}.
+        """
+        # Valida offset/max_chars antes de ir a Odoo
+        text_range("", offset, max_chars)
+        variant = f"get_task:{include_description}"
+        if include_description:
+            variant += f":{description_format}:{offset}:{max_chars}"
+        unchanged = check_not_modified(odoo, "project.task", task_id, if_version, variant)
+        if unchanged:
+            return unchanged
+
         user_info = _detect_user_field()
         user_field = user_info["field"]
 
-        fields = ["id", "name", "project_id", "stage_id", "date_deadline", user_field]
-        if include_description:
+        fields = ["id", "name", "project_id", "stage_id", "date_deadline", "write_date", user_field]
+        # En texto, el HTML solo se pide si no está el texto de esta versión en cache
+        text_first = include_description and description_format == "text"
+        if include_description and not text_first:
             fields.append("description")
 
         rows = odoo.search_read("project.task", [["id", "=", int(task_id)]], fields, 1)
@@ -111,15 +211,23 @@ def register(mcp, deps: dict):
             return {"error": f"Task {task_id} not found"}
         r = rows[0]
 
-        doc = Task.model_validate({
-            "id": r["id"],
-            "name": r.get("name") or "",
-            "project_id": r.get("project_id"),
-            "stage_id": r.get("stage_id"),
-            "date_deadline": r.get("date_deadline"),
-            "assignees": _assignees_from_row(r, user_field),
-        }).model_dump()
+        doc = _task_from_row(r, user_field).model_dump()
 
         if include_description:
-            doc["description"] = r.get("description")
+            if not text_first:
+                full = r.get("description") or ""
+            else:
+                full = peek_text(odoo, "project.task", task_id, r.get("write_date"))
+                if full is None:
+                    extra = odoo.execute_kw("project.task", "read", [[int(task_id)]],
+                                            {"fields": ["description", "write_date"]})
+                    # Clave por el write_date de esta lectura; `version` queda con el de
+                    # la primera (si la tarea cambió entre ambas, el próximo if_version relee)
+                    row = extra[0] if extra else {}
+                    full = cached_text(odoo, "project.task", task_id, row.get("write_date"), row.get("description"))
+            part = text_range(full, offset, max_chars)
+            doc["description"] = part.pop("text")
+            if part["offset"] or part["next_offset"] is not None:
+                doc["description_range"] = part
+        doc["version"] = version_token("project.task", task_id, r.get("write_date"), variant)
         return doc
@@ -0,0 +1,129 @@
+# tracing.py
+"""Trazas opcionales por tool y por llamada execute_kw.
+
+Cada tool MCP abre un span `tool <nombre>` y cada `execute_kw` un span hijo
+`odoo <model>.<method>`. Los spans siguen el modelo de OpenTelemetry
+(traceId/spanId/parentSpanId, tiempos en ns, atributos, status) y se exportan
+según `TRACING_EXPORTER`:
+
+- (vacío)  desactivado
+- console  una línea JSON por span en stderr
+- file     JSONL en `TRACING_FILE` (default: traces.jsonl)
+- otel     se delegan al API de OpenTelemetry (el SDK/exporter lo configura
+           el despliegue, p.ej. con opentelemetry-instrument)
+
+Independientemente del exportador, `collect_timings()` acumula las RPC hechas
+durante una llamada para devolver el desglose junto al resultado de la tool
+(ver `OdooMCP.call_tool` en server.py).
+"""
+import contextvars
+import json
+import os
+import secrets
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+EXPORTER = os.getenv("TRACING_EXPORTER", "").strip().lower()
+TRACING_FILE = os.getenv("TRACING_FILE", "traces.jsonl")
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("span", default=None)
+_timings: contextvars.ContextVar[Optional[List[Dict[str, Any]]]] = contextvars.ContextVar("timings", default=None)
+_file_lock = threading.Lock()
+
+_otel_tracer = None
+if EXPORTER == "otel":
+    from opentelemetry import trace as _otel_trace
+
+    _otel_tracer = _otel_trace.get_tracer("mcp-odoo")
+
+
+class Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "status")
+
+    def __init__(self, name: str, parent: Optional["Span"], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent.span_id if parent else None
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = dict(attributes)
+        self.status = "OK"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id,
+            "name": self.name,
+            "startTimeUnixNano": self.start_ns,
+            "endTimeUnixNano": self.end_ns,
+            "durationMs": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "attributes": self.attributes,
+            "status": self.status,
+        }
+
+
+def _export(span: Span) -> None:
+    line = json.dumps(span.to_dict(), ensure_ascii=False, default=str)
+    if EXPORTER == "console":
+        print(line, file=sys.stderr)
+    elif EXPORTER == "file":
+        with _file_lock, open(TRACING_FILE, "a", encoding="utf-8") as fh:
+            fh.write(line + "\n")
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """Abre un span hijo del span actual (no-op si no hay exportador)."""
+    if not EXPORTER:
+        yield None
+        return
+    if _otel_tracer is not None:
+        with _otel_tracer.start_as_current_span(name, attributes=attributes):
+            yield None
+        return
+    current = Span(name, _current_span.get(), attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except Exception as e:
+        current.status = "ERROR"
+        current.attributes["exception"] = repr(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        current.end_ns = time.time_ns()
+        _export(current)
+
+
+@contextmanager
+def rpc_span(env: str, model: str, method: str) -> Iterator[None]:
+    """Span de una llamada execute_kw; también alimenta `collect_timings`."""
+    start = time.perf_counter()
+    try:
+        with span(f"odoo {model}.{method}", **{"odoo.env": env, "odoo.model": model, "odoo.method": method}):
+            yield
+    finally:
+        timings = _timings.get()
+        if timings is not None:
+            timings.append({
+                "env": env,
+                "model": model,
+                "method": method,
+                "ms": round((time.perf_counter() - start) * 1000, 3),
+            })
+
+
+@contextmanager
+def collect_timings() -> Iterator[List[Dict[str, Any]]]:
+    """Acumula (en la lista devuelta) las RPC hechas dentro del bloque."""
+    timings: List[Dict[str, Any]] = []
+    token = _timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _timings.reset(token)
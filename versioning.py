@@ -0,0 +1,69 @@
+# versioning.py
+"""Tokens de versión de registros (tipo ETag) a partir de `write_date`.
+
+`fetch`, `get_sale` y `get_task` devuelven `version` junto al documento y
+aceptan `if_version`: si el registro no cambió desde esa versión responden
+solo `{"not_modified": true, ...}` tras un `read(['write_date'])` de una
+fila, en lugar de volver a enviar el documento completo al LLM.
+
+El token incluye la variante de la respuesta (p.ej. `include_lines`), así
+una versión obtenida con otra proyección nunca cuenta como vigente. Si la
+respuesta trae registros hijos (las líneas de `get_sale`), su cantidad y su
+`write_date` más reciente también entran en el token (`with_children`):
+editar una línea no siempre toca el `write_date` de la orden.
+"""
+import hashlib
+from typing import Any, Dict, List, Optional, Tuple
+
+import metrics
+
+
+def version_token(model: str, record_id: int, write_date: Any, variant: str = "") -> Optional[str]:
+    """Token opaco de la versión del registro (None si no hay write_date)."""
+    if not write_date:
+        return None
+    raw = f"{model}:{int(record_id)}:{write_date}:{variant}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def with_children(write_date: Any, children: List[Dict[str, Any]]) -> Any:
+    """`write_date` del registro combinado con el de sus hijos (cantidad y el más reciente)."""
+    if not write_date:
+        return write_date
+    latest = max((c.get("write_date") or "" for c in children), default="")
+    return f"{write_date}|{len(children)}|{latest}"
+
+
+def current_version(odoo, model: str, record_id: int, variant: str = "",
+                    children: Optional[Tuple[str, str]] = None) -> Optional[str]:
+    """
+    Versión actual leyendo solo `write_date` (None si el registro no existe).
+    `children` = (modelo hijo, campo que apunta al registro), p.ej.
+    `("sale.order.line", "order_id")`.
+    """
+    rows = odoo.execute_kw(model, "read", [[int(record_id)]], {"fields": ["write_date"]})
+    if not rows:
+        return None
+    write_date = rows[0].get("write_date")
+    if children:
+        child_model, parent_field = children
+        child_rows = odoo.execute_kw(child_model, "search_read", [[[parent_field, "=", int(record_id)]]],
+                                     {"fields": ["write_date"]})
+        write_date = with_children(write_date, child_rows)
+    return version_token(model, record_id, write_date, variant)
+
+
+def check_not_modified(odoo, model: str, record_id: int, if_version: Optional[str],
+                       variant: str = "", children: Optional[Tuple[str, str]] = None) -> Optional[Dict[str, Any]]:
+    """
+    Resultado "not modified" si `if_version` sigue vigente; None si hay que
+    devolver el documento completo (versión distinta, registro borrado o sin
+    `if_version`).
+    """
+    if not if_version:
+        return None
+    unchanged = current_version(odoo, model, record_id, variant, children) == if_version
+    metrics.cache_event("if_version", hit=unchanged)
+    if not unchanged:
+        return None
+    return {"id": int(record_id), "model": model, "not_modified": True, "version": if_version}